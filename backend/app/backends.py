@@ -0,0 +1,213 @@
+"""
+Backends de resolución del problema maestro: CBC (PuLP) y HiGHS (scipy).
+
+pulp y scipy.optimize se importan al usar cada backend.
+"""
+import numpy as np
+from dataclasses import dataclass, field
+from scipy import sparse
+from typing import Dict, List, Optional
+
+# Estados (mismos nombres que pulp.LpStatus)
+OPTIMAL = "Optimal"
+NOT_SOLVED = "Not Solved"
+INFEASIBLE = "Infeasible"
+UNBOUNDED = "Unbounded"
+UNDEFINED = "Undefined"
+
+DEFAULT_BACKEND = "cbc"
+
+
+@dataclass
+class MasterModel:
+    """
+    Maestro en forma matricial:
+    min costs·x  s.a.  demand·x >= demand_rhs,  stock·x <= stock_rhs,  x >= 0
+    """
+    costs: np.ndarray
+    demand: sparse.csr_matrix
+    demand_rhs: np.ndarray
+    demand_ids: List[int]
+    stock: sparse.csr_matrix
+    stock_rhs: np.ndarray
+    stock_ids: List[int]
+
+
+@dataclass
+class LPResult:
+    status: str
+    objective: Optional[float] = None
+    x: Optional[np.ndarray] = None
+    # Duales por id (demanda >= 0, material <= 0)
+    demand_duals: Dict[int, float] = field(default_factory=dict)
+    stock_duals: Dict[int, float] = field(default_factory=dict)
+
+
+@dataclass
+class MIPResult:
+    status: str
+    x: Optional[np.ndarray] = None
+    objective: Optional[float] = None
+    # Cota inferior del objetivo que demuestra el solver (None si no la da)
+    bound: Optional[float] = None
+
+
+class SolverBackend:
+    """Interfaz común de los backends"""
+
+    name = ""
+
+    def solve_lp(self, model: MasterModel) -> LPResult:
+        raise NotImplementedError
+
+    def solve_mip(self, model: MasterModel, time_limit: float, gap_rel: float,
+                  start: Optional[np.ndarray] = None) -> MIPResult:
+        raise NotImplementedError
+
+
+class CBCBackend(SolverBackend):
+    """CBC a través de PuLP (escribe el modelo y lanza un subproceso)"""
+
+    name = "cbc"
+
+    def _build(self, model: MasterModel, category: str):
+        import pulp
+        prob = pulp.LpProblem("Cutting2D", pulp.LpMinimize)
+        variables = [pulp.LpVariable(f"pattern_{i}", lowBound=0, cat=category)
+                     for i in range(len(model.costs))]
+        prob.setObjective(pulp.LpAffineExpression(zip(variables, model.costs.tolist())))
+
+        # Cada restricción se arma desde los coeficientes no nulos de su fila
+        def add_rows(matrix, rhs, ids, sense, prefix):
+            indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+            for r, item_id in enumerate(ids):
+                start, end = indptr[r], indptr[r + 1]
+                if start == end:
+                    continue
+                expr = pulp.LpAffineExpression(
+                    zip([variables[j] for j in indices[start:end]], data[start:end].tolist()))
+                prob.addConstraint(pulp.LpConstraint(expr, sense, rhs=float(rhs[r])),
+                                   f"{prefix}_{item_id}")
+
+        add_rows(model.demand, model.demand_rhs, model.demand_ids, pulp.LpConstraintGE, "demanda")
+        add_rows(model.stock, model.stock_rhs, model.stock_ids, pulp.LpConstraintLE, "material")
+        return prob, variables
+
+    @staticmethod
+    def _values(variables) -> np.ndarray:
+        return np.array([var.varValue or 0.0 for var in variables])
+
+    def solve_lp(self, model: MasterModel) -> LPResult:
+        import pulp
+        prob, variables = self._build(model, 'Continuous')
+        prob.solve(pulp.PULP_CBC_CMD(msg=False))
+        status = pulp.LpStatus[prob.status]
+        if status != OPTIMAL:
+            return LPResult(status)
+
+        def duals(ids, prefix):
+            result = {}
+            for item_id in ids:
+                constraint = prob.constraints.get(f"{prefix}_{item_id}")
+                result[item_id] = (constraint.pi or 0.0) if constraint is not None else 0.0
+            return result
+
+        return LPResult(status, pulp.value(prob.objective) or 0.0, self._values(variables),
+                        duals(model.demand_ids, "demanda"), duals(model.stock_ids, "material"))
+
+    def solve_mip(self, model: MasterModel, time_limit: float, gap_rel: float,
+                  start: Optional[np.ndarray] = None) -> MIPResult:
+        import pulp
+        prob, variables = self._build(model, 'Integer')
+        if start is not None:
+            for var, value in zip(variables, start):
+                var.setInitialValue(value)
+        prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=gap_rel,
+                                     warmStart=start is not None))
+        status = pulp.LpStatus[prob.status]
+        # Sin solución entera (infactible, sin incumbente...) los valores no
+        # significan nada; PuLP da Optimal también si para por tiempo con una
+        if status != OPTIMAL:
+            return MIPResult(status)
+        objective = pulp.value(prob.objective) or 0.0
+        # PuLP no da la cota de CBC: sólo se sabe que el óptimo está demostrado
+        # dentro de gap_rel (cota >= objetivo·(1 - gap_rel)) y no cuando se para por tiempo
+        bound = objective * (1 - gap_rel) if prob.sol_status == pulp.LpSolutionOptimal else None
+        return MIPResult(status, self._values(variables), objective, bound)
+
+
+class HighsBackend(SolverBackend):
+    """
+    HiGHS en proceso a través de scipy.optimize (sin ficheros ni subprocesos).
+
+    scipy.optimize.milp no admite solución inicial: start se ignora.
+    """
+
+    name = "highs"
+
+    @staticmethod
+    def _inequalities(model: MasterModel):
+        """Restricciones como A_ub x <= b_ub (la demanda cambia de signo)"""
+        A = sparse.vstack([-model.demand, model.stock], format="csr")
+        b = np.concatenate([-model.demand_rhs, model.stock_rhs])
+        return A, b
+
+    def solve_lp(self, model: MasterModel) -> LPResult:
+        from scipy.optimize import linprog
+        n = len(model.costs)
+        A, b = self._inequalities(model)
+        if not n:
+            return LPResult(OPTIMAL if not (model.demand_rhs > 0).any() else INFEASIBLE,
+                            0.0, np.zeros(0))
+        result = linprog(model.costs, A_ub=A if A.shape[0] else None,
+                         b_ub=b if A.shape[0] else None, bounds=(0, None), method="highs")
+        if result.status != 0:
+            return LPResult(INFEASIBLE if result.status == 2 else
+                            UNBOUNDED if result.status == 3 else NOT_SOLVED)
+
+        # Marginales de A_ub x <= b_ub: derivada del objetivo respecto a b_ub
+        marginals = result.ineqlin.marginals if A.shape[0] else np.zeros(0)
+        k = len(model.demand_ids)
+        demand_duals = {item_id: -float(marginals[r]) for r, item_id in enumerate(model.demand_ids)}
+        stock_duals = {item_id: float(marginals[k + r]) for r, item_id in enumerate(model.stock_ids)}
+        return LPResult(OPTIMAL, float(result.fun), result.x, demand_duals, stock_duals)
+
+    def solve_mip(self, model: MasterModel, time_limit: float, gap_rel: float,
+                  start: Optional[np.ndarray] = None) -> MIPResult:
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        n = len(model.costs)
+        if not n:
+            if (model.demand_rhs > 0).any():
+                return MIPResult(INFEASIBLE)
+            return MIPResult(OPTIMAL, np.zeros(0), 0.0, 0.0)
+        constraints = []
+        if model.demand.shape[0]:
+            constraints.append(LinearConstraint(model.demand, lb=model.demand_rhs, ub=np.inf))
+        if model.stock.shape[0]:
+            constraints.append(LinearConstraint(model.stock, lb=-np.inf, ub=model.stock_rhs))
+        result = milp(model.costs, integrality=np.ones(n), bounds=Bounds(0, np.inf),
+                      constraints=constraints,
+                      options={"time_limit": time_limit, "mip_rel_gap": gap_rel, "disp": False})
+
+        # Como PuLP con CBC: tiempo agotado con solución entera cuenta como Optimal
+        if result.x is not None and result.status in (0, 1):
+            x = np.round(result.x)
+            return MIPResult(OPTIMAL, x, float(model.costs @ x), getattr(result, "mip_dual_bound", None))
+        if result.status == 2:
+            return MIPResult(INFEASIBLE)
+        if result.status == 3:
+            return MIPResult(UNBOUNDED)
+        return MIPResult(NOT_SOLVED)
+
+
+BACKENDS = {
+    CBCBackend.name: CBCBackend,
+    HighsBackend.name: HighsBackend
+}
+
+
+def get_backend(name: str = DEFAULT_BACKEND) -> SolverBackend:
+    """Instancia del backend pedido"""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de resolución desconocido: {name}")
+    return BACKENDS[name]()
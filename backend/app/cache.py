@@ -0,0 +1,189 @@
+"""
+Caché de soluciones direccionada por contenido
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from .models import OptimizationConfig
+
+# Configuración por variables de entorno
+CACHE_SIZE = int(os.environ.get("SOLUTION_CACHE_SIZE", 256))
+CACHE_DB = os.environ.get("SOLUTION_CACHE_DB")  # ruta SQLite opcional
+
+# Gap máximo de una solución que se sirve a solicitudes idénticas (el
+# gap_rel por defecto del MIP)
+REUSE_MAX_GAP = float(os.environ.get("SOLUTION_CACHE_MAX_GAP", 0.01))
+
+# Precisión con la que se normalizan las medidas
+DECIMALS = 6
+
+
+def canonical_request(request: Dict) -> Dict:
+    """
+    Forma canónica de una solicitud: medidas normalizadas, materiales y
+    piezas ordenados y configuración completa con sus valores por defecto.
+    """
+    def number(value):
+        return round(float(value), DECIMALS)
+
+    materiales = sorted(
+        ({"ancho": number(m["ancho"]), "alto": number(m["alto"]),
+          "cantidad": int(m["cantidad"]), "nombre": m.get("nombre"),
+          "retal": bool(m.get("retal", False))}
+         for m in request["materiales"]),
+        key=lambda m: (m["retal"], m["ancho"], m["alto"], m["cantidad"], m["nombre"] or "")
+    )
+    piezas = sorted(
+        ({"ancho": number(p["ancho"]), "alto": number(p["alto"]),
+          "demanda": int(p["demanda"]), "nombre": p.get("nombre"),
+          "rotable": bool(p.get("rotable", True))}
+         for p in request["piezas"]),
+        key=lambda p: (p["ancho"], p["alto"], p["demanda"], p["nombre"] or "", p["rotable"])
+    )
+    config = OptimizationConfig(**(request.get("config") or {})).model_dump()
+
+    return {"materiales": materiales, "piezas": piezas, "config": config}
+
+
+def request_key(request: Dict) -> str:
+    """Hash estable de la forma canónica de una solicitud"""
+    canonical = json.dumps(canonical_request(request), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def shape_key(request: Dict) -> str:
+    """
+    Hash de las medidas de una solicitud sin cantidades ni configuración:
+    instancias con la misma forma comparten patrones útiles como arranque.
+    """
+    canonical = canonical_request(request)
+    shape = {
+        "materiales": sorted({(m["ancho"], m["alto"]) for m in canonical["materiales"]}),
+        "piezas": sorted({(p["ancho"], p["alto"], p["rotable"]) for p in canonical["piezas"]})
+    }
+    return hashlib.sha256(json.dumps(shape).encode()).hexdigest()[:16]
+
+
+def reusable(solution: Dict) -> bool:
+    """
+    Si una solución puede servir a solicitudes idénticas: sólo con el óptimo
+    demostrado (gap hasta REUSE_MAX_GAP). Un plan parado por tiempo,
+    aceptado antes de terminar o heurístico puede mejorar al resolver de nuevo.
+    """
+    gap = (solution.get("summary") or {}).get("gap")
+    return gap is not None and gap <= REUSE_MAX_GAP
+
+
+class SolutionCache:
+    """LRU en memoria con almacén SQLite opcional"""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, db_path: Optional[str] = CACHE_DB):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._similar = OrderedDict()  # forma -> clave de la última solución
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.similar_hits = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS soluciones ("
+                "clave TEXT PRIMARY KEY, solucion TEXT NOT NULL, creado TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS similares (forma TEXT PRIMARY KEY, clave TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Solución almacenada para una clave, o None"""
+        with self._lock:
+            solution = self._entries.get(key)
+            if solution is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return solution
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT solucion FROM soluciones WHERE clave = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    solution = json.loads(row[0])
+                    self._remember(key, solution)
+                    self.disk_hits += 1
+                    return solution
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, solution: Dict, shape: str = None):
+        """Guardar una solución (y asociarla a la forma de su instancia)"""
+        with self._lock:
+            self._remember(key, solution)
+            if shape is not None:
+                self._similar[shape] = key
+                self._similar.move_to_end(shape)
+                while len(self._similar) > self.max_entries:
+                    self._similar.popitem(last=False)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO soluciones (clave, solucion, creado) VALUES (?, ?, ?)",
+                    (key, json.dumps(solution), datetime.now().isoformat())
+                )
+                if shape is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO similares (forma, clave) VALUES (?, ?)", (shape, key)
+                    )
+                self._db.commit()
+
+    def find_similar(self, shape: str) -> Optional[Dict]:
+        """Última solución de una instancia con la misma forma, o None"""
+        with self._lock:
+            key = self._similar.get(shape)
+            if key is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT clave FROM similares WHERE forma = ?", (shape,)
+                ).fetchone()
+                key = row[0] if row is not None else None
+            if key is None:
+                return None
+
+            solution = self._entries.get(key)
+            if solution is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT solucion FROM soluciones WHERE clave = ?", (key,)
+                ).fetchone()
+                solution = json.loads(row[0]) if row is not None else None
+            if solution is not None:
+                self.similar_hits += 1
+            return solution
+
+    def _remember(self, key: str, solution: Dict):
+        self._entries[key] = solution
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """Contadores de aciertos y fallos"""
+        with self._lock:
+            return {
+                "entradas": len(self._entries),
+                "aciertos": self.hits,
+                "aciertos_disco": self.disk_hits,
+                "fallos": self.misses,
+                "arranques_similares": self.similar_hits,
+                "persistente": self._db is not None
+            }
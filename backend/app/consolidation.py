@@ -0,0 +1,146 @@
+"""
+Consolidación de pedidos: las piezas de varios pedidos que comparten
+material se resuelven en un único modelo de patrones y las placas
+resultantes se reparten después entre los pedidos
+"""
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from .cache import canonical_request
+
+
+def merge_orders(request: Dict) -> Tuple[Dict, List[List[Tuple[int, int, int, bool]]]]:
+    """
+    Solicitud única con la demanda de todos los pedidos.
+
+    Las piezas con las mismas medidas y rotación se funden en un solo tipo;
+    si son rotables, también con las medidas cruzadas (43x28 y 28x43).
+    Devuelve la solicitud y, por tipo, sus dueños como (índice de pedido,
+    índice de la pieza en el pedido, demanda, girada respecto al tipo) en
+    el orden de los pedidos, que es también su prioridad en el reparto.
+    """
+    types = {}
+    piezas, owners = [], []
+    for o, pedido in enumerate(request["pedidos"]):
+        for p, pieza in enumerate(pedido["piezas"]):
+            rotable = bool(pieza.get("rotable", True))
+            sides = (round(float(pieza["ancho"]), 6), round(float(pieza["alto"]), 6))
+            key = (tuple(sorted(sides)) if rotable else sides) + (rotable,)
+            if key not in types:
+                types[key] = len(piezas)
+                piezas.append({"ancho": pieza["ancho"], "alto": pieza["alto"], "demanda": 0,
+                               "nombre": pieza.get("nombre") or f"{key[0]:g}x{key[1]:g}",
+                               "rotable": rotable})
+                owners.append([])
+            t = types[key]
+            piezas[t]["demanda"] += pieza["demanda"]
+            turned = sides != (round(float(piezas[t]["ancho"]), 6), round(float(piezas[t]["alto"]), 6))
+            owners[t].append((o, p, pieza["demanda"], turned))
+
+    merged = {"materiales": request["materiales"], "piezas": piezas, "config": request.get("config")}
+    if request.get("inicio"):
+        merged["inicio"] = request["inicio"]
+    return merged, owners
+
+
+def consolidation_key(request: Dict) -> str:
+    """Hash estable de una consolidación (el orden de los pedidos cuenta)"""
+    canonical = canonical_request(merge_orders(request)[0])
+    canonical["pedidos"] = [
+        [pedido["id"], [[p["ancho"], p["alto"], p["demanda"], p.get("nombre"),
+                         bool(p.get("rotable", True))] for p in pedido["piezas"]]]
+        for pedido in request["pedidos"]
+    ]
+    text = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return "c" + hashlib.sha256(text.encode()).hexdigest()[:15]
+
+
+def split_solution(solution: Dict, request: Dict, merged: Dict,
+                   owners: List[List[Tuple[int, int, int, bool]]]) -> Dict:
+    """
+    Repartir las placas de una solución consolidada entre los pedidos.
+
+    Cada pieza colocada se asigna al primer pedido con demanda pendiente de
+    su tipo, en la orientación de ese pedido; las copias consecutivas de un
+    layout con el mismo reparto se agrupan. El material de cada placa se imputa a los pedidos en
+    proporción al área de sus piezas en ella.
+    """
+    pedidos = request["pedidos"]
+    pending = [[demand for _, _, demand, _ in type_owners] for type_owners in owners]
+    orders = [{"id": pedido["id"], "hojas": [], "instrucciones": [],
+               "asignadas": [0] * len(pedido["piezas"]), "area_material": 0.0,
+               "area_piezas": 0.0}
+              for pedido in pedidos]
+    surplus = {}
+    sheet = 0
+
+    def assign(piece_type):
+        for k, left in enumerate(pending[piece_type]):
+            if left > 0:
+                pending[piece_type][k] -= 1
+                return owners[piece_type][k]
+        return None
+
+    def close(layout, index, allocation, copies, first_sheet):
+        material_area = layout["material"][0] * layout["material"][1]
+        total_area = sum(layout["pieces"][j][0] * layout["pieces"][j][1]
+                         for placed in allocation.values() for j, _, _ in placed)
+        for o, placed in allocation.items():
+            order = orders[o]
+            area = sum(layout["pieces"][j][0] * layout["pieces"][j][1] for j, _, _ in placed)
+            share = area / total_area if total_area > 0 else 0.0
+            order["area_piezas"] += area * copies
+            order["area_material"] += material_area * share * copies
+            pieces = []
+            for j, p, turned in placed:
+                width, height, x, y, rotated = layout["pieces"][j]
+                # Medidas y giro respecto a la pieza tal como la pidió el pedido
+                if turned:
+                    width, height, rotated = height, width, not rotated
+                nombre = pedidos[o]["piezas"][p].get("nombre") or f"{width:g}x{height:g}"
+                pieces.append([width, height, x, y, rotated, nombre])
+                instruction = f"Cortar {nombre} en ({x:.1f}, {y:.1f})"
+                if rotated:
+                    instruction += " (rotado)"
+                placas = (f"placa {first_sheet + 1}" if copies == 1 else
+                          f"placas {first_sheet + 1}-{first_sheet + copies}")
+                order["instrucciones"].append(f"{placas}: {instruction}")
+            order["hojas"].append({"layout": index, "material": layout["material"],
+                                   "copias": copies, "primera_placa": first_sheet + 1,
+                                   "compartida": len(allocation) > 1, "piezas": pieces})
+
+    for index, layout in enumerate(solution.get("layouts", [])):
+        ids = layout.get("ids") or []
+        group, copies, first = None, 0, sheet
+        for _ in range(layout["count"]):
+            allocation = {}
+            for j, piece_id in enumerate(ids):
+                owner = assign(piece_id - 1)
+                if owner is None:
+                    surplus[piece_id - 1] = surplus.get(piece_id - 1, 0) + 1
+                    continue
+                o, p, _, turned = owner
+                allocation.setdefault(o, []).append((j, p, turned))
+                orders[o]["asignadas"][p] += 1
+            if allocation != group:
+                if group:
+                    close(layout, index, group, copies, first)
+                group, copies, first = allocation, 0, sheet
+            copies += 1
+            sheet += 1
+        if group:
+            close(layout, index, group, copies, first)
+
+    for order, pedido in zip(orders, pedidos):
+        order["piezas"] = [{"nombre": p.get("nombre"), "ancho": p["ancho"], "alto": p["alto"],
+                            "demanda": p["demanda"], "asignadas": order["asignadas"][i]}
+                           for i, p in enumerate(pedido["piezas"])]
+        order["completo"] = all(p["asignadas"] >= p["demanda"] for p in order["piezas"])
+        order["desperdicio"] = order["area_material"] - order["area_piezas"]
+        del order["asignadas"], order["area_piezas"]
+
+    # Piezas producidas de más (patrones que sobrecubren la demanda)
+    sobrantes = [{"ancho": merged["piezas"][t]["ancho"], "alto": merged["piezas"][t]["alto"],
+                  "cantidad": n} for t, n in sorted(surplus.items())]
+    return {"pedidos": orders, "sobrantes": sobrantes}
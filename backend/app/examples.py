@@ -0,0 +1,31 @@
+"""
+Instancias de ejemplo (también usadas por los benchmarks)
+"""
+
+EJEMPLOS = {
+    "ejemplo_papel": {
+        "nombre": "Ejemplo del artículo de investigación",
+        "descripcion": "Caso de estudio del artículo original",
+        "materiales": [
+            {"ancho": 100, "alto": 70, "cantidad": 20, "nombre": "Cartulina 100x70"}
+        ],
+        "piezas": [
+            {"ancho": 43, "alto": 28, "demanda": 50, "nombre": "Pieza A"},
+            {"ancho": 33, "alto": 21.6, "demanda": 75, "nombre": "Pieza B"},
+            {"ancho": 25, "alto": 18, "demanda": 100, "nombre": "Pieza C"},
+            {"ancho": 20, "alto": 15, "demanda": 120, "nombre": "Pieza D"}
+        ]
+    },
+    "ejemplo_vidrio": {
+        "nombre": "Vidriería básica",
+        "descripcion": "Corte de vidrio para ventanas",
+        "materiales": [
+            {"ancho": 244, "alto": 122, "cantidad": 10, "nombre": "Vidrio estándar"}
+        ],
+        "piezas": [
+            {"ancho": 60, "alto": 90, "demanda": 20, "nombre": "Ventana pequeña"},
+            {"ancho": 90, "alto": 120, "demanda": 15, "nombre": "Ventana mediana"},
+            {"ancho": 120, "alto": 150, "demanda": 8, "nombre": "Ventana grande"}
+        ]
+    }
+}
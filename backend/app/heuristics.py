@@ -0,0 +1,302 @@
+"""
+Heurísticas constructivas rápidas: MaxRects, Skyline y Guillotina
+"""
+import functools
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+EPS = 1e-6
+# Orientaciones que fill_sheet evalúa de una vez
+EVALUATION_BLOCK = 16
+
+
+def _no_fit(n: int):
+    """Resultado de evaluate cuando no queda espacio libre: nada cabe"""
+    zeros = np.zeros(n)
+    return np.full(n, np.inf), zeros, zeros, np.zeros(n, dtype=int)
+
+
+class MaxRectsPacker:
+    """MaxRects con criterio best short side fit (BSSF)"""
+
+    name = "maxrects_bssf"
+
+    def __init__(self, width: float, height: float):
+        self.width = width
+        self.height = height
+        # Rectángulos libres maximales: x, y, ancho, alto
+        self.free = np.array([[0.0, 0.0, width, height]])
+
+    def evaluate(self, sizes: np.ndarray):
+        """
+        Mejor posición de cada orientación (filas ancho, alto).
+
+        Devuelve (puntuación, x, y, referencia); puntuación inf si no cabe.
+        """
+        if not len(self.free):
+            return _no_fit(len(sizes))
+        fw = self.free[:, 2][:, None] - sizes[:, 0][None, :]
+        fh = self.free[:, 3][:, None] - sizes[:, 1][None, :]
+        fits = (fw >= -EPS) & (fh >= -EPS)
+        score = np.where(fits, np.minimum(fw, fh) * (self.width + self.height + 1)
+                         + np.maximum(fw, fh), np.inf)
+        f = score.argmin(axis=0)
+        return score[f, np.arange(len(f))], self.free[f, 0], self.free[f, 1], f
+
+    def place(self, x: float, y: float, w: float, h: float, ref: int = None):
+        free = self.free
+        fx, fy, fw, fh = free[:, 0], free[:, 1], free[:, 2], free[:, 3]
+        hit = (x < fx + fw - EPS) & (x + w > fx + EPS) & (y < fy + fh - EPS) & (y + h > fy + EPS)
+        if not hit.any():
+            return
+
+        hx, hy, hw, hh = fx[hit], fy[hit], fw[hit], fh[hit]
+        # Partes libres a izquierda, derecha, abajo y arriba de la pieza
+        m = len(hx)
+        parts = np.empty((4, m, 4))
+        parts[:, :, 0] = (hx, np.full(m, x + w), hx, hx)
+        parts[:, :, 1] = (hy, hy, hy, np.full(m, y + h))
+        parts[:, :, 2] = (x - hx, hx + hw - (x + w), hw, hw)
+        parts[:, :, 3] = (hh, hh, y - hy, hy + hh - (y + h))
+        parts = parts.reshape(-1, 4)
+        parts = parts[(parts[:, 2] > EPS) & (parts[:, 3] > EPS)]
+        self.free = _merge_free(free[~hit], parts)
+
+
+def _merge_free(old: np.ndarray, parts: np.ndarray) -> np.ndarray:
+    """
+    Añadir partes nuevas a los rectángulos libres descartando las contenidas
+    en otro rectángulo. Los antiguos ya eran maximales y no pueden quedar
+    contenidos en una parte nueva (cada parte está dentro de uno eliminado).
+    """
+    if not len(parts):
+        return old
+    rects = np.concatenate((parts, old))
+    x0, y0 = rects[:, 0], rects[:, 1]
+    x1, y1 = x0 + rects[:, 2], y0 + rects[:, 3]
+    n = len(parts)
+    inside = ((x0[:n, None] >= x0[None, :] - EPS) & (y0[:n, None] >= y0[None, :] - EPS) &
+              (x1[:n, None] <= x1[None, :] + EPS) & (y1[:n, None] <= y1[None, :] + EPS))
+    inside[np.arange(n), np.arange(n)] = False
+    # Entre partes duplicadas se conserva la primera
+    duplicate = inside[:, :n] & inside[:, :n].T
+    inside[:, :n] &= ~np.triu(duplicate)
+    return np.concatenate((parts[~inside.any(axis=1)], old))
+
+
+@functools.lru_cache(maxsize=None)
+def _upper(n: int) -> np.ndarray:
+    """Máscara triangular superior (con diagonal) de n x n"""
+    return np.triu(np.ones((n, n), dtype=bool))
+
+
+class SkylinePacker:
+    """Skyline con criterio bottom-left"""
+
+    name = "skyline_bl"
+
+    def __init__(self, width: float, height: float):
+        self.width = width
+        self.height = height
+        # Segmentos del horizonte: x, ancho, altura
+        self.segments = np.array([[0.0, width, 0.0]])
+
+    def evaluate(self, sizes: np.ndarray):
+        xs, ys = self.segments[:, 0], self.segments[:, 2]
+        n = len(xs)
+        # Altura máxima entre el segmento i y el k (inclusive)
+        span_max = np.maximum.accumulate(np.where(_upper(n), ys[None, :], -np.inf), axis=1)
+
+        # Orientación k apoyada desde el segmento i: altura de apoyo y[k, i]
+        starts = np.arange(n)
+        end = np.searchsorted(xs, xs[None, :] + sizes[:, 0][:, None] - EPS, side='left') - 1
+        y = span_max[starts[None, :], np.maximum(end, starts[None, :])]
+        top = y + sizes[:, 1][:, None]
+        ok = (xs[None, :] + sizes[:, 0][:, None] <= self.width + EPS) & (top <= self.height + EPS)
+        # Bottom-left: menor borde superior y luego menor x (xs es creciente)
+        score = np.where(ok, top * (self.width + 1) + xs[None, :], np.inf)
+        i = score.argmin(axis=1)
+        rows = np.arange(len(sizes))
+        return score[rows, i], xs[i], y[rows, i], i
+
+    def place(self, x: float, y: float, w: float, h: float, ref: int = None):
+        # Pocos segmentos: listas de Python en vez de operaciones numpy pequeñas
+        left, right = [], []
+        for start, width, height in self.segments.tolist():
+            end = start + width
+            if end <= x + EPS:
+                left.append([start, width, height])
+            elif start >= x + w - EPS:
+                right.append([start, width, height])
+            elif end > x + w + EPS:
+                # Segmento parcialmente cubierto a la derecha
+                right.append([x + w, end - (x + w), height])
+        # Unir segmentos contiguos a la misma altura
+        keep = []
+        for seg in left + [[x, w, y + h]] + right:
+            if keep and abs(seg[2] - keep[-1][2]) <= EPS:
+                keep[-1][1] += seg[1]
+            else:
+                keep.append(seg)
+        self.segments = np.array(keep)
+
+
+class GuillotinePacker:
+    """Guillotina con criterio best area fit y división por el eje sobrante más corto"""
+
+    name = "guillotine_baf"
+
+    def __init__(self, width: float, height: float):
+        self.width = width
+        self.height = height
+        self.free = np.array([[0.0, 0.0, width, height]])
+
+    def evaluate(self, sizes: np.ndarray):
+        if not len(self.free):
+            return _no_fit(len(sizes))
+        fw = self.free[:, 2][:, None] - sizes[:, 0][None, :]
+        fh = self.free[:, 3][:, None] - sizes[:, 1][None, :]
+        fits = (fw >= -EPS) & (fh >= -EPS)
+        area = (self.free[:, 2] * self.free[:, 3])[:, None] - (sizes[:, 0] * sizes[:, 1])[None, :]
+        score = np.where(fits, area * (self.width + self.height + 1) + np.minimum(fw, fh), np.inf)
+        f = score.argmin(axis=0)
+        return score[f, np.arange(len(f))], self.free[f, 0], self.free[f, 1], f
+
+    def place(self, x: float, y: float, w: float, h: float, ref: int = None):
+        fx, fy, fw, fh = self.free[ref]
+        lw, lh = fw - w, fh - h
+        if lw <= lh:
+            parts = [[fx + w, fy, lw, h], [fx, fy + h, fw, lh]]
+        else:
+            parts = [[fx + w, fy, lw, fh], [fx, fy + h, w, lh]]
+        parts = [p for p in parts if p[2] > EPS and p[3] > EPS]
+        rest = np.delete(self.free, ref, axis=0)
+        self.free = np.vstack([rest] + [np.array(parts)]) if parts else rest
+
+
+# De mejor a peor desperdicio habitual: con poco tiempo se prueban las primeras
+PACKERS = (SkylinePacker, MaxRectsPacker, GuillotinePacker)
+
+
+def _orientations(pieces) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Orientaciones de cada pieza ordenadas por área decreciente"""
+    types, sizes, rotated = [], [], []
+    order = sorted(range(len(pieces)), key=lambda i: pieces[i].area, reverse=True)
+    for i in order:
+        piece = pieces[i]
+        types.append(i)
+        sizes.append((piece.width, piece.height))
+        rotated.append(False)
+        if piece.can_rotate and abs(piece.width - piece.height) > EPS:
+            types.append(i)
+            sizes.append((piece.height, piece.width))
+            rotated.append(True)
+    return np.array(types, dtype=int), np.array(sizes, dtype=float), np.array(rotated)
+
+
+def fill_sheet(packer_cls, material, pieces, remaining: np.ndarray,
+               orientations) -> List[Tuple[int, float, float, bool]]:
+    """
+    Llenar una placa con la demanda restante: siempre la pieza de mayor
+    área que quepa, en la mejor posición según el criterio del empaquetador.
+    """
+    types, sizes, rotated = orientations
+    packer = packer_cls(material.width, material.height)
+    remaining = remaining.copy()
+    placements = []
+
+    # El espacio libre sólo se reduce: lo que deja de caber se descarta
+    active = np.flatnonzero((sizes[:, 0] <= material.width + EPS) &
+                            (sizes[:, 1] <= material.height + EPS))
+    active = active[remaining[types[active]] > 0]
+    while len(active):
+        # Sólo interesa la primera pieza (mayor área) que cabe: se evalúan
+        # tandas en ese orden hasta encontrarla, no todas las orientaciones
+        fitting = np.ones(len(active), dtype=bool)
+        start = 0
+        while start < len(active):
+            end = min(start + EVALUATION_BLOCK, len(active))
+            # Las dos orientaciones de un tipo van en la misma tanda
+            if end < len(active) and types[active[end]] == types[active[end - 1]]:
+                end += 1
+            score, xs, ys, refs = packer.evaluate(sizes[active[start:end]])
+            fits = np.isfinite(score)
+            fitting[start:end] = fits
+            if fits.any():
+                break
+            start = end
+        else:
+            break
+
+        # Orientaciones de la primera pieza que cabe
+        block = active[start:end]
+        first = block[fits.argmax()]
+        group = np.flatnonzero(fits & (types[block] == types[first]))
+        k = group[score[group].argmin()]
+        o = block[k]
+        w, h = sizes[o]
+        packer.place(xs[k], ys[k], w, h, refs[k])
+        remaining[types[o]] -= 1
+        placements.append((int(types[o]), float(xs[k]), float(ys[k]), bool(rotated[o])))
+        if not remaining[types[o]]:
+            fitting &= types[active] != types[o]
+        active = active[fitting]
+
+    return placements
+
+
+def pack(packer_cls, materials, pieces, demands: Dict[int, int] = None,
+         stock: Dict[int, int] = None) -> Dict:
+    """
+    Empaquetado secuencial: se llena una placa, se repite su patrón
+    mientras la demanda lo permita y se continúa con el resto.
+
+    demands y stock (por id) sustituyen a la demanda de las piezas y a la
+    cantidad de los materiales, p. ej. para cubrir una demanda residual.
+
+    Devuelve {"layouts": [(material, colocaciones, veces)], "unplaced": {...}}.
+    """
+    orientations = _orientations(pieces)
+    return sequential_pack(
+        lambda material, remaining: fill_sheet(packer_cls, material, pieces, remaining, orientations),
+        materials, pieces, demands, stock)
+
+
+def sequential_pack(fill: Callable, materials, pieces, demands: Dict[int, int] = None,
+                    stock: Dict[int, int] = None) -> Dict:
+    """
+    Bucle de pack con otra forma de llenar una placa: fill(material,
+    demanda restante) devuelve sus colocaciones.
+    """
+    if demands is None:
+        demands = {p.id: p.demand for p in pieces}
+    remaining = np.array([max(0, demands.get(p.id, 0)) for p in pieces], dtype=int)
+    stock = dict(stock) if stock is not None else {m.id: m.quantity for m in materials}
+    layouts = []
+
+    while remaining.sum() > 0:
+        best = None
+        for material in materials:
+            if stock[material.id] <= 0:
+                continue
+            placements = fill(material, remaining)
+            if not placements:
+                continue
+            used = sum(pieces[i].area for i, _, _, _ in placements) / material.area
+            if best is None or used > best[0]:
+                best = (used, material, placements)
+        if best is None:
+            break
+
+        _, material, placements = best
+        counts = np.bincount([i for i, _, _, _ in placements], minlength=len(pieces))
+        used_types = counts > 0
+        times = int(min((remaining[used_types] // counts[used_types]).min(), stock[material.id]))
+        times = max(times, 1)
+        remaining = np.maximum(remaining - counts * times, 0)
+        stock[material.id] -= times
+        layouts.append((material, placements, times))
+
+    unplaced = {pieces[i].id: int(n) for i, n in enumerate(remaining) if n > 0}
+    return {"layouts": layouts, "unplaced": unplaced}
+
@@ -0,0 +1,51 @@
+"""
+Reoptimización incremental: la instancia de una solución previa con un
+cambio pequeño (demandas, piezas o existencias) se resuelve de nuevo
+partiendo de los patrones y el plan de aquella
+"""
+from typing import Dict, List
+
+from .cache import DECIMALS, canonical_request
+
+
+def _matches(item: Dict, ref: Dict) -> bool:
+    """Si una pieza o material coincide con una referencia (medidas y, si se da, nombre)"""
+    return (round(float(item["ancho"]), DECIMALS) == round(float(ref["ancho"]), DECIMALS) and
+            round(float(item["alto"]), DECIMALS) == round(float(ref["alto"]), DECIMALS) and
+            (ref.get("nombre") is None or item.get("nombre") == ref["nombre"]))
+
+
+def _apply_changes(items: List[Dict], changes: List[Dict], field: str, kind: str) -> List[Dict]:
+    """Cambiar field en los elementos referenciados y quitar los que quedan a 0"""
+    items = [dict(item) for item in items]
+    for change in changes:
+        found = [item for item in items if _matches(item, change)]
+        name = f"{kind} {change['ancho']:g}x{change['alto']:g}"
+        if change.get("nombre") is not None:
+            name += f" ({change['nombre']})"
+        if not found:
+            raise ValueError(f"{name} no está en la solución previa")
+        if len(found) > 1:
+            raise ValueError(f"{name} es ambiguo: hay {len(found)} iguales, indica su nombre")
+        found[0][field] = change[field]
+    return [item for item in items if item[field] > 0]
+
+
+def apply_delta(previous: Dict, delta: Dict) -> Dict:
+    """
+    Solicitud (canónica) resultante de aplicar un cambio
+    (ReoptimizationRequest) a la solicitud de una solución previa.
+    ValueError si el cambio no encaja con ella o la deja vacía.
+    """
+    piezas = _apply_changes(previous["piezas"], delta.get("demandas") or [], "demanda", "Pieza")
+    piezas += delta.get("nuevas_piezas") or []
+    materiales = _apply_changes(previous["materiales"], delta.get("existencias") or [],
+                                "cantidad", "Material")
+    materiales += delta.get("nuevos_materiales") or []
+
+    if not piezas:
+        raise ValueError("El cambio no deja ninguna pieza que cortar")
+    if not materiales:
+        raise ValueError("El cambio no deja ningún material")
+    return canonical_request({"materiales": materiales, "piezas": piezas,
+                              "config": delta.get("config") or previous.get("config")})
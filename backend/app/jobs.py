@@ -0,0 +1,138 @@
+"""
+Registro de trabajos de optimización asíncronos
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Estados de un trabajo
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+ACEPTADO = "aceptado"
+CANCELADO = "cancelado"
+ERROR = "error"
+
+ESTADOS_FINALES = {COMPLETADO, ACEPTADO, CANCELADO, ERROR}
+
+# Límites de memoria del registro
+MAX_JOBS = 1000
+MAX_EVENTS_PER_JOB = 500
+
+
+class Job:
+    """Trabajo de optimización y su avance"""
+
+    def __init__(self, job_id: str, request: Dict):
+        self.id = job_id
+        self.request = request
+        self.key = None
+        self.status = EN_COLA
+        self.created = datetime.now()
+        self.updated = self.created
+        self.events = []  # (secuencia, evento)
+        self.sequence = 0
+        self.progress = None
+        self.incumbent = None
+        self.result = None
+        self.error = None
+        self.future = None
+        self.task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ESTADOS_FINALES
+
+
+def _progress_event(event: Dict) -> Dict:
+    """Traducir un evento del optimizador al formato de la API"""
+    return {
+        "fase": event.get("phase"),
+        "iteracion": event.get("iteration"),
+        "patrones": event.get("patterns"),
+        "desperdicio": event.get("waste"),
+        "cota": event.get("bound"),
+        "gap": event.get("gap"),
+        "tiempo": event.get("elapsed")
+    }
+
+
+class JobStore:
+    """Registro en memoria de trabajos, seguro entre hilos"""
+
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, request: Dict) -> Job:
+        """Registrar un trabajo nuevo"""
+        job = Job(uuid.uuid4().hex[:12], request)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        return job
+
+    def _evict(self):
+        """Olvidar los trabajos terminados más antiguos"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.finished]:
+            del self._jobs[job_id]
+            if len(self._jobs) <= self.max_jobs:
+                break
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str):
+        """Eliminar un trabajo que no llegó a encolarse"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def add_progress(self, job_id: str, event: Dict):
+        """Registrar un evento de avance (llamado desde el hilo lector del pool)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            if event.get("solution") is not None:
+                job.incumbent = event["solution"]
+            job.status = EJECUTANDO
+            job.updated = datetime.now()
+            job.progress = _progress_event(event)
+            job.sequence += 1
+            job.events.append((job.sequence, job.progress))
+            del job.events[:-MAX_EVENTS_PER_JOB]
+
+    def finish(self, job_id: str, status: str, result: Dict = None,
+               error: str = None) -> bool:
+        """Cerrar un trabajo; devuelve False si ya estaba terminado"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.status = status
+            job.result = result
+            job.error = error
+            job.updated = datetime.now()
+            return True
+
+    def events_since(self, job_id: str, sequence: int) -> Tuple[List[Tuple[int, Dict]], bool]:
+        """Eventos posteriores a una secuencia y si el trabajo ya terminó"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return [], True
+            return [e for e in job.events if e[0] > sequence], job.finished
+
+    def get_stats(self) -> Dict:
+        """Número de trabajos por estado"""
+        with self._lock:
+            stats = {}
+            for job in self._jobs.values():
+                stats[job.status] = stats.get(job.status, 0) + 1
+            return stats
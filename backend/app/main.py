@@ -1,32 +1,89 @@
 ﻿"""
 Backend principal - API REST para optimización de corte 2D
 """
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
+import asyncio
+import os
 import uvicorn
 import json
+import time
+import uuid
 from datetime import datetime
 
 # Importar nuestros módulos
-from .optimizer import CuttingOptimizer2D
-from .ml_predictor import WastePredictor
+from .stats import SolverMetrics, SolverStats
+from .ml_predictor import WastePredictor, features_from_request
+from .workers import (
+    SolverPool,
+    PoolFullError,
+    PoolUnavailableError,
+    solve_request,
+    solve_consolidated,
+    solve_job,
+    job_timeout
+)
+from .jobs import JobStore, COMPLETADO, ACEPTADO, CANCELADO, ERROR
+from .examples import EJEMPLOS
+from .cache import SolutionCache, canonical_request, request_key, reusable, shape_key
+from .consolidation import consolidation_key, merge_orders
+from .incremental import apply_delta
+from .offcuts import OffcutConflict, OffcutInventory
+from .routing import SolveLog, SolverRouter
+from .visualization import FORMATS, ImageCache, render
 from .models import (
     OptimizationRequest, 
     OptimizationResponse,
+    ConsolidationRequest,
+    ConsolidationResponse,
+    ReoptimizationRequest,
     MaterialInput,
-    PieceInput
+    PieceInput,
+    JobStatus
 )
 
+# Intervalo de sondeo del stream de avance (segundos)
+STREAM_INTERVAL = 0.5
+
+# Lotes: pedidos en vuelo a la vez (0 = uno por trabajador), máximo por
+# lote y espera antes de reintentar si la cola del pool está llena
+BATCH_CONCURRENCY = int(os.environ.get("OPTIMIZER_BATCH_CONCURRENCY", 0))
+BATCH_MAX_ORDERS = int(os.environ.get("OPTIMIZER_BATCH_MAX", 1000))
+BATCH_RETRY_DELAY = 0.2
+
+# Trabajos asíncronos y pool de procesos (no bloquean el bucle de eventos)
+jobs = JobStore()
+
+def _fallo_avance(job_id: str, error: Exception):
+    """Un trabajo cuyo avance no se puede registrar termina con error y libera su trabajador"""
+    job = jobs.get(job_id)
+    if jobs.finish(job_id, ERROR, error=f"Error procesando el avance: {error}") and job is not None:
+        solver_pool.stop(job.future)
+
+solver_pool = SolverPool(on_progress=jobs.add_progress, on_progress_error=_fallo_avance)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arrancar y detener los procesos trabajadores con la aplicación; los modelos ML se cargan en segundo plano"""
+    solver_pool.start()
+    ml_predictor.start()
+    solver_router.start()
+    yield
+    solver_pool.shutdown()
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="API de Optimización de Corte 2D",
     description="API REST para optimizar problemas de corte 2D usando PLE",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS (para que el frontend pueda acceder)
@@ -38,9 +95,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Inicializar componentes
-optimizer = CuttingOptimizer2D()
+# Inicializar componentes (cada solicitud se resuelve con su propio contexto)
+solver_stats = SolverStats()
+solver_metrics = SolverMetrics()
+solution_cache = SolutionCache()
+image_cache = ImageCache()
+offcut_inventory = OffcutInventory()
 ml_predictor = WastePredictor()
+solver_router = SolverRouter()
+solve_log = SolveLog()
 
 @app.get("/")
 async def root():
@@ -51,8 +114,16 @@ async def root():
         "endpoints": {
             "documentación": "/api/docs",
             "optimizar": "/api/optimizar",
+            "lote": "/api/optimizar/lote",
+            "consolidar": "/api/optimizar/consolidar",
+            "reoptimizar": "/api/reoptimizar/{solucion_id}",
+            "retales": "/api/retales",
             "predecir": "/api/predecir",
-            "estadísticas": "/api/estadisticas"
+            "predecir_lote": "/api/predecir/lote",
+            "recargar_modelo": "/api/modelo/recargar",
+            "trabajos": "/api/jobs",
+            "estadísticas": "/api/estadisticas",
+            "métricas": "/metrics"
         }
     }
 
@@ -61,8 +132,90 @@ async def health_check():
     """Verificar que la API está funcionando"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+def _respuesta_optimizacion(resultado: dict, tiempos: bool = False) -> OptimizationResponse:
+    """
+    Convertir la solución del optimizador en la respuesta de la API; los
+    tiempos por fase y el tamaño de los modelos sólo si se piden
+    """
+    resumen = resultado["summary"]
+    if not tiempos:
+        resumen = {k: v for k, v in resumen.items() if k not in ("timings", "model_size")}
+    return OptimizationResponse(
+        success=True,
+        desperdicio=resultado["waste"],
+        tiempo_ejecucion=resultado["time"],
+        patrones_utilizados=resultado["patterns_used"],
+        instrucciones=resultado["instructions"],
+        visualizacion_url=f"/api/visualizar/{resultado['id']}",
+        resumen=resumen
+    )
+
+def _registrar_solucion(clave: str, resultado: dict, datos: dict):
+    """
+    Identificar la solución, guardarla en caché y contarla; sólo se
+    identifica por su instancia (y la reciben las solicitudes idénticas) si
+    su óptimo está demostrado
+    """
+    if not reusable(resultado):
+        # Con id propio se puede visualizar, reoptimizar o registrar, pero
+        # una solicitud idéntica se vuelve a resolver
+        clave = f"{clave}-{uuid.uuid4().hex[:8]}"
+    resultado["id"] = clave
+    # La instancia queda con la solución para poder reoptimizarla tras un cambio
+    resultado["request"] = canonical_request(datos)
+    if datos.get("enrutado"):
+        resultado["summary"]["routing"] = datos["enrutado"]
+    solution_cache.put(clave, resultado, shape_key(datos))
+    solver_stats.record(resultado["waste"], resultado["time"])
+    config = datos.get("config") or {}
+    solver_metrics.record_solution(resultado, config.get("modo", "exacto"), config.get("solver", "cbc"))
+    # Telemetría con la que se entrena el enrutado del modo "auto"
+    solve_log.record(datos, resultado)
+
+def _con_enrutado(resultado: dict, datos: dict) -> dict:
+    """
+    Solución de la caché con la decisión de enrutado de esta solicitud: la
+    guardada pudo resolverse para otra (con modo explícito o "auto")
+    """
+    enrutado = datos.get("enrutado")
+    if resultado["summary"].get("routing") == enrutado:
+        return resultado
+    resumen = {k: v for k, v in resultado["summary"].items() if k != "routing"}
+    if enrutado:
+        resumen["routing"] = enrutado
+    return dict(resultado, summary=resumen)
+
+def _con_arranque(datos: dict) -> dict:
+    """Añadir como arranque los patrones de una instancia parecida ya resuelta"""
+    previa = solution_cache.find_similar(shape_key(datos))
+    if previa is None or not previa.get("layouts"):
+        return datos
+    return dict(datos, inicio=previa["layouts"])
+
+def _con_retales(datos: dict) -> dict:
+    """Añadir como materiales los retales del inventario si la configuración lo pide"""
+    if not (datos.get("config") or {}).get("usar_retales"):
+        return datos
+    retales = offcut_inventory.materials_for(datos)
+    if not retales:
+        return datos
+    return canonical_request(dict(datos, materiales=datos["materiales"] + retales))
+
+async def _enrutar(datos: dict, instancia: dict = None) -> dict:
+    """
+    Con modo "auto", fijar el modo y el tiempo límite que elige el
+    enrutado para la instancia (por defecto, la propia solicitud); la
+    decisión viaja en "enrutado" hasta el resumen de la solución
+    """
+    config = datos.get("config") or {}
+    if config.get("modo") != "auto":
+        return datos
+    ruta = await asyncio.to_thread(solver_router.route, instancia or datos)
+    config = dict(config, modo=ruta["modo"], tiempo_limite=ruta["tiempo_limite"])
+    return dict(datos, config=config, enrutado=ruta)
+
 @app.post("/api/optimizar", response_model=OptimizationResponse)
-async def optimizar_corte(request: OptimizationRequest):
+async def optimizar_corte(request: OptimizationRequest, tiempos: bool = False):
     """
     Endpoint principal para optimizar problemas de corte 2D
     
@@ -75,59 +228,449 @@ async def optimizar_corte(request: OptimizationRequest):
     - Solución óptima
     - Patrones de corte
     - Instrucciones detalladas
+    - Con ?tiempos=true, tiempos por fase y tamaño de los modelos en el resumen
     """
     try:
         print(f"Recibida solicitud de optimización: {len(request.materiales)} materiales, {len(request.piezas)} piezas")
         
-        # Configurar el optimizador
-        optimizer.clear()
+        # Instancias repetidas (o permutadas) se sirven desde la caché
+        datos = await _enrutar(_con_retales(canonical_request(request.model_dump())))
+        clave = request_key(datos)
+        resultado = solution_cache.get(clave)
         
-        # Añadir materiales
-        for material in request.materiales:
-            optimizer.add_material(
-                width=material.ancho,
-                height=material.alto,
-                quantity=material.cantidad,
-                name=material.nombre
-            )
+        # Ejecutar optimización en un proceso trabajador
+        if resultado is None:
+            resultado = await solver_pool.run(solve_request, _con_arranque(datos),
+                                              timeout=job_timeout(datos))
+            _registrar_solucion(clave, resultado, datos)
+        else:
+            resultado = _con_enrutado(resultado, datos)
         
-        # Añadir piezas
-        for i, pieza in enumerate(request.piezas):
-            optimizer.add_piece(
-                id=i+1,
-                width=pieza.ancho,
-                height=pieza.alto,
-                demand=pieza.demanda,
-                name=pieza.nombre
-            )
+        return _respuesta_optimizacion(resultado, tiempos)
         
-        # Configurar parámetros
-        if request.config:
-            optimizer.set_config(
-                use_substitution=request.config.usar_sustitucion,
-                max_patterns=request.config.max_patrones,
-                time_limit=request.config.tiempo_limite
-            )
+    except PoolFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tiempo límite de optimización agotado")
+    except Exception as e:
+        print(f"Error en optimización: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error en optimización: {str(e)}")
+
+@app.post("/api/reoptimizar/{solucion_id}", response_model=OptimizationResponse)
+async def reoptimizar_corte(solucion_id: str, request: ReoptimizationRequest, tiempos: bool = False):
+    """
+    Resolver de nuevo una solución previa tras un cambio pequeño
+    
+    Recibe el id de la solución y el cambio: nuevas demandas o
+    existencias de piezas y materiales ya presentes (0 los quita) y piezas
+    o materiales nuevos. La nueva instancia arranca con las columnas de la
+    última relajación de la previa y con su plan como incumbente, así que
+    la generación de columnas converge en pocas iteraciones.
+    
+    Devuelve la solución de la nueva instancia, con su propio id.
+    """
+    previa = solution_cache.get(solucion_id)
+    if previa is None or "request" not in previa:
+        raise HTTPException(status_code=404, detail="Solución no encontrada")
+    try:
+        datos = apply_delta(previa["request"], request.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        datos = await _enrutar(datos)
+        clave = request_key(datos)
+        resultado = solution_cache.get(clave)
+        
+        if resultado is None:
+            arranque = dict(datos, inicio=previa.get("layouts") or [],
+                            patrones=previa.get("pool") or [])
+            resultado = await solver_pool.run(solve_request, arranque,
+                                              timeout=job_timeout(datos))
+            _registrar_solucion(clave, resultado, datos)
+        else:
+            resultado = _con_enrutado(resultado, datos)
         
-        # Ejecutar optimización
-        resultado = optimizer.solve()
+        return _respuesta_optimizacion(resultado, tiempos)
         
-        # Generar respuesta
-        respuesta = OptimizationResponse(
-            success=True,
-            desperdicio=resultado["waste"],
-            tiempo_ejecucion=resultado["time"],
-            patrones_utilizados=resultado["patterns_used"],
-            instrucciones=resultado["instructions"],
-            visualizacion_url=f"/api/visualizar/{resultado['id']}",
-            resumen=resultado["summary"]
+    except PoolFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tiempo límite de optimización agotado")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en reoptimización: {str(e)}")
+
+@app.post("/api/optimizar/consolidar", response_model=ConsolidationResponse)
+async def consolidar_pedidos(request: ConsolidationRequest, tiempos: bool = False):
+    """
+    Optimizar juntos varios pedidos que comparten materiales
+    
+    Las piezas de todos los pedidos entran en un único modelo de patrones
+    (las placas pueden mezclar pedidos) y la solución se reparte después:
+    cada pedido recibe sus placas, instrucciones y el material imputado.
+    """
+    try:
+        datos = request.model_dump()
+        datos = await _enrutar(datos, merge_orders(datos)[0])
+        clave = consolidation_key(datos)
+        resultado = solution_cache.get(clave)
+        
+        if resultado is None:
+            conjunta, _ = merge_orders(datos)
+            inicio = _con_arranque(conjunta).get("inicio")
+            if inicio:
+                datos = dict(datos, inicio=inicio)
+            resultado = await solver_pool.run(solve_consolidated, datos,
+                                              timeout=job_timeout(datos))
+            _registrar_solucion(clave, resultado, dict(conjunta, enrutado=datos.get("enrutado")))
+        else:
+            resultado = _con_enrutado(resultado, datos)
+        
+        return ConsolidationResponse(
+            **_respuesta_optimizacion(resultado, tiempos).model_dump(),
+            pedidos=resultado["pedidos"],
+            sobrantes=resultado["sobrantes"]
         )
         
-        return respuesta
+    except PoolFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except PoolUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tiempo límite de optimización agotado")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en consolidación: {str(e)}")
+
+async def _leer_lote(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Pedidos de un lote: lista JSON o NDJSON (una solicitud por línea).
+    
+    Produce (índice, OptimizationRequest) o (índice, mensaje de error)
+    para los pedidos que no validan; el NDJSON se procesa según llega.
+    """
+    def validar(indice, valor):
+        try:
+            return indice, OptimizationRequest.model_validate(valor)
+        except ValidationError as e:
+            return indice, f"Pedido no válido: {e.errors()[0]['msg']}"
+    
+    if "ndjson" in request.headers.get("content-type", ""):
+        indice, pendiente = 0, b""
+        async for bloque in request.stream():
+            pendiente += bloque
+            *lineas, pendiente = pendiente.split(b"\n")
+            for linea in lineas:
+                if linea.strip():
+                    try:
+                        yield validar(indice, json.loads(linea))
+                    except ValueError:
+                        yield indice, "Línea NDJSON no válida"
+                    indice += 1
+        if pendiente.strip():
+            try:
+                yield validar(indice, json.loads(pendiente))
+            except ValueError:
+                yield indice, "Línea NDJSON no válida"
+        return
+    
+    try:
+        pedidos = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="El cuerpo debe ser una lista JSON o NDJSON")
+    if not isinstance(pedidos, list):
+        raise HTTPException(status_code=400, detail="El cuerpo debe ser una lista de pedidos")
+    if len(pedidos) > BATCH_MAX_ORDERS:
+        raise HTTPException(status_code=413, detail=f"Máximo {BATCH_MAX_ORDERS} pedidos por lote")
+    for indice, pedido in enumerate(pedidos):
+        yield validar(indice, pedido)
+
+async def _resolver_pedido_lote(datos: dict, clave: str, limite: asyncio.Semaphore) -> dict:
+    """Resolver un pedido del lote en el pool, esperando hueco si la cola está llena"""
+    async with limite:
+        while True:
+            try:
+                future = solver_pool.submit(solve_request, _con_arranque(datos))
+                break
+            except PoolFullError:
+                await asyncio.sleep(BATCH_RETRY_DELAY)
+        resultado = await solver_pool.wait(future, job_timeout(datos))
+    _registrar_solucion(clave, resultado, datos)
+    return resultado
+
+@app.post("/api/optimizar/lote")
+async def optimizar_lote(request: Request):
+    """
+    Resolver muchos pedidos en una sola llamada, en paralelo en el pool
+    
+    Recibe una lista JSON de solicitudes de /api/optimizar o NDJSON
+    (Content-Type: application/x-ndjson, un pedido por línea).
+    
+    Devuelve NDJSON con una línea por pedido según van terminando
+    ({"indice", "id", "estado": "ok", "resultado"} o {"indice",
+    "estado": "error", "codigo", "error"}) y una línea final de resumen.
+    """
+    pedidos = _leer_lote(request)
+    # Validar el cuerpo JSON antes de empezar a responder
+    primero = None
+    try:
+        primero = await pedidos.__anext__()
+    except StopAsyncIteration:
+        pass
+    
+    limite = asyncio.Semaphore(BATCH_CONCURRENCY or solver_pool.workers)
+    salida = asyncio.Queue()
+    
+    async def resolver(indice: int, pedido, en_curso: dict):
+        linea = {"indice": indice}
+        try:
+            if isinstance(pedido, str):
+                raise HTTPException(status_code=422, detail=pedido)
+            datos = await _enrutar(_con_retales(canonical_request(pedido.model_dump())))
+            clave = request_key(datos)
+            resultado = solution_cache.get(clave)
+            if resultado is None:
+                # Pedidos idénticos dentro del lote se resuelven una sola vez
+                if clave not in en_curso:
+                    en_curso[clave] = asyncio.ensure_future(
+                        _resolver_pedido_lote(datos, clave, limite))
+                resultado = await asyncio.shield(en_curso[clave])
+            resultado = _con_enrutado(resultado, datos)
+            linea.update(id=resultado["id"], estado="ok",
+                         resultado=_respuesta_optimizacion(resultado).model_dump())
+        except HTTPException as e:
+            linea.update(estado="error", codigo=e.status_code, error=e.detail)
+        except PoolUnavailableError as e:
+            linea.update(estado="error", codigo=503, error=str(e))
+        except asyncio.TimeoutError:
+            linea.update(estado="error", codigo=504, error="Tiempo límite de optimización agotado")
+        except Exception as e:
+            linea.update(estado="error", codigo=500, error=f"Error en optimización: {str(e)}")
+        await salida.put(linea)
+    
+    async def producir():
+        en_curso, tareas, total = {}, [], 0
+        try:
+            if primero is not None:
+                tareas.append(asyncio.ensure_future(resolver(*primero, en_curso)))
+                total += 1
+            async for indice, pedido in pedidos:
+                if total >= BATCH_MAX_ORDERS:
+                    await salida.put({"indice": indice, "estado": "error", "codigo": 413,
+                                      "error": f"Máximo {BATCH_MAX_ORDERS} pedidos por lote"})
+                    continue
+                tareas.append(asyncio.ensure_future(resolver(indice, pedido, en_curso)))
+                total += 1
+            await asyncio.gather(*tareas)
+        finally:
+            for tarea in tareas + list(en_curso.values()):
+                tarea.cancel()
+            await salida.put(None)
+    
+    async def lineas():
+        productor = asyncio.ensure_future(producir())
+        total = errores = 0
+        try:
+            while True:
+                linea = await salida.get()
+                if linea is None:
+                    break
+                total += 1
+                errores += linea["estado"] == "error"
+                yield json.dumps(linea, default=str) + "\n"
+            yield json.dumps({"fin": True, "total": total, "errores": errores}) + "\n"
+        finally:
+            productor.cancel()
+    
+    return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+@app.get("/api/visualizar/{solucion_id}")
+async def visualizar_patron(solucion_id: str, patron: int = 0, formato: str = "svg"):
+    """
+    Imagen de un patrón de una solución (SVG por defecto o PNG)
+    
+    Se dibuja la primera vez que se pide y se guarda en una caché
+    acotada; el SVG se genera directamente sin matplotlib.
+    """
+    if formato not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {formato}")
+    clave = (solucion_id, patron, formato)
+    imagen = image_cache.get(clave)
+    
+    if imagen is None:
+        resultado = solution_cache.get(solucion_id)
+        if resultado is None:
+            raise HTTPException(status_code=404, detail="Solución no encontrada")
+        layouts = resultado.get("layouts") or []
+        if not 0 <= patron < len(layouts):
+            raise HTTPException(status_code=404, detail="Patrón no encontrado")
         
+        layout = layouts[patron]
+        titulo = f"Patrón {patron + 1} de {len(layouts)} (x{layout['count']})"
+        inicio = time.perf_counter()
+        if formato == "png":
+            # matplotlib es lento: fuera del bucle de eventos
+            imagen = await asyncio.to_thread(render, layout, formato, titulo)
+        else:
+            imagen = render(layout, formato, titulo)
+        solver_metrics.observe("optimizer_phase_seconds", {"fase": "visualization"},
+                               time.perf_counter() - inicio)
+        image_cache.put(clave, imagen)
+    
+    return Response(content=imagen, media_type=FORMATS[formato])
+
+@app.get("/api/retales")
+async def buscar_retales(ancho: float, alto: float, rotable: bool = True,
+                         material: Optional[str] = None, limite: int = 50):
+    """Retales del inventario que admiten una pieza ancho x alto"""
+    if ancho <= 0 or alto <= 0 or limite <= 0:
+        raise HTTPException(status_code=400, detail="Medidas y límite deben ser positivos")
+    retales = offcut_inventory.find(ancho, alto, rotable, material, limite)
+    return {"retales": [o.to_dict() for o in retales], "inventario": len(offcut_inventory)}
+
+@app.post("/api/retales/{solucion_id}")
+async def registrar_retales(solucion_id: str):
+    """
+    Registrar como ejecutado el plan de una solución
+    
+    Se descuentan del inventario los retales que usa y se guardan los
+    rectángulos sobrantes de cada placa (ambos lados de al menos
+    OFFCUT_MIN_SIDE). Cada plan se registra una sola vez.
+    """
+    resultado = solution_cache.get(solucion_id)
+    if resultado is None or "request" not in resultado:
+        raise HTTPException(status_code=404, detail="Solución no encontrada")
+    try:
+        consumidos, nuevos = await asyncio.to_thread(
+            offcut_inventory.apply_plan, solucion_id, resultado["layouts"],
+            resultado["request"]["materiales"])
+    except OffcutConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "consumidos": [o.to_dict() for o in consumidos],
+        "nuevos": [o.to_dict() for o in nuevos],
+        "inventario": len(offcut_inventory)
+    }
+
+def _estado_trabajo(job) -> JobStatus:
+    """Vista pública de un trabajo"""
+    return JobStatus(
+        id=job.id,
+        estado=job.status,
+        creado=job.created,
+        actualizado=job.updated,
+        progreso=job.progress,
+        resultado=_respuesta_optimizacion(job.result) if job.result else None,
+        error=job.error
+    )
+
+def _obtener_trabajo(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+async def _esperar_trabajo(job, timeout: float):
+    """Recoger el resultado de un trabajo encolado"""
+    try:
+        resultado = await solver_pool.wait(job.future, timeout)
+        resultado["id"] = job.key
+        if jobs.finish(job.id, COMPLETADO, result=resultado):
+            _registrar_solucion(job.key, resultado, job.request)
+    except asyncio.CancelledError:
+        jobs.finish(job.id, CANCELADO)
+    except asyncio.TimeoutError:
+        jobs.finish(job.id, ERROR, error="Tiempo límite de optimización agotado")
     except Exception as e:
-        print(f"Error en optimización: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error en optimización: {str(e)}")
+        jobs.finish(job.id, ERROR, error=str(e))
+
+@app.post("/api/jobs", response_model=JobStatus, status_code=202)
+async def crear_trabajo(request: OptimizationRequest):
+    """
+    Encolar una optimización y devolver su id inmediatamente
+    
+    El avance se consulta en /api/jobs/{id} o en /api/jobs/{id}/stream
+    """
+    datos = await _enrutar(_con_retales(canonical_request(request.model_dump())))
+    job = jobs.create(datos)
+    job.key = request_key(datos)
+    
+    resultado = solution_cache.get(job.key)
+    if resultado is not None:
+        jobs.finish(job.id, COMPLETADO, result=_con_enrutado(resultado, datos))
+        return _estado_trabajo(job)
+    
+    try:
+        job.future = solver_pool.submit(solve_job, job.id, _con_arranque(datos))
+    except PoolFullError as e:
+        jobs.discard(job.id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except PoolUnavailableError as e:
+        jobs.discard(job.id)
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    job.task = asyncio.create_task(_esperar_trabajo(job, job_timeout(datos)))
+    return _estado_trabajo(job)
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def consultar_trabajo(job_id: str):
+    """Estado, último avance y resultado de un trabajo"""
+    return _estado_trabajo(_obtener_trabajo(job_id))
+
+@app.get("/api/jobs/{job_id}/stream")
+async def seguir_trabajo(job_id: str):
+    """
+    Server-Sent Events con el avance del solver: desperdicio del
+    incumbente, cota, gap y tiempo transcurrido
+    """
+    _obtener_trabajo(job_id)
+    
+    async def eventos():
+        secuencia = 0
+        while True:
+            nuevos, terminado = jobs.events_since(job_id, secuencia)
+            for secuencia, evento in nuevos:
+                yield f"id: {secuencia}\nevent: progreso\ndata: {json.dumps(evento)}\n\n"
+            if terminado:
+                job = jobs.get(job_id)
+                if job is not None:
+                    yield f"event: fin\ndata: {_estado_trabajo(job).model_dump_json()}\n\n"
+                break
+            await asyncio.sleep(STREAM_INTERVAL)
+    
+    return StreamingResponse(eventos(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/jobs/{job_id}/aceptar", response_model=JobStatus)
+async def aceptar_trabajo(job_id: str):
+    """Aceptar el mejor plan encontrado hasta ahora y liberar el trabajador"""
+    job = _obtener_trabajo(job_id)
+    if job.finished:
+        return _estado_trabajo(job)
+    if job.incumbent is None:
+        raise HTTPException(status_code=409, detail="Todavía no hay una solución disponible")
+    
+    resultado = job.incumbent
+    resultado["id"] = job.key
+    if jobs.finish(job.id, ACEPTADO, result=resultado):
+        # El solver no sigue con el MIP: el trabajador queda libre al momento
+        solver_pool.stop(job.future)
+        # El plan aceptado queda en caché como uno terminado: se puede
+        # visualizar y, si su óptimo está demostrado, sirve a las solicitudes idénticas
+        _registrar_solucion(job.key, resultado, job.request)
+    return _estado_trabajo(job)
+
+@app.delete("/api/jobs/{job_id}", response_model=JobStatus)
+async def cancelar_trabajo(job_id: str):
+    """Cancelar un trabajo en cola o en ejecución"""
+    job = _obtener_trabajo(job_id)
+    if not job.finished:
+        solver_pool.stop(job.future)
+        jobs.finish(job.id, CANCELADO)
+    return _estado_trabajo(job)
 
 @app.post("/api/predecir")
 async def predecir_desperdicio(request: OptimizationRequest):
@@ -135,24 +678,11 @@ async def predecir_desperdicio(request: OptimizationRequest):
     Usar ML para predecir el desperdicio antes de optimizar
     """
     try:
-        # Extraer características para ML
-        caracteristicas = {
-            "num_materiales": len(request.materiales),
-            "num_piezas": len(request.piezas),
-            "area_total_materiales": sum(m.ancho * m.alto * m.cantidad for m in request.materiales),
-            "area_total_piezas": sum(p.ancho * p.alto * p.demanda for p in request.piezas),
-            "utilizacion_estimada": 0.85  # Valor inicial
-        }
-        
-        # Calcular utilización estimada
-        if caracteristicas["area_total_materiales"] > 0:
-            caracteristicas["utilizacion_estimada"] = min(
-                caracteristicas["area_total_piezas"] / caracteristicas["area_total_materiales"],
-                0.95
-            )
-        
-        # Predecir con ML
-        prediccion = ml_predictor.predict(caracteristicas)
+        # Predecir con ML con las características que usa el modelo
+        # La primera predicción puede esperar a que se cargue el modelo
+        datos = request.model_dump()
+        prediccion = (await asyncio.to_thread(ml_predictor.predict_requests, [datos]))[0]
+        caracteristicas = features_from_request(datos, ml_predictor.features)
         
         return {
             "prediccion_ml": True,
@@ -169,49 +699,94 @@ async def predecir_desperdicio(request: OptimizationRequest):
             "desperdicio_estimado": None
         }
 
+@app.post("/api/predecir/lote")
+async def predecir_lote(request: List[OptimizationRequest]):
+    """
+    Predecir el desperdicio de muchos pedidos en una llamada
+    
+    Las características de todos se calculan como una matriz y el modelo
+    se invoca una sola vez para las filas que no estén en la caché de
+    predicciones. Devuelve una predicción por pedido, en el mismo orden.
+    """
+    if len(request) > BATCH_MAX_ORDERS:
+        raise HTTPException(status_code=413, detail=f"Máximo {BATCH_MAX_ORDERS} pedidos por lote")
+    
+    predicciones = await asyncio.to_thread(
+        ml_predictor.predict_requests, [pedido.model_dump() for pedido in request])
+    return {
+        "predicciones": [
+            {
+                "indice": i,
+                "desperdicio_estimado": prediccion["waste"],
+                "confianza": prediccion["confidence"],
+                "recomendaciones": prediccion["recommendations"],
+                **({"error": prediccion["error"]} if "error" in prediccion else {})
+            }
+            for i, prediccion in enumerate(predicciones)
+        ],
+        "total": len(predicciones),
+        "cache": ml_predictor.cache.get_stats()
+    }
+
+@app.post("/api/modelo/recargar")
+async def recargar_modelo():
+    """
+    Cargar de nuevo el artefacto del predictor sin reiniciar la API
+    
+    El modelo se sustituye de golpe (las predicciones en curso terminan
+    con el anterior). Cada proceso vigila además el fichero y se recarga
+    solo cuando cambia (ML_MODEL_WATCH_INTERVAL).
+    """
+    try:
+        return await asyncio.to_thread(ml_predictor.reload)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=409, detail=f"No se pudo recargar el modelo: {str(e)}")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metricas():
+    """
+    Métricas en formato Prometheus: resoluciones por modo y estado e
+    histogramas de duración total, de cada fase (patrones, heurística,
+    construcción del modelo, LP, MIP, extracción, visualización), tamaño
+    de los modelos y gap; más la ocupación actual del pool y las cachés
+    """
+    pool = solver_pool.get_stats()
+    trabajos = jobs.get_stats()
+    estado = {
+        "optimizer_pool_workers": (pool["workers"], "Procesos trabajadores del pool"),
+        "optimizer_pool_pending": (pool["pending"], "Resoluciones en cola o en curso en el pool"),
+        "optimizer_jobs_queued": (trabajos.get("en_cola", 0), "Trabajos asíncronos en cola"),
+        "optimizer_solution_cache_entries": (solution_cache.get_stats()["entradas"],
+                                             "Soluciones en la caché en memoria"),
+        "optimizer_image_cache_bytes": (image_cache.get_stats()["bytes"], "Bytes de la caché de imágenes")
+    }
+    return PlainTextResponse(solver_metrics.render(estado),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/ejemplos")
 async def obtener_ejemplos():
     """Devuelve ejemplos predefinidos para probar"""
-    ejemplos = {
-        "ejemplo_papel": {
-            "nombre": "Ejemplo del artículo de investigación",
-            "descripcion": "Caso de estudio del artículo original",
-            "materiales": [
-                {"ancho": 100, "alto": 70, "cantidad": 20, "nombre": "Cartulina 100x70"}
-            ],
-            "piezas": [
-                {"ancho": 43, "alto": 28, "demanda": 50, "nombre": "Pieza A"},
-                {"ancho": 33, "alto": 21.6, "demanda": 75, "nombre": "Pieza B"},
-                {"ancho": 25, "alto": 18, "demanda": 100, "nombre": "Pieza C"},
-                {"ancho": 20, "alto": 15, "demanda": 120, "nombre": "Pieza D"}
-            ]
-        },
-        "ejemplo_vidrio": {
-            "nombre": "Vidriería básica",
-            "descripcion": "Corte de vidrio para ventanas",
-            "materiales": [
-                {"ancho": 244, "alto": 122, "cantidad": 10, "nombre": "Vidrio estándar"}
-            ],
-            "piezas": [
-                {"ancho": 60, "alto": 90, "demanda": 20, "nombre": "Ventana pequeña"},
-                {"ancho": 90, "alto": 120, "demanda": 15, "nombre": "Ventana mediana"},
-                {"ancho": 120, "alto": 150, "demanda": 8, "nombre": "Ventana grande"}
-            ]
-        }
-    }
-    
-    return ejemplos
+    return EJEMPLOS
 
 @app.get("/api/estadisticas")
 async def obtener_estadisticas():
     """Estadísticas del sistema"""
+    stats = solver_stats.snapshot()
     return {
         "sistema": "Optimizador de Corte 2D",
         "version": "1.0.0",
-        "optimizaciones_realizadas": optimizer.get_stats()["total_optimizations"],
-        "promedio_desperdicio": optimizer.get_stats()["avg_waste"],
-        "tiempo_promedio": optimizer.get_stats()["avg_time"],
-        "modelo_ml": ml_predictor.get_model_info()
+        "optimizaciones_realizadas": stats["total_optimizations"],
+        "promedio_desperdicio": stats["avg_waste"],
+        "tiempo_promedio": stats["avg_time"],
+        "pool_trabajos": solver_pool.get_stats(),
+        "trabajos": jobs.get_stats(),
+        "cache_soluciones": solution_cache.get_stats(),
+        "retales": offcut_inventory.get_stats(),
+        "cache_imagenes": image_cache.get_stats(),
+        "modelo_ml": ml_predictor.get_model_info(),
+        "enrutado": dict(solver_router.get_stats(), telemetria=solve_log.records)
     }
 
 if __name__ == "__main__":
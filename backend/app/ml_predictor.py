@@ -1,102 +1,477 @@
 """
 Predictor de Machine Learning para desperdicio
+
+numpy, sklearn y joblib se importan al cargar el modelo, no al importar
+el módulo: el arranque de la API no paga por ellos.
 """
-import numpy as np
-import pandas as pd
-import joblib
-from sklearn.ensemble import RandomForestRegressor
-from typing import Dict
+import hashlib
 import json
 import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Modelo entrenado por ml/training/train_model.py
+MODEL_PATH = os.environ.get(
+    "ML_MODEL_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "ml", "models", "waste_predictor.pkl")
+)
+# Cada cuántos segundos se mira si el artefacto ha cambiado para recargarlo (0 = nunca)
+MODEL_WATCH_INTERVAL = float(os.environ.get("ML_MODEL_WATCH_INTERVAL", 30))
+# Predicciones recordadas por vector de características
+PREDICTION_CACHE_SIZE = int(os.environ.get("ML_PREDICTION_CACHE_SIZE", 4096))
+
+# Carga de modelos de uno en uno: importar sklearn desde dos hilos a la vez puede bloquearse
+MODEL_LOAD_LOCK = threading.Lock()
+
+FEATURES = (
+    'num_materiales',
+    'num_piezas',
+    'area_total_materiales',
+    'area_total_piezas',
+    'utilizacion_estimada'
+)
+
+# Características adicionales para modelos entrenados con ml/training (por unidad de demanda)
+EXTRA_FEATURES = (
+    'demanda_total',
+    'area_media_pieza',  # área media de pieza / área media de placa
+    'cv_area_pieza',  # coeficiente de variación del área de pieza
+    'aspecto_medio',  # lado mayor / lado menor
+    'sesgo_demanda'  # demanda máxima / demanda media por tipo
+)
+
+ALL_FEATURES = FEATURES + EXTRA_FEATURES
+
+def feature_matrix(requests: Sequence[Dict], features: Sequence[str] = FEATURES):
+    """
+    Características de muchas solicitudes (dicts de OptimizationRequest)
+    como una matriz n x len(features): las sumas por solicitud se hacen
+    con bincount sobre todas las filas a la vez.
+    """
+    import numpy as np
+    n = len(requests)
+    
+    def columns(key: str, fields: Tuple[str, str, str]):
+        rows = [(i, item[fields[0]], item[fields[1]], item[fields[2]])
+                for i, request in enumerate(requests) for item in request[key]]
+        if not rows:
+            return np.zeros(0, dtype=int), np.zeros(0), np.zeros(0), np.zeros(0)
+        owner, a, b, c = (np.array(col, dtype=float) for col in zip(*rows))
+        return owner.astype(int), a, b, c
+    
+    def total(owner, weights=None):
+        return np.bincount(owner, weights=weights, minlength=n).astype(float)
+    
+    def ratio(a, b, default=0.0):
+        return np.divide(a, b, out=np.full(n, default), where=b > 0)
+    
+    owner, width, height, quantity = columns("materiales", ("ancho", "alto", "cantidad"))
+    n_materials, sheets = total(owner), total(owner, quantity)
+    material_area = total(owner, width * height * quantity)
+    
+    owner, width, height, demand = columns("piezas", ("ancho", "alto", "demanda"))
+    area = width * height
+    n_pieces, total_demand = total(owner), total(owner, demand)
+    piece_area = total(owner, area * demand)
+    
+    mean_area = ratio(piece_area, total_demand)
+    second_moment = ratio(total(owner, area ** 2 * demand), total_demand)
+    deviation = np.sqrt(np.maximum(second_moment - mean_area ** 2, 0.0))
+    aspect = np.maximum(width, height) / np.maximum(np.minimum(width, height), 1e-9)
+    max_demand = np.zeros(n)
+    np.maximum.at(max_demand, owner, demand)
+    
+    # Utilización estimada: área de piezas sobre área de material (0.85 sin material)
+    utilization = np.minimum(ratio(piece_area, material_area, 0.85), 0.95)
+    
+    values = {
+        'num_materiales': n_materials,
+        'num_piezas': n_pieces,
+        'area_total_materiales': material_area,
+        'area_total_piezas': piece_area,
+        'utilizacion_estimada': utilization,
+        'demanda_total': total_demand,
+        'area_media_pieza': ratio(mean_area, ratio(material_area, sheets)),
+        'cv_area_pieza': ratio(deviation, mean_area),
+        'aspecto_medio': ratio(total(owner, aspect * demand), total_demand),
+        'sesgo_demanda': ratio(max_demand, ratio(total_demand, n_pieces))
+    }
+    return np.column_stack([values[f] for f in features])
+
+def features_from_request(request: Dict, features: Sequence[str] = FEATURES) -> Dict:
+    """Características de una solicitud por nombre"""
+    row = feature_matrix([request], features)[0].tolist()
+    named = dict(zip(features, row))
+    for name in ('num_materiales', 'num_piezas', 'demanda_total'):
+        if name in named:
+            named[name] = int(named[name])
+    return named
+
+class PredictionCache:
+    """LRU de predicciones por vector de características"""
+    
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[float]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Tuple, value: float):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entradas": len(self._entries),
+                "max_entradas": self.max_entries,
+                "aciertos": self.hits,
+                "fallos": self.misses
+            }
+
+class FlatForest:
+    """
+    Bosque de regresión de sklearn como arrays planos: los nodos de todos
+    los árboles concatenados (las hojas apuntan a sí mismas). Guardado sin
+    comprimir con joblib se carga con mmap_mode y los procesos de la API
+    comparten sus páginas; los árboles de sklearn, en cambio, copian sus
+    nodos al deserializarse.
+    """
+    FORMAT = "bosque-plano"
+    ARRAYS = ("left", "right", "feature", "threshold", "value", "roots")
+    
+    def __init__(self, left, right, feature, threshold, value, roots, depth: int):
+        self.left, self.right = left, right
+        self.feature, self.threshold = feature, threshold
+        self.value, self.roots = value, roots
+        self.depth = depth
+    
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """Aplanar un RandomForestRegressor (o un árbol de regresión) entrenado"""
+        import numpy as np
+        trees = [e.tree_ for e in getattr(model, "estimators_", [model])]
+        offsets = np.cumsum([0] + [t.node_count for t in trees])
+        left, right, feature, threshold, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count) + offset
+            leaf = tree.children_left < 0
+            left.append(np.where(leaf, nodes, tree.children_left + offset))
+            right.append(np.where(leaf, nodes, tree.children_right + offset))
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            value.append(tree.value.reshape(tree.node_count, -1)[:, 0])
+        return cls(np.concatenate(left).astype(np.int64), np.concatenate(right).astype(np.int64),
+                   np.concatenate(feature).astype(np.int64), np.concatenate(threshold),
+                   np.concatenate(value), offsets[:-1].astype(np.int64),
+                   max(t.max_depth for t in trees))
+    
+    @classmethod
+    def from_artifact(cls, artifact: Dict) -> "FlatForest":
+        return cls(*(artifact[name] for name in cls.ARRAYS), depth=artifact["depth"])
+    
+    def to_artifact(self, features: Sequence[str], version: str) -> Dict:
+        """Diccionario de arrays para joblib.dump (sin compresión, para poder usar mmap)"""
+        artifact = {name: getattr(self, name) for name in self.ARRAYS}
+        artifact.update(formato=self.FORMAT, depth=self.depth, features=list(features), version=version)
+        return artifact
+    
+    def predict(self, X):
+        """Media de las hojas alcanzadas, recorriendo todos los árboles y filas a la vez"""
+        import numpy as np
+        # sklearn compara en float32 con umbrales en float64
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.depth):
+            left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=0)
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """Modelo en uso con sus características y versión; se sustituye entero al recargar"""
+    model: object
+    features: Tuple[str, ...]
+    source: str  # "artefacto" o "ejemplo"
+    version: str
+    metadata: Dict = field(default_factory=dict)
+    mmap: bool = False
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_artifact(path: str, metadata_path: Optional[str] = None) -> LoadedModel:
+    """
+    Cargar un artefacto de train_model.py con sus metadatos. Los arrays se
+    proyectan en memoria (mmap) en lugar de copiarse. ValueError si el
+    fichero no coincide con el sha256 de los metadatos (p. ej. copia a medias).
+    """
+    import joblib
+    metadata = {}
+    if metadata_path and os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        if metadata.get("sha256") and metadata["sha256"] != file_sha256(path):
+            raise ValueError(f"{path} no coincide con {metadata_path}")
+    
+    artifact = joblib.load(path, mmap_mode="r")
+    if isinstance(artifact, dict) and artifact.get("formato") == FlatForest.FORMAT:
+        return LoadedModel(FlatForest.from_artifact(artifact), tuple(artifact["features"]),
+                           "artefacto", artifact["version"], metadata, mmap=True)
+    # Estimador sklearn: los entrenados con un DataFrame recuerdan sus columnas
+    names = getattr(artifact, "feature_names_in_", None)
+    features = tuple(names) if names is not None else FEATURES
+    return LoadedModel(artifact, features, "artefacto", metadata.get("version", "sin versión"), metadata)
 
 class WastePredictor:
     """Predictor de desperdicio usando ML"""
     
-    def __init__(self, model_path: str = None):
-        self.model = None
-        self.features = [
-            'num_materiales',
-            'num_piezas',
-            'area_total_materiales',
-            'area_total_piezas',
-            'utilizacion_estimada'
-        ]
-        
-        # Cargar o crear modelo
-        if model_path and os.path.exists(model_path):
-            self.load_model(model_path)
-        else:
-            self.train_dummy_model()
+    def __init__(self, model_path: str = MODEL_PATH, metadata_path: str = None,
+                 watch_interval: float = MODEL_WATCH_INTERVAL):
+        self.model_path = model_path
+        self.metadata_path = metadata_path or (
+            os.path.join(os.path.dirname(model_path), "model_metadata.json") if model_path else None)
+        self.watch_interval = watch_interval
+        self.cache = PredictionCache()
+        self.reloads = 0
+        self.last_error = None
+        self._state = None  # LoadedModel
+        self._signature = None  # (mtime, tamaño) del artefacto y sus metadatos al cargarlo
+        self._lock = threading.Lock()
+    
+    @property
+    def model(self):
+        return self._state.model if self._state is not None else None
+    
+    @property
+    def features(self) -> List[str]:
+        return list(self._state.features if self._state is not None else FEATURES)
+    
+    @property
+    def source(self) -> Optional[str]:
+        return self._state.source if self._state is not None else None
+    
+    def start(self):
+        """Cargar o entrenar el modelo en segundo plano sin retrasar el arranque y vigilar el artefacto"""
+        threading.Thread(target=self._ensure_model, daemon=True).start()
+        if self.watch_interval > 0 and self.model_path:
+            threading.Thread(target=self._watch, daemon=True).start()
+    
+    def _ensure_model(self) -> LoadedModel:
+        """Cargar el modelo la primera vez que se necesita"""
+        state = self._state
+        if state is not None:
+            return state
+        with self._lock, MODEL_LOAD_LOCK:
+            if self._state is None:
+                # Cargar el artefacto o crear un modelo de ejemplo
+                if self.model_path and os.path.exists(self.model_path):
+                    self.load_model(self.model_path)
+                else:
+                    self.train_dummy_model()
+            return self._state
+    
+    def _artifact_signature(self) -> Optional[Tuple]:
+        """Fecha y tamaño del artefacto y de sus metadatos (None si no hay artefacto)"""
+        try:
+            model = os.stat(self.model_path)
+        except OSError:
+            return None
+        try:
+            metadata = os.stat(self.metadata_path)
+            metadata = (metadata.st_mtime_ns, metadata.st_size)
+        except (OSError, TypeError):
+            metadata = None
+        return (model.st_mtime_ns, model.st_size, metadata)
+    
+    def _watch(self):
+        """Recargar el modelo cuando cambian el artefacto o sus metadatos"""
+        while True:
+            time.sleep(self.watch_interval)
+            signature = self._artifact_signature()
+            if signature is not None and signature != self._signature and self._state is not None:
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Se reintenta en la siguiente vuelta (p. ej. metadatos aún sin escribir)
+                    self.last_error = str(e)
+    
+    def reload(self) -> Dict:
+        """
+        Cargar de nuevo el artefacto y sustituir el modelo de golpe: las
+        predicciones en curso terminan con el anterior. Si falla, se sigue
+        con el modelo actual y se propaga el error.
+        """
+        if not self.model_path or not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"No hay artefacto en {self.model_path}")
+        with self._lock, MODEL_LOAD_LOCK:
+            self.load_model(self.model_path)
+            self.reloads += 1
+        return self.get_model_info()
     
     def train_dummy_model(self):
         """Entrenar modelo de ejemplo"""
-        # Datos de ejemplo basados en el artículo
-        data = {
-            'num_materiales': [1, 2, 1, 3],
-            'num_piezas': [2, 4, 3, 5],
-            'area_total_materiales': [7000, 15000, 8000, 20000],
-            'area_total_piezas': [5000, 12000, 6500, 17000],
-            'utilizacion_estimada': [0.71, 0.80, 0.81, 0.85],
-            'waste': [2000, 3000, 1500, 3000]
-        }
+        import numpy as np
+        from sklearn.ensemble import RandomForestRegressor
         
-        df = pd.DataFrame(data)
-        X = df[self.features]
-        y = df['waste']
+        # Datos de ejemplo basados en el artículo (columnas en el orden de FEATURES)
+        X = np.array([
+            [1, 2, 7000, 5000, 0.71],
+            [2, 4, 15000, 12000, 0.80],
+            [1, 3, 8000, 6500, 0.81],
+            [3, 5, 20000, 17000, 0.85]
+        ])
+        y = np.array([2000, 3000, 1500, 3000])
         
         # Entrenar modelo simple
-        self.model = RandomForestRegressor(n_estimators=10, random_state=42)
-        self.model.fit(X, y)
+        model = RandomForestRegressor(n_estimators=10, random_state=42)
+        model.fit(X, y)
+        self._state = LoadedModel(model, FEATURES, "ejemplo", "ejemplo")
     
     def predict(self, features: Dict) -> Dict:
         """Predecir desperdicio"""
+        import numpy as np
+        X = np.array([[features.get(f, 0) for f in self.features]], dtype=float)
+        return self.predict_batch(X)[0]
+    
+    def predict_requests(self, requests: Sequence[Dict]) -> List[Dict]:
+        """Predecir el desperdicio de solicitudes con las características del modelo cargado"""
+        try:
+            state = self._ensure_model()
+        except Exception:
+            state = None  # _predict recurre a la estimación simple
+        features = state.features if state is not None else FEATURES
+        return self._predict(feature_matrix(requests, features), state, features)
+    
+    def predict_batch(self, X) -> List[Dict]:
+        """
+        Predecir el desperdicio de muchas filas de características (matriz
+        n x len(features)) con una sola llamada al modelo para las que no
+        estén ya en la caché
+        """
+        try:
+            state = self._ensure_model()
+        except Exception:
+            state = None
+        return self._predict(X, state, state.features if state is not None else FEATURES)
+    
+    def _predict(self, X, state: Optional[LoadedModel], features: Sequence[str]) -> List[Dict]:
+        """Predicciones con un modelo concreto, aunque entretanto se recargue otro"""
+        import numpy as np
+        features = list(features)
+        X = np.asarray(X, dtype=float).reshape(-1, len(features))
         try:
-            # Preparar características
-            X = np.array([[features.get(f, 0) for f in self.features]])
+            if state is None:
+                raise RuntimeError("Modelo no disponible")
             
-            # Predecir
-            waste_pred = self.model.predict(X)[0]
+            # Las filas repetidas o ya vistas no vuelven al modelo (la versión forma parte de la clave)
+            keys = [(state.version,) + tuple(row) for row in X.round(6).tolist()]
+            waste = np.empty(len(X))
+            missing = {}
+            for i, key in enumerate(keys):
+                value = self.cache.get(key) if key not in missing else None
+                if value is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    waste[i] = value
+            if missing:
+                rows = [indices[0] for indices in missing.values()]
+                with warnings.catch_warnings():
+                    # Las columnas ya van en el orden de feature_names_in_
+                    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+                    predicted = state.model.predict(X[rows])
+                for (key, indices), value in zip(missing.items(), np.asarray(predicted).tolist()):
+                    waste[indices] = value
+                    self.cache.put(key, value)
             
             # Calcular confianza (simplificado)
-            confidence = min(0.95, 0.7 + (features.get('utilizacion_estimada', 0) * 0.3))
+            utilization = X[:, features.index('utilizacion_estimada')]
+            pieces = X[:, features.index('num_piezas')]
+            confidence = np.minimum(0.95, 0.7 + utilization * 0.3)
             
             # Generar recomendaciones
-            recommendations = []
-            if features.get('utilizacion_estimada', 0) < 0.7:
-                recommendations.append("Considera usar materiales de diferentes tamaños")
-            if features.get('num_piezas', 0) > 10:
-                recommendations.append("Problema complejo, el tiempo de optimización puede ser mayor")
-            
-            return {
-                "waste": float(waste_pred),
-                "confidence": float(confidence),
-                "recommendations": recommendations
-            }
-            
+            results = []
+            for i in range(len(X)):
+                recommendations = []
+                if utilization[i] < 0.7:
+                    recommendations.append("Considera usar materiales de diferentes tamaños")
+                if pieces[i] > 10:
+                    recommendations.append("Problema complejo, el tiempo de optimización puede ser mayor")
+                results.append({
+                    "waste": float(waste[i]),
+                    "confidence": float(confidence[i]),
+                    "recommendations": recommendations
+                })
+            return results
+        
         except Exception as e:
             # Fallback a estimación simple
-            estimated_waste = features.get('area_total_materiales', 0) * 0.15
-            return {
+            areas = X[:, features.index('area_total_materiales')] * 0.15
+            return [{
                 "waste": float(estimated_waste),
                 "confidence": 0.5,
                 "recommendations": ["Usando estimación básica - modelo no disponible"],
                 "error": str(e)
-            }
+            } for estimated_waste in areas.tolist()]
     
     def get_model_info(self) -> Dict:
         """Información del modelo"""
+        state = self._state
+        metadata = state.metadata if state is not None else {}
         return {
-            "type": "RandomForestRegressor",
+            "type": metadata.get("model_type", "RandomForestRegressor"),
             "features": self.features,
-            "trained": self.model is not None,
-            "version": "1.0"
+            "trained": state is not None,
+            "source": state.source if state is not None else None,
+            "version": state.version if state is not None else None,
+            "trained_at": metadata.get("trained_at"),
+            "performance": metadata.get("performance"),
+            "mmap": state.mmap if state is not None else False,
+            "artifact": self.model_path,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "cache": self.cache.get_stats()
         }
     
     def save_model(self, path: str):
         """Guardar modelo"""
-        if self.model:
+        if self.model is not None:
+            import joblib
             joblib.dump(self.model, path)
     
     def load_model(self, path: str):
-        """Cargar modelo"""
-        self.model = joblib.load(path)
\ No newline at end of file
+        """Cargar un artefacto y sustituir el modelo en uso"""
+        # Firma antes de leer: un cambio durante la carga se recoge en la siguiente vuelta
+        signature = self._artifact_signature() if path == self.model_path else None
+        state = read_artifact(path, self.metadata_path)
+        self._state = state
+        self._signature = signature
+        self.last_error = None
+        self.cache.clear()
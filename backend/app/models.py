@@ -2,7 +2,7 @@
 Modelos Pydantic para la API
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 # Modelos de entrada (request)
@@ -13,6 +13,7 @@ class MaterialInput(BaseModel):
     alto: float = Field(..., gt=0, description="Alto del material en cm")
     cantidad: int = Field(..., gt=0, description="Cantidad disponible")
     nombre: Optional[str] = Field(None, description="Nombre identificador")
+    retal: bool = Field(False, description="Retal del inventario (lo añade usar_retales)")
 
 class PieceInput(BaseModel):
     """Modelo para pieza de entrada"""
@@ -20,12 +21,24 @@ class PieceInput(BaseModel):
     alto: float = Field(..., gt=0, description="Alto de la pieza en cm")
     demanda: int = Field(..., gt=0, description="Cantidad requerida")
     nombre: Optional[str] = Field(None, description="Nombre identificador")
+    rotable: bool = Field(True, description="Permitir girar la pieza 90°")
 
 class OptimizationConfig(BaseModel):
     """Configuración de optimización"""
     usar_sustitucion: bool = Field(True, description="Usar variantes de sustitución")
     max_patrones: int = Field(1000, description="Máximo número de patrones a generar")
-    tiempo_limite: int = Field(300, description="Tiempo límite en segundos")
+    tiempo_limite: int = Field(300, description="Tiempo límite en segundos (el máximo con modo auto)")
+    modo: Literal["exacto", "columnas", "rapido", "auto"] = Field(
+        "exacto", description="exacto: generación de columnas + MIP; columnas: sin MIP; "
+        "rapido: heurísticas constructivas; auto: modo y tiempo límite según el modelo de enrutado")
+    solver: Literal["cbc", "highs"] = Field(
+        "cbc", description="Backend del modo exacto: cbc (PuLP) o highs (scipy, en proceso)")
+    etapas: Optional[Literal[2, 3]] = Field(
+        None, description="Guillotina por etapas (2 o 3) para seccionadora; sin valor, guillotina libre")
+    kerf: float = Field(0, ge=0, description="Ancho de la hoja de sierra en cm (sólo con etapas)")
+    recorte: float = Field(0, ge=0, description="Recorte de cada canto de la placa en cm (sólo con etapas)")
+    usar_retales: bool = Field(
+        False, description="Ofrecer como materiales los retales del inventario que admitan alguna pieza")
 
 class OptimizationRequest(BaseModel):
     """Request completo para optimización"""
@@ -33,6 +46,39 @@ class OptimizationRequest(BaseModel):
     piezas: List[PieceInput]
     config: Optional[OptimizationConfig] = None
 
+class OrderInput(BaseModel):
+    """Pedido dentro de una consolidación"""
+    id: str = Field(..., description="Identificador del pedido")
+    piezas: List[PieceInput]
+
+class ConsolidationRequest(BaseModel):
+    """Varios pedidos que comparten materiales, resueltos juntos"""
+    materiales: List[MaterialInput]
+    pedidos: List[OrderInput] = Field(..., min_length=1, description="Pedidos en orden de prioridad")
+    config: Optional[OptimizationConfig] = None
+
+class ItemRef(BaseModel):
+    """Pieza o material de una solución previa: por medidas y, si hay varios iguales, por nombre"""
+    ancho: float = Field(..., gt=0)
+    alto: float = Field(..., gt=0)
+    nombre: Optional[str] = None
+
+class DemandChange(ItemRef):
+    """Nueva demanda de una pieza existente (0 la quita)"""
+    demanda: int = Field(..., ge=0)
+
+class StockChange(ItemRef):
+    """Nueva cantidad de un material existente (0 lo quita)"""
+    cantidad: int = Field(..., ge=0)
+
+class ReoptimizationRequest(BaseModel):
+    """Cambio pequeño sobre la instancia de una solución previa"""
+    demandas: List[DemandChange] = Field(default_factory=list)
+    nuevas_piezas: List[PieceInput] = Field(default_factory=list)
+    existencias: List[StockChange] = Field(default_factory=list)
+    nuevos_materiales: List[MaterialInput] = Field(default_factory=list)
+    config: Optional[OptimizationConfig] = Field(None, description="Por defecto, la de la solución previa")
+
 # Modelos de salida (response)
 
 class CuttingPattern(BaseModel):
@@ -60,4 +106,19 @@ class OptimizationResponse(BaseModel):
     patrones_utilizados: int
     instrucciones: List[str]
     visualizacion_url: Optional[str] = None
-    resumen: dict
\ No newline at end of file
+    resumen: dict
+
+class ConsolidationResponse(OptimizationResponse):
+    """Response de una consolidación: la solución conjunta y su reparto por pedido"""
+    pedidos: List[dict]
+    sobrantes: List[dict]
+
+class JobStatus(BaseModel):
+    """Estado de un trabajo de optimización asíncrono"""
+    id: str
+    estado: str
+    creado: datetime
+    actualizado: datetime
+    progreso: Optional[dict] = None
+    resultado: Optional[OptimizationResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,295 @@
+"""
+Inventario de retales: rectángulos sobrantes de los planes ejecutados,
+indexados por medidas para encontrar rápido los que admiten una pieza y
+ofrecidos al optimizador como materiales antes que las placas nuevas
+"""
+import bisect
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Configuración por variables de entorno
+OFFCUT_MIN_SIDE = float(os.environ.get("OFFCUT_MIN_SIDE", 10))  # lado mínimo aprovechable
+OFFCUT_MAX_TYPES = int(os.environ.get("OFFCUT_MAX_TYPES", 8))  # medidas de retal por solicitud
+OFFCUT_DB = os.environ.get("OFFCUT_DB")  # ruta SQLite opcional
+
+DECIMALS = 6
+
+
+class OffcutConflict(Exception):
+    """El plan ya se registró o usa retales que ya no están en el inventario"""
+
+
+@dataclass(frozen=True)
+class Offcut:
+    """Retal en el almacén: medidas, material de origen y plan que lo dejó"""
+    id: int
+    width: float
+    height: float
+    material: Optional[str] = None
+    source: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "ancho": self.width, "alto": self.height,
+                "material": self.material, "origen": self.source}
+
+
+def leftover_rectangles(layout: Dict, min_side: float = OFFCUT_MIN_SIDE) -> List[Tuple[float, float, float, float]]:
+    """
+    Rectángulos libres disjuntos (x, y, ancho, alto) de un layout con ambos
+    lados de al menos min_side, de mayor a menor área.
+
+    Se parte de los rectángulos libres maximales de MaxRects tras colocar
+    las piezas y se va tomando el mayor, que pasa a estar ocupado.
+    """
+    from .heuristics import MaxRectsPacker
+
+    width, height = layout["material"]
+    packer = MaxRectsPacker(width, height)
+    for piece_width, piece_height, x, y, rotated in layout["pieces"]:
+        w, h = (piece_height, piece_width) if rotated else (piece_width, piece_height)
+        packer.place(x, y, w, h)
+
+    rectangles = []
+    while True:
+        free = packer.free
+        usable = free[(free[:, 2] >= min_side) & (free[:, 3] >= min_side)]
+        if not len(usable):
+            return rectangles
+        x, y, w, h = usable[(usable[:, 2] * usable[:, 3]).argmax()].tolist()
+        rectangles.append((x, y, w, h))
+        packer.place(x, y, w, h)
+
+
+class OffcutIndex:
+    """
+    Retales ordenados por ancho con un árbol de segmentos del alto máximo
+    de cada tramo. Los que admiten w x h (ancho >= w y alto >= h) se
+    enumeran en O(log n) por resultado: búsqueda binaria del primer ancho
+    válido y descenso sólo por los tramos con algún alto suficiente.
+
+    Las bajas anulan su hoja en O(log n); las altas se acumulan y el
+    índice se reconstruye en la siguiente consulta.
+    """
+
+    def __init__(self):
+        self._items = {}  # id -> Offcut
+        self._order = []  # retales indexados, por ancho
+        self._widths = []
+        self._tree = []
+        self._size = 0
+        self._position = {}  # id -> hoja
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Offcut]:
+        return iter(self._items.values())
+
+    def get(self, offcut_id: int) -> Optional[Offcut]:
+        return self._items.get(offcut_id)
+
+    def add(self, offcut: Offcut):
+        self._items[offcut.id] = offcut
+        self._dirty = True
+
+    def remove(self, offcut_id: int):
+        self._items.pop(offcut_id, None)
+        leaf = self._position.pop(offcut_id, None)
+        if leaf is not None and not self._dirty:
+            self._set(leaf, -1.0)
+
+    def _set(self, leaf: int, value: float):
+        i = leaf + self._size
+        self._tree[i] = value
+        i //= 2
+        while i:
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+            i //= 2
+
+    def _rebuild(self):
+        self._order = sorted(self._items.values(), key=lambda o: (o.width, o.height, o.id))
+        self._widths = [o.width for o in self._order]
+        self._position = {o.id: leaf for leaf, o in enumerate(self._order)}
+        self._size = 1
+        while self._size < len(self._order):
+            self._size *= 2
+        self._tree = [-1.0] * (2 * self._size)
+        for leaf, o in enumerate(self._order):
+            self._tree[self._size + leaf] = o.height
+        for i in range(self._size - 1, 0, -1):
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+        self._dirty = False
+
+    def query(self, width: float, height: float, limit: int = None) -> List[Offcut]:
+        """Retales con ancho >= width y alto >= height, de menor a mayor ancho"""
+        if self._dirty:
+            self._rebuild()
+        found = []
+        start = bisect.bisect_left(self._widths, width - 10 ** -DECIMALS)
+        if not self._order or start >= len(self._order):
+            return found
+        # Descenso en profundidad de izquierda a derecha sobre [start, n)
+        stack = [(1, 0, self._size)]
+        while stack and (limit is None or len(found) < limit):
+            node, lo, hi = stack.pop()
+            if hi <= start or self._tree[node] < height - 10 ** -DECIMALS:
+                continue
+            if hi - lo == 1:
+                found.append(self._order[lo])
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return found
+
+    def fitting(self, width: float, height: float, rotable: bool = True,
+                limit: int = None) -> List[Offcut]:
+        """Retales que admiten una pieza, girada o no si se permite"""
+        found = self.query(width, height, limit)
+        if rotable and abs(width - height) > 10 ** -DECIMALS:
+            seen = {o.id for o in found}
+            found += [o for o in self.query(height, width, limit) if o.id not in seen]
+            found.sort(key=lambda o: (o.width * o.height, o.id))
+            if limit is not None:
+                found = found[:limit]
+        return found
+
+
+class OffcutInventory:
+    """Almacén de retales en memoria con persistencia SQLite opcional"""
+
+    def __init__(self, db_path: Optional[str] = OFFCUT_DB, min_side: float = OFFCUT_MIN_SIDE):
+        self.db_path = db_path
+        self.min_side = min_side
+        self._index = OffcutIndex()
+        self._sources = set()  # planes ya registrados
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._db = None
+        self.consumed = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS retales (id INTEGER PRIMARY KEY, ancho REAL NOT NULL, "
+                "alto REAL NOT NULL, material TEXT, origen TEXT, creado TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS planes (origen TEXT PRIMARY KEY)")
+            self._db.commit()
+            for row in self._db.execute("SELECT id, ancho, alto, material, origen FROM retales"):
+                self._index.add(Offcut(*row))
+                self._next_id = max(self._next_id, row[0] + 1)
+            self._sources = {row[0] for row in self._db.execute("SELECT origen FROM planes")}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def find(self, width: float, height: float, rotable: bool = True,
+             material: Optional[str] = None, limit: int = None) -> List[Offcut]:
+        """Retales que admiten una pieza w x h (de un material si se indica)"""
+        with self._lock:
+            if material is None:
+                return self._index.fitting(width, height, rotable, limit)
+            found = self._index.fitting(width, height, rotable)
+        found = [o for o in found if o.material == material]
+        return found[:limit] if limit is not None else found
+
+    def materials_for(self, request: Dict, max_types: int = OFFCUT_MAX_TYPES) -> List[Dict]:
+        """
+        Retales como materiales de una solicitud (con "retal": True): los
+        del mismo material que admiten alguna de sus piezas, agrupados por
+        medidas y empezando por los más pequeños, hasta max_types medidas.
+        """
+        names = {m.get("nombre") for m in request["materiales"]}
+        candidates = {}
+        with self._lock:
+            for pieza in request["piezas"]:
+                for offcut in self._index.fitting(pieza["ancho"], pieza["alto"],
+                                                  pieza.get("rotable", True)):
+                    if offcut.material in names:
+                        candidates[offcut.id] = offcut
+
+        groups = {}
+        for offcut in candidates.values():
+            key = (round(offcut.width, DECIMALS), round(offcut.height, DECIMALS), offcut.material)
+            groups[key] = groups.get(key, 0) + 1
+        chosen = sorted(groups.items(), key=lambda item: (item[0][0] * item[0][1], item[0][:2]))
+        return [{"ancho": w, "alto": h, "cantidad": n, "nombre": material, "retal": True}
+                for (w, h, material), n in chosen[:max_types]]
+
+    def apply_plan(self, source: str, layouts: Sequence[Dict],
+                   materials: Sequence[Dict]) -> Tuple[List[Offcut], List[Offcut]]:
+        """
+        Registrar un plan ejecutado: se consumen los retales que usa y se
+        guardan los rectángulos que deja cada placa. Devuelve (consumidos,
+        nuevos). OffcutConflict si ya se registró o faltan sus retales.
+        """
+        def name_of(layout):
+            width, height = (round(v, DECIMALS) for v in layout["material"])
+            for m in materials:
+                if ((round(m["ancho"], DECIMALS), round(m["alto"], DECIMALS)) == (width, height)
+                        and bool(m.get("retal")) == bool(layout.get("offcut"))):
+                    return m.get("nombre")
+            return None
+
+        leftovers = []
+        for layout in layouts:
+            rectangles = leftover_rectangles(layout, self.min_side)
+            leftovers += [(w, h, name_of(layout)) for _, _, w, h in rectangles] * layout["count"]
+
+        with self._lock:
+            if source in self._sources:
+                raise OffcutConflict(f"El plan {source} ya está registrado")
+
+            # Retales que consume el plan, comprobados antes de modificar nada
+            consumed = []
+            for layout in layouts:
+                if not layout.get("offcut"):
+                    continue
+                width, height = (round(v, DECIMALS) for v in layout["material"])
+                material = name_of(layout)
+                taken = {o.id for o in consumed}
+                available = [o for o in self._index.query(width, height)
+                             if round(o.width, DECIMALS) == width and round(o.height, DECIMALS) == height
+                             and o.material == material and o.id not in taken]
+                if len(available) < layout["count"]:
+                    raise OffcutConflict(f"Faltan retales {width:g}x{height:g} en el inventario")
+                consumed += available[:layout["count"]]
+
+            for offcut in consumed:
+                self._index.remove(offcut.id)
+            created = []
+            for w, h, material in leftovers:
+                offcut = Offcut(self._next_id, round(w, DECIMALS), round(h, DECIMALS), material, source)
+                self._next_id += 1
+                self._index.add(offcut)
+                created.append(offcut)
+            self._sources.add(source)
+            self.consumed += len(consumed)
+
+            if self._db is not None:
+                self._db.executemany("DELETE FROM retales WHERE id = ?", [(o.id,) for o in consumed])
+                now = datetime.now().isoformat()
+                self._db.executemany(
+                    "INSERT INTO retales (id, ancho, alto, material, origen, creado) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(o.id, o.width, o.height, o.material, o.source, now) for o in created]
+                )
+                self._db.execute("INSERT INTO planes (origen) VALUES (?)", (source,))
+                self._db.commit()
+        return consumed, created
+
+    def get_stats(self) -> Dict:
+        """Retales en almacén y su área"""
+        with self._lock:
+            return {
+                "retales": len(self._index),
+                "area": sum(o.width * o.height for o in self._index),
+                "consumidos": self.consumed,
+                "planes": len(self._sources),
+                "persistente": self._db is not None
+            }
@@ -1,20 +1,70 @@
 """
 Optimizador principal con todas las funcionalidades
+
+Sólo lo importan los procesos trabajadores (el forkserver lo precarga):
+numpy y scipy se cargan aquí y no al arrancar la API.
 """
 import numpy as np
-import pulp
+import os
 import time
-import json
 import hashlib
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+import math
+import functools
+from contextlib import contextmanager
+from typing import Callable, List, Dict, Tuple, Optional
+from dataclasses import dataclass, field, fields, asdict
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import io
 import base64
 
-@dataclass
+from .pricing import guillotine_knapsack, EPS
+from .heuristics import PACKERS, pack, sequential_pack
+from .staged import cut_sequence, fill_sheet_staged, staged_knapsack
+from .pattern_matrix import PLACEMENT_DTYPE, PatternIndex, PatternMatrix, dominating_columns
+from .backends import MasterModel, MIPResult, OPTIMAL, DEFAULT_BACKEND, get_backend
+from .visualization import render_png
+from .stats import SolverStats
+
+# Parada por cola larga en la generación de columnas
+TAILING_WINDOW = 10
+TAILING_TOLERANCE = 1e-4
+# Segundos para las heurísticas constructivas: tras la primera, las demás
+# sólo se prueban si caben
+HEURISTIC_TIME_BUDGET = float(os.environ.get("OPTIMIZER_HEURISTIC_BUDGET", 0.5))
+
+def _timed(phase: str):
+    """Contar el tiempo de un método en una fase de la resolución (ver CuttingOptimizer2D._phase)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._phase(phase):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _slots(cls):
+    """
+    __slots__ para una dataclass congelada, como dataclass(slots=True) de
+    Python 3.10+: sin __dict__ por instancia.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {k: v for k, v in cls.__dict__.items()
+                 if k not in names and k not in ("__dict__", "__weakref__")}
+    namespace["__slots__"] = names
+    
+    # pickle restaura los atributos sin pasar por el __setattr__ congelado
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in names)
+    
+    def __setstate__(self, state):
+        for name, value in zip(names, state):
+            object.__setattr__(self, name, value)
+    
+    namespace["__getstate__"] = __getstate__
+    namespace["__setstate__"] = __setstate__
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+@_slots
+@dataclass(frozen=True)
 class Piece:
     """Representa una pieza a cortar"""
     id: int
@@ -23,15 +73,18 @@ class Piece:
     demand: int
     name: str = ""
     area: float = 0
+    can_rotate: bool = True
     
     def __post_init__(self):
-        self.area = self.width * self.height
+        object.__setattr__(self, "area", self.width * self.height)
     
     def rotate(self):
         """Devuelve una versión rotada"""
-        return Piece(self.id, self.height, self.width, self.demand, self.name + " (R)")
+        return Piece(self.id, self.height, self.width, self.demand, self.name + " (R)",
+                     can_rotate=self.can_rotate)
 
-@dataclass
+@_slots
+@dataclass(frozen=True)
 class Material:
     """Representa material de entrada"""
     id: int
@@ -40,52 +93,88 @@ class Material:
     quantity: int
     name: str = ""
     area: float = 0
+    offcut: bool = False  # retal del inventario
     
     def __post_init__(self):
-        self.area = self.width * self.height
+        object.__setattr__(self, "area", self.width * self.height)
+
+@_slots
+@dataclass(frozen=True)
+class SolverConfig:
+    """Parámetros de una resolución"""
+    use_substitution: bool = True
+    max_patterns: int = 1000
+    time_limit: int = 300
+    max_iterations: int = 100
+    gap_rel: float = 0.01
+    mode: str = "exacto"  # "exacto" (generación de columnas + MIP), "columnas" (sin MIP) o "rapido" (heurísticas)
+    backend: str = DEFAULT_BACKEND  # "cbc" (PuLP) o "highs" (scipy)
+    stages: int = 0  # 0: guillotina libre; 2 o 3: guillotina por etapas
+    kerf: float = 0.0  # ancho de la hoja de sierra (sólo por etapas)
+    trim: float = 0.0  # recorte de cada canto de la placa (sólo por etapas)
+
+@_slots
+@dataclass(frozen=True)
+class CuttingProblem:
+    """Instancia inmutable: materiales, piezas y configuración"""
+    materials: Tuple[Material, ...]
+    pieces: Tuple[Piece, ...]
+    config: SolverConfig = field(default_factory=SolverConfig)
+    # Arranque en caliente: "layouts" de una solución previa de una instancia parecida
+    warm_start: Tuple = ()
+    # Columnas iniciales: "pool" de una solución previa de la que ésta es una variación
+    pattern_pool: Tuple = ()
 
 class CuttingPattern:
-    """Patrón de corte individual"""
-    def __init__(self, pattern_id: int, material: Material):
+    """
+    Patrón de corte individual: vista sobre sus colocaciones en la
+    matriz de patrones (no copia los datos)
+    """
+    __slots__ = ("id", "material", "_matrix", "_pieces")
+    
+    def __init__(self, pattern_id: int, material: Material, matrix: PatternMatrix,
+                 pieces: List[Piece]):
         self.id = pattern_id
         self.material = material
-        self.pieces = []  # (piece, x, y, rotated)
-        self.waste = material.area
-        self.piece_counts = {}
-        
-    def add_piece(self, piece: Piece, x: float, y: float, rotated: bool):
-        """Añade una pieza al patrón"""
-        piece_width = piece.height if rotated else piece.width
-        piece_height = piece.width if rotated else piece.height
-        
-        # Verificar que quepa
-        if (x + piece_width <= self.material.width and 
-            y + piece_height <= self.material.height):
-            
-            self.pieces.append((piece, x, y, rotated))
-            self.waste -= piece.area
-            
-            if piece.id not in self.piece_counts:
-                self.piece_counts[piece.id] = 0
-            self.piece_counts[piece.id] += 1
-            
-            return True
-        return False
+        self._matrix = matrix
+        self._pieces = pieces
+    
+    @property
+    def pieces(self) -> List[Tuple[Piece, float, float, bool]]:
+        """Colocaciones (piece, x, y, rotated)"""
+        return [(self._pieces[row], x, y, rotated)
+                for row, x, y, rotated in self._matrix.placements(self.id).tolist()]
+    
+    @property
+    def waste(self) -> float:
+        return float(self._matrix.waste[self.id])
+    
+    @property
+    def piece_counts(self) -> Dict[int, int]:
+        return self._matrix.piece_counts(self.id)
 
 class CuttingOptimizer2D:
-    """Optimizador principal"""
+    """
+    Optimizador principal.
     
-    def __init__(self):
+    Cada instancia es el contexto de una resolución: para resolver en
+    paralelo se crea una por solicitud (ver solve_problem) y sólo se
+    comparte, si se quiere, el agregador de estadísticas.
+    """
+    
+    def __init__(self, problem: CuttingProblem = None, stats: SolverStats = None):
         self.materials = []
         self.pieces = []
-        self.patterns = []
         self.substitution_patterns = []
         self.solution = None
-        self.stats = {
-            "total_optimizations": 0,
-            "avg_waste": 0,
-            "avg_time": 0
-        }
+        self.stats = stats if stats is not None else SolverStats()
+        self._reset_timings()
+        self.set_config()
+        self._reset_patterns()
+        self.warm_start = ()
+        self.pattern_pool = ()
+        if problem is not None:
+            self.load_problem(problem)
         
     def add_material(self, width: float, height: float, quantity: int, name: str = ""):
         """Añadir material"""
@@ -94,9 +183,10 @@ class CuttingOptimizer2D:
         self.materials.append(material)
         return material_id
     
-    def add_piece(self, id: int, width: float, height: float, demand: int, name: str = ""):
+    def add_piece(self, id: int, width: float, height: float, demand: int, name: str = "",
+                  can_rotate: bool = True):
         """Añadir pieza"""
-        piece = Piece(id, width, height, demand, name)
+        piece = Piece(id, width, height, demand, name, can_rotate=can_rotate)
         self.pieces.append(piece)
         return piece
     
@@ -104,216 +194,813 @@ class CuttingOptimizer2D:
         """Limpiar datos anteriores"""
         self.materials = []
         self.pieces = []
-        self.patterns = []
         self.substitution_patterns = []
         self.solution = None
+        self._reset_patterns()
+        self.warm_start = ()
+        self.pattern_pool = ()
     
-    def generate_patterns(self, max_patterns: int = 1000):
-        """Generar patrones de corte"""
-        # Implementación simplificada
-        # En producción, usar algoritmo completo del artículo
+    def set_config(self, use_substitution: bool = True, max_patterns: int = 1000,
+                   time_limit: int = 300, max_iterations: int = 100, gap_rel: float = 0.01,
+                   mode: str = "exacto", backend: str = DEFAULT_BACKEND, stages: int = 0,
+                   kerf: float = 0.0, trim: float = 0.0):
+        """Configurar parámetros de optimización"""
+        self.config = SolverConfig(use_substitution, max_patterns, time_limit,
+                                   max_iterations, gap_rel, mode, backend, stages, kerf, trim)
+        self.backend = get_backend(backend)
+    
+    def load_problem(self, problem: CuttingProblem):
+        """Cargar una instancia inmutable como datos de este contexto"""
+        self.clear()
+        self.materials = list(problem.materials)
+        self.pieces = list(problem.pieces)
+        self.set_config(**asdict(problem.config))
+        self.warm_start = problem.warm_start
+        self.pattern_pool = problem.pattern_pool
+    
+    def to_problem(self) -> CuttingProblem:
+        """Instancia inmutable con los datos actuales"""
+        return CuttingProblem(tuple(self.materials), tuple(self.pieces), self.config,
+                              tuple(self.warm_start), tuple(self.pattern_pool))
+    
+    def _reset_timings(self):
+        """Tiempos por fase (segundos) y tamaño de los modelos de la última resolución"""
+        self.timings = {}
+        self.model_size = {}
+        self._phases = []
+        self._phase_start = None
+    
+    @contextmanager
+    def _phase(self, name: str):
+        """
+        Medir una fase: patterns (patrones iniciales y pricing), heuristic,
+        model_build, lp, mip o extraction. Los tiempos son exclusivos: lo
+        que dura una fase anidada no cuenta en la que la contiene.
+        """
+        now = time.perf_counter()
+        if self._phases:
+            outer = self._phases[-1]
+            self.timings[outer] = self.timings.get(outer, 0.0) + now - self._phase_start
+        self._phases.append(name)
+        self._phase_start = now
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.timings[name] = self.timings.get(name, 0.0) + now - self._phase_start
+            self._phases.pop()
+            self._phase_start = now
+    
+    def _record_size(self, prefix: str, model: MasterModel):
+        """Variables, restricciones y no ceros del último modelo de un tipo (lp o mip)"""
+        self.model_size[f"{prefix}_variables"] = len(model.costs)
+        self.model_size[f"{prefix}_constraints"] = model.demand.shape[0] + model.stock.shape[0]
+        self.model_size[f"{prefix}_nonzeros"] = model.demand.nnz + model.stock.nnz
+    
+    def _reset_patterns(self):
+        """Vaciar el conjunto de patrones y su matriz"""
+        self._pattern_keys = PatternIndex()
+        self._piece_rows = {p.id: r for r, p in enumerate(self.pieces)}
+        self._material_rows = {m.id: r for r, m in enumerate(self.materials)}
+        self._piece_dims = [(p.width, p.height) for p in self.pieces]
+        self.matrix = PatternMatrix(self.pieces, self.materials)
+        # Demanda de piezas que no caben en ninguna placa: queda fuera del
+        # modelo y se informa como sin colocar
+        self._unplaceable = self._unplaceable_demand()
+    
+    def _unplaceable_demand(self) -> Dict[int, int]:
+        """Demanda (por id) de las piezas que no caben en ninguna placa ni giradas"""
+        margin = 2 * self.config.trim if self.config.stages else 0.0
+        unplaceable = {}
+        for piece in self.pieces:
+            sizes = [(piece.width, piece.height)]
+            if piece.can_rotate:
+                sizes.append((piece.height, piece.width))
+            fits = any(w <= m.width - margin + EPS and h <= m.height - margin + EPS
+                       for m in self.materials for w, h in sizes)
+            if piece.demand > 0 and not fits:
+                unplaceable[piece.id] = piece.demand
+        return unplaceable
+    
+    def _servable_demands(self) -> Dict[int, int]:
+        """Demanda por id sin la de piezas que no caben en ninguna placa"""
+        return {p.id: p.demand - self._unplaceable.get(p.id, 0) for p in self.pieces}
+    
+    def _pattern(self, index: int) -> CuttingPattern:
+        """Vista del patrón index"""
+        material = self.materials[self.matrix.material_row(index)]
+        return CuttingPattern(index, material, self.matrix, self.pieces)
+    
+    def _layout(self, index: int) -> Dict:
+        """Patrón index como layout serializable (medidas, colocaciones e ids de pieza)"""
+        pattern = self._pattern(index)
+        placed = pattern.pieces
+        return {
+            "material": [pattern.material.width, pattern.material.height],
+            "pieces": [[piece.width, piece.height, x, y, rotated]
+                       for piece, x, y, rotated in placed],
+            "ids": [piece.id for piece, _, _, _ in placed],
+            "offcut": pattern.material.offcut
+        }
+    
+    def _fitting_placements(self, material: Material,
+                            placements: List[Tuple[Piece, float, float, bool]]):
+        """
+        Colocaciones que caben en el material como (fila de la pieza, x, y,
+        rotated) y clave del patrón (material y piezas por id)
+        """
+        kept, counts = [], {}
+        for piece, x, y, rotated in placements:
+            row = self._piece_rows[piece.id]
+            width, height = self._piece_dims[row]
+            if rotated:
+                width, height = height, width
+            if x + width <= material.width and y + height <= material.height:
+                kept.append((row, x, y, rotated))
+                counts[piece.id] = counts.get(piece.id, 0) + 1
+        # Por etapas sólo valen patrones que la seccionadora puede cortar
+        if self.config.stages and kept and self._cut_sequence(material, kept) is None:
+            kept = []
+        return kept, (material.id, tuple(sorted(counts.items())))
+    
+    def _cut_sequence(self, material: Material, placements: List[Tuple]) -> Optional[List[Dict]]:
+        """Cortes por etapas de unas colocaciones (fila de la pieza, x, y, rotated)"""
+        rects = []
+        for row, x, y, rotated in placements:
+            width, height = self._piece_dims[row]
+            rects.append((x, y, height, width) if rotated else (x, y, width, height))
+        return cut_sequence(material.width, material.height, rects, self.config.kerf,
+                            self.config.trim, self.config.stages)
+    
+    def _store_pattern(self, material: Material, kept: List[Tuple]) -> int:
+        """Guardar en la matriz unas colocaciones ya validadas e indexadas"""
+        array = np.array(kept, dtype=PLACEMENT_DTYPE)
+        waste = material.area - sum(self.pieces[row].area for row, _, _, _ in kept)
+        return self.matrix.add(self._material_rows[material.id], array, waste)
+    
+    def _add_pattern(self, material: Material,
+                     placements: List[Tuple[Piece, float, float, bool]]) -> Optional[CuttingPattern]:
+        """Registrar un patrón si no existe ya uno equivalente"""
+        kept, key = self._fitting_placements(material, placements)
+        if not kept or not self._pattern_keys.add(key, len(self.matrix)):
+            return None
+        return self._pattern(self._store_pattern(material, kept))
+    
+    def _pattern_index(self, material: Material,
+                       placements: List[Tuple[Piece, float, float, bool]]) -> Optional[int]:
+        """Índice del patrón equivalente a unas colocaciones, registrándolo si es nuevo"""
+        kept, key = self._fitting_placements(material, placements)
+        if not kept:
+            return None
+        if key not in self._pattern_keys:
+            self._pattern_keys.add(key, len(self.matrix))
+            self._store_pattern(material, kept)
+        return self._pattern_keys.get(key)
+    
+    def _register_layouts(self, layouts) -> Dict[int, int]:
+        """Registrar las placas de un empaquetado heurístico; devuelve usos por patrón"""
+        counts = {}
+        for material, placements, times in layouts:
+            index = self._pattern_index(
+                material, [(self.pieces[i], x, y, rotated) for i, x, y, rotated in placements])
+            if index is not None:
+                counts[index] = counts.get(index, 0) + times
+        return counts
+    
+    @_timed("heuristic")
+    def _heuristic_packing(self, demands: Dict[int, int] = None, stock: Dict[int, int] = None):
+        """Mejor empaquetado constructivo: (piezas sin colocar, heurística, resultado)"""
+        if demands is None:
+            demands = self._servable_demands()
+        if self.config.stages:
+            result = sequential_pack(
+                lambda material, remaining: fill_sheet_staged(
+                    material, self.pieces, remaining, self.config.stages,
+                    self.config.kerf, self.config.trim),
+                self.materials, self.pieces, demands, stock)
+            return sum(result["unplaced"].values()), f"etapas_{self.config.stages}", result
+        
+        best = None
+        start = time.perf_counter()
+        for runs, packer_cls in enumerate(PACKERS):
+            # Cada empaquetador tarda más o menos lo mismo que los anteriores
+            elapsed = time.perf_counter() - start
+            if runs and elapsed * (runs + 1) / runs > HEURISTIC_TIME_BUDGET:
+                break
+            result = pack(packer_cls, self.materials, self.pieces, demands, stock)
+            missing = sum(result["unplaced"].values())
+            area = sum(m.area * times for m, _, times in result["layouts"])
+            if best is None or (missing, area) < best[0]:
+                best = ((missing, area), packer_cls.name, result)
+        (missing, _), heuristic, result = best
+        return missing, heuristic, result
+    
+    def _translate_layouts(self, previous) -> List[Tuple[Material, List, int]]:
+        """Traducir los layouts de una solución previa a materiales y piezas actuales"""
+        materials = {(round(m.width, 6), round(m.height, 6)): m for m in self.materials}
+        pieces = {(round(p.width, 6), round(p.height, 6)): p for p in self.pieces}
+        layouts = []
+        for layout in previous:
+            material = materials.get(tuple(round(v, 6) for v in layout["material"]))
+            if material is None:
+                continue
+            placements = []
+            for width, height, x, y, rotated in layout["pieces"]:
+                piece = pieces.get((round(width, 6), round(height, 6)))
+                if piece is not None and (piece.can_rotate or not rotated):
+                    placements.append((piece, x, y, rotated))
+            layouts.append((material, placements, layout.get("count", 1)))
+        return layouts
+    
+    def _material_area(self, counts: Dict[int, int]) -> float:
+        return float(self.matrix.area @ self.matrix.vector(counts))
+    
+    def _residual(self, counts: Dict[int, int]) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """Demanda y material que quedan tras unos usos de patrones (por id)"""
+        produced = self.matrix.produced(counts)
+        consumed = self.matrix.consumed(counts)
+        servable = self._servable_demands()
+        demands = {p.id: servable[p.id] - int(round(produced[r])) for r, p in enumerate(self.pieces)}
+        stock = {m.id: m.quantity - int(round(consumed[r])) for r, m in enumerate(self.materials)}
+        return demands, stock
+    
+    def _covers(self, counts: Dict[int, int]) -> bool:
+        """Si unos usos de patrones cubren la demanda sin exceder el material"""
+        demands, stock = self._residual(counts)
+        return all(d <= 0 for d in demands.values()) and all(s >= 0 for s in stock.values())
+    
+    def _start_solution(self) -> Optional[Dict[int, int]]:
+        """
+        Solución inicial para el MIP: empaquetado heurístico o, si es mejor,
+        la solución previa de una instancia parecida completada con la
+        heurística para la demanda que no cubra.
+        
+        Si la heurística no coloca toda la demanda, su plan parcial queda en
+        _partial_packing por si el material no alcanza y el MIP no da plan.
+        """
+        candidates = []
+        missing, heuristic, result = self._heuristic_packing()
+        counts = self._register_layouts(result["layouts"])
+        self._partial_packing = (heuristic, counts) if missing else None
+        if not missing:
+            candidates.append(counts)
         
-        patterns = []
-        pattern_id = 0
+        if self.warm_start:
+            counts = {}
+            for material, placements, times in self._translate_layouts(self.warm_start):
+                index = self._pattern_index(material, placements)
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + times
+            # Descartar usos que excedan el material disponible
+            used = {}
+            for i in sorted(counts):
+                material = self.materials[self.matrix.material_row(i)]
+                counts[i] = max(0, min(counts[i], material.quantity - used.get(material.id, 0)))
+                used[material.id] = used.get(material.id, 0) + counts[i]
+            counts = {i: n for i, n in counts.items() if n > 0}
+            
+            demands, stock = self._residual(counts)
+            if any(d > 0 for d in demands.values()):
+                missing, _, result = self._heuristic_packing(demands, stock)
+                for i, n in self._register_layouts(result["layouts"]).items():
+                    counts[i] = counts.get(i, 0) + n
+            if self._covers(counts):
+                candidates.append(counts)
+        
+        if not candidates:
+            return None
+        return min(candidates, key=self._material_area)
+    
+    @_timed("patterns")
+    def generate_patterns(self, max_patterns: int = 1000):
+        """Generar patrones iniciales (homogéneos) para la generación de columnas"""
+        self._reset_patterns()
         
         for material in self.materials:
-            # Ordenar piezas por área descendente
-            sorted_pieces = sorted(self.pieces, key=lambda p: p.area, reverse=True)
+            # Un patrón homogéneo por pieza: rejilla con la orientación que más rinde
+            for piece in self.pieces:
+                self._add_pattern(material, self._homogeneous_placements(material, piece))
             
-            # Generar algunos patrones básicos
-            # (Para producción, implementar algoritmo completo)
+            # Patrón de máximo aprovechamiento de área
+            _, placements = self._price_material(material, [p.area for p in self.pieces])
+            self._add_pattern(material, placements)
             
-            # Patrón 1: Sin cortar (todo desperdicio)
-            pattern = CuttingPattern(pattern_id, material)
-            patterns.append(pattern)
-            pattern_id += 1
+            # Limitar número de patrones
+            if len(self.matrix) >= max_patterns:
+                break
+        
+        # Toda pieza que cabe necesita algún patrón aunque se haya llegado al
+        # límite: el maestro omitiría su demanda
+        counts = self.matrix.counts
+        for r, piece in enumerate(self.pieces):
+            if piece.id in self._unplaceable or counts.indptr[r + 1] > counts.indptr[r]:
+                continue
+            for material in self.materials:
+                if self._add_pattern(material, self._homogeneous_placements(material, piece)):
+                    break
+        
+        # Columnas de la relajación de una solución previa: la generación
+        # de columnas parte casi de su base óptima
+        for material, placements, _ in self._translate_layouts(self.pattern_pool):
+            if len(self.matrix) >= max_patterns:
+                break
+            self._add_pattern(material, placements)
+        
+        return len(self.matrix)
+    
+    def _homogeneous_placements(self, material: Material, piece: Piece) -> List[Tuple]:
+        """Rejilla de una sola pieza en la orientación que más rinde (o por etapas)"""
+        if self.config.stages:
+            _, best = self._price_material(material, [1.0 if p is piece else 0.0 for p in self.pieces])
+            return best
+        best = []
+        for rotated in ((False, True) if piece.can_rotate else (False,)):
+            w = piece.height if rotated else piece.width
+            h = piece.width if rotated else piece.height
+            cols = int((material.width + EPS) // w)
+            rows = int((material.height + EPS) // h)
+            if cols * rows > len(best):
+                best = [(piece, c * w, r * h, rotated) for c in range(cols) for r in range(rows)]
+        return best
+    
+    @_timed("patterns")
+    def _price_material(self, material: Material, values: List[float]):
+        """Resolver el subproblema de mochila guillotina (libre o por etapas) para un material"""
+        if self.config.stages:
+            value, placements = staged_knapsack(
+                material.width, material.height,
+                [(p.width, p.height) for p in self.pieces], values,
+                allow_rotation=[p.can_rotate for p in self.pieces],
+                stages=self.config.stages, kerf=self.config.kerf, trim=self.config.trim
+            )
+            return value, [(self.pieces[idx], x, y, rotated) for idx, x, y, rotated in placements]
+        value, placements = guillotine_knapsack(
+            material.width, material.height,
+            [(p.width, p.height) for p in self.pieces], values,
+            allow_rotation=[p.can_rotate for p in self.pieces]
+        )
+        return value, [(self.pieces[idx], x, y, rotated) for idx, x, y, rotated in placements]
+    
+    @_timed("model_build")
+    def _master_model(self, demands: Dict[int, int] = None,
+                      stock: Dict[int, int] = None) -> MasterModel:
+        """
+        Problema maestro sobre los patrones actuales en forma matricial.
+        
+        Se omiten las demandas ya cubiertas, la de piezas que no caben en
+        ninguna placa y las filas sin ningún patrón.
+        """
+        if demands is None:
+            demands = self._servable_demands()
+        if stock is None:
+            stock = {m.id: m.quantity for m in self.materials}
+        
+        counts, usage = self.matrix.counts, self.matrix.usage
+        piece_rows = [r for r, p in enumerate(self.pieces)
+                      if demands[p.id] > 0 and counts.indptr[r + 1] > counts.indptr[r]]
+        material_rows = [r for r in range(len(self.materials))
+                         if usage.indptr[r + 1] > usage.indptr[r]]
+        
+        # Objetivo: área de material consumida (la sobreproducción cuenta como pérdida)
+        return MasterModel(
+            costs=self.matrix.area,
+            demand=counts[piece_rows],
+            demand_rhs=np.array([demands[self.pieces[r].id] for r in piece_rows], dtype=float),
+            demand_ids=[self.pieces[r].id for r in piece_rows],
+            stock=usage[material_rows],
+            stock_rhs=np.array([stock[self.materials[r].id] for r in material_rows], dtype=float),
+            stock_ids=[self.materials[r].id for r in material_rows]
+        )
+    
+    def _demanded_area(self) -> float:
+        """Área demandada de piezas que caben en alguna placa"""
+        servable = self._servable_demands()
+        return sum(p.area * servable[p.id] for p in self.pieces)
+    
+    def column_generation(self, deadline: float = None, progress: Callable = None,
+                          should_stop: Callable[[], bool] = None) -> Dict:
+        """
+        Generación de columnas Gilmore-Gomory sobre la relajación lineal.
+        
+        Los duales de demanda valoran cada pieza y la mochila guillotina
+        propone el patrón de menor coste reducido por material. Las cotas
+        lagrangiana y de Farley acotan el área mínima consumible.
+        """
+        iterations = 0
+        lp_bound = None
+        lp_values = {}
+        bound = None
+        history = []
+        demanded_area = self._demanded_area()
+        demands = self._servable_demands()
+        
+        while iterations < self.config.max_iterations and len(self.matrix) < self.config.max_patterns:
+            if deadline is not None and time.time() >= deadline:
+                break
+            if should_stop is not None and should_stop():
+                break
+            if not len(self.matrix):  # ninguna pieza cabe en ningún material
+                break
+            iterations += 1
             
-            # Patrón 2: Intentar colocar la pieza más grande
-            if sorted_pieces:
-                largest_piece = sorted_pieces[0]
-                pattern = CuttingPattern(pattern_id, material)
-                
-                # Intentar sin rotar
-                if largest_piece.width <= material.width and largest_piece.height <= material.height:
-                    pattern.add_piece(largest_piece, 0, 0, False)
-                    patterns.append(pattern)
-                    pattern_id += 1
+            model = self._master_model()
+            self._record_size("lp", model)
+            with self._phase("lp"):
+                lp = self.backend.solve_lp(model)
+            if lp.status != OPTIMAL:
+                break
+            lp_bound = lp.objective - demanded_area
+            lp_values = dict(enumerate(lp.x.tolist()))
+            
+            # Cola larga: el objetivo apenas mejora en las últimas iteraciones
+            history.append(lp.objective)
+            if len(history) > TAILING_WINDOW:
+                previous = history[-TAILING_WINDOW - 1]
+                if previous - history[-1] <= TAILING_TOLERANCE * previous:
+                    break
+            
+            # Valor de cada pieza = dual de su restricción de demanda
+            values = [lp.demand_duals.get(piece.id, 0.0) for piece in self.pieces]
+            
+            added = 0
+            dual_demand = sum(v * demands[p.id] for v, p in zip(values, self.pieces))
+            lagrangian = dual_demand
+            ratio = 1.0
+            for material in self.materials:
+                material_dual = lp.stock_duals.get(material.id, 0.0)
                 
-                # Intentar rotado
-                pattern = CuttingPattern(pattern_id, material)
-                if largest_piece.height <= material.width and largest_piece.width <= material.height:
-                    pattern.add_piece(largest_piece, 0, 0, True)
-                    patterns.append(pattern)
-                    pattern_id += 1
+                # Coste reducido = área de la placa - duales cubiertos - dual del material
+                value, placements = self._price_material(material, values)
+                reduced_cost = material.area - material_dual - value
+                if reduced_cost < -EPS and self._add_pattern(material, placements):
+                    added += 1
+                lagrangian += material.quantity * min(0.0, material.area - value)
+                ratio = max(ratio, value / material.area)
             
-            # Limitar número de patrones
-            if pattern_id >= max_patterns:
+            # Cota de Farley: duales escalados para que ninguna columna mejore
+            lagrangian = max(lagrangian, dual_demand / ratio)
+            if not added:
+                # Convergencia: la relajación del maestro es cota válida
+                lagrangian = max(lagrangian, lp_bound + demanded_area)
+            iteration_bound = max(0.0, lagrangian - demanded_area)
+            bound = iteration_bound if bound is None else max(bound, iteration_bound)
+            
+            if progress is not None:
+                progress("column_generation", iteration=iterations,
+                         patterns=len(self.matrix), bound=bound)
+            
+            if not added:
                 break
         
-        self.patterns = patterns
-        return len(patterns)
+        return {"iterations": iterations, "lp_bound": lp_bound,
+                "lp_values": lp_values, "bound": bound}
+    
+    def _rounded_up_solution(self, lp_values: Dict[int, float]) -> Optional[Dict[int, int]]:
+        """Incumbente rápido: redondear hacia arriba la relajación si hay material"""
+        if not lp_values:
+            return None
+        
+        counts = {i: int(math.ceil(v - EPS)) for i, v in lp_values.items() if v > EPS}
+        _, stock = self._residual(counts)
+        if any(s < 0 for s in stock.values()):
+            return None
+        return counts
+    
+    def _residual_packing(self, lp_values: Dict[int, float]) -> Optional[Dict[int, int]]:
+        """Incumbente sin MIP: parte entera de la relajación y empaquetado heurístico del residuo"""
+        base = {i: int(v + EPS) for i, v in lp_values.items() if v + EPS >= 1}
+        demands, stock = self._residual(base)
+        if not any(d > 0 for d in demands.values()):
+            return base or None
+        missing, _, result = self._heuristic_packing(demands, stock)
+        if missing:
+            return None
+        counts = dict(base)
+        for i, count in self._register_layouts(result["layouts"]).items():
+            counts[i] = counts.get(i, 0) + count
+        return counts if self._covers(counts) else None
+    
+    @_timed("model_build")
+    def _prune_dominated(self, model: MasterModel) -> Tuple[MasterModel, np.ndarray, np.ndarray]:
+        """
+        Quitar del maestro las columnas dominadas: otra del mismo material
+        (mismo coste) produce al menos lo mismo de cada pieza pendiente.
+        
+        Devuelve el modelo reducido, las columnas conservadas y, por
+        columna original, la conservada que la sustituye.
+        """
+        dominator = dominating_columns(model.demand, self.matrix.material)
+        kept = np.flatnonzero(dominator == np.arange(len(dominator)))
+        self._pattern_keys.dominated += len(dominator) - len(kept)
+        reduced = MasterModel(
+            costs=model.costs[kept],
+            demand=model.demand[:, kept],
+            demand_rhs=model.demand_rhs,
+            demand_ids=model.demand_ids,
+            stock=model.stock[:, kept],
+            stock_rhs=model.stock_rhs,
+            stock_ids=model.stock_ids
+        )
+        return reduced, kept, dominator
+    
+    def _solve_mip(self, model: MasterModel, time_limit: int, start: Dict[int, int] = None):
+        """
+        Resolver el MIP partiendo, si la hay, de una solución entera
+        factible, sin las columnas dominadas
+        """
+        model, kept, dominator = self._prune_dominated(model)
+        x0 = None
+        if start:
+            # Los usos de una columna eliminada pasan a la que la domina
+            full = np.bincount(dominator, weights=self.matrix.vector(start), minlength=len(dominator))
+            x0 = full[kept]
+        self._record_size("mip", model)
+        with self._phase("mip"):
+            result = self.backend.solve_mip(model, time_limit, self.config.gap_rel, x0)
+        if result.x is None:
+            return result
+        x = np.zeros(len(dominator))
+        x[kept] = result.x
+        return MIPResult(result.status, x, result.objective, result.bound)
+    
+    def _integer_solution(self, lp_values: Dict[int, float], time_limit: int,
+                          start: Dict[int, int] = None):
+        """
+        Redondeo residual: fijar la parte entera de la relajación y
+        ramificar sólo sobre la demanda que queda sin cubrir.
+        
+        El residuo arranca de un empaquetado heurístico de la demanda
+        pendiente; el problema completo, de start. Devuelve (estado, usos,
+        cota del área consumida que demuestra el MIP sobre el maestro
+        completo, o None si ramificó sólo sobre el residuo).
+        """
+        base = {i: int(v + EPS) for i, v in lp_values.items() if v + EPS >= 1}
+        demands, stock = self._residual(base)
+        
+        residual_start = None
+        if any(d > 0 for d in demands.values()):
+            missing, _, result = self._heuristic_packing(demands, stock)
+            if not missing:
+                residual_start = self._register_layouts(result["layouts"])
+        
+        result = self._solve_mip(self._master_model(demands, stock), time_limit, residual_start)
+        
+        # Si el residuo no tiene solución, ramificar sobre el problema completo
+        if result.status != OPTIMAL and base:
+            base = {}
+            result = self._solve_mip(self._master_model(), time_limit, start)
+        
+        counts = dict(base)
+        if result.x is not None:
+            for i, value in enumerate(result.x):
+                if value > 0.5:
+                    counts[i] = counts.get(i, 0) + int(round(value))
+        
+        # Con patrones fijados la cota del residuo no acota el problema completo
+        bound = result.bound if result.x is not None and not base else None
+        return result.status, counts, bound
     
-    def solve(self) -> Dict:
-        """Resolver problema de optimización"""
+    def solve(self, progress: Callable[[Dict], None] = None,
+              should_stop: Callable[[], bool] = None) -> Dict:
+        """
+        Resolver problema de optimización.
+        
+        progress recibe eventos de avance (fase, cota, desperdicio del
+        incumbente, gap y tiempo); si should_stop devuelve True se acepta
+        el incumbente disponible sin esperar al MIP.
+        """
         start_time = time.time()
+        self._reset_timings()
         
-        # Generar patrones
-        self.generate_patterns()
+        def report(phase: str, **info):
+            if progress is not None:
+                info["phase"] = phase
+                info["elapsed"] = time.time() - start_time
+                progress(info)
         
-        # Crear problema de optimización
-        prob = pulp.LpProblem("Cutting2D", pulp.LpMinimize)
+        if self.config.mode == "rapido":
+            solution = self.solve_heuristic(start_time)
+            solution["summary"]["time_to_best"] = solution["time"]
+            self._summarize_timings(solution)
+            report("done", waste=solution["waste"], bound=None, gap=None)
+            self.update_stats(solution["waste"], solution["time"])
+            self.solution = solution
+            return solution
         
-        # Variables: cuántas veces usar cada patrón
-        pattern_vars = {}
-        for i, pattern in enumerate(self.patterns):
-            pattern_vars[i] = pulp.LpVariable(f"pattern_{i}", lowBound=0, cat='Integer')
+        # Patrones iniciales y solución de arranque (heurística o previa)
+        self.generate_patterns(self.config.max_patterns)
+        start_counts = self._start_solution()
+        report("patterns", patterns=len(self.matrix))
         
-        # Función objetivo: minimizar desperdicio
-        waste_terms = [pattern.waste * pattern_vars[i] for i, pattern in enumerate(self.patterns)]
-        prob += pulp.lpSum(waste_terms)
+        incumbent = None
+        if start_counts is not None:
+            no_bound = {"iterations": 0, "lp_bound": None, "lp_values": {}, "bound": None}
+            incumbent = self._build_solution("Feasible", start_counts, start_time, no_bound)
+            report("incumbent", waste=incumbent["waste"], bound=None, gap=None, solution=incumbent)
         
-        # Restricciones: satisfacer demanda
-        for piece in self.pieces:
-            demand_terms = []
-            for i, pattern in enumerate(self.patterns):
-                count = pattern.piece_counts.get(piece.id, 0)
-                if count > 0:
-                    demand_terms.append(count * pattern_vars[i])
-            
-            if demand_terms:
-                prob += pulp.lpSum(demand_terms) >= piece.demand
+        # Generación de columnas sobre la relajación
+        cg_info = self.column_generation(deadline=start_time + self.config.time_limit / 2,
+                                         progress=report, should_stop=should_stop)
         
-        # Restricciones: disponibilidad de material
-        for material in self.materials:
-            material_terms = []
-            for i, pattern in enumerate(self.patterns):
-                if pattern.material.id == material.id:
-                    material_terms.append(pattern_vars[i])
-            
-            if material_terms:
-                prob += pulp.lpSum(material_terms) <= material.quantity
+        # Incumbente a partir de la relajación si mejora al de arranque
+        candidates = [self._rounded_up_solution(cg_info["lp_values"])]
+        if self.config.mode == "columnas":
+            candidates.append(self._residual_packing(cg_info["lp_values"]))
+        for counts in candidates:
+            if counts is not None and (start_counts is None or
+                                       self._material_area(counts) < self._material_area(start_counts)):
+                start_counts = counts
+        if start_counts is not None:
+            incumbent = self._build_solution("Feasible", start_counts, start_time, cg_info)
+            report("incumbent", waste=incumbent["waste"], bound=cg_info["bound"],
+                   gap=incumbent["summary"]["gap"], solution=incumbent)
+        
+        # En modo "columnas" el redondeo de la relajación es la solución final
+        if incumbent is not None and (self.config.mode == "columnas" or
+                                      (should_stop is not None and should_stop())):
+            solution = incumbent
+        else:
+            # Redondear y ramificar sobre las columnas generadas
+            remaining = max(1, int(self.config.time_limit - (time.time() - start_time)))
+            status, counts, mip_bound = self._integer_solution(cg_info["lp_values"], remaining,
+                                                               start_counts)
+            solution = self._build_solution(status, counts, start_time, cg_info, mip_bound)
+            if incumbent is not None and (status != "Optimal" or incumbent["waste"] < solution["waste"]):
+                solution = incumbent
+            elif incumbent is None and status != "Optimal" and self._partial_packing is not None:
+                # Sin material para toda la demanda: plan parcial de la heurística
+                # con lo que no se coloca en "unplaced", como en modo rápido
+                heuristic, counts = self._partial_packing
+                solution = self._build_solution("Infeasible", counts, start_time, cg_info)
+                solution["summary"]["heuristic"] = heuristic
+        
+        # Columnas básicas de la última relajación, para reoptimizar tras un cambio
+        solution["pool"] = [self._layout(i) for i, v in sorted(cg_info["lp_values"].items())
+                            if v > EPS]
+        solution["time"] = time.time() - start_time
+        # Tiempo hasta la solución devuelta (telemetría para elegir modo y tiempo límite)
+        solution["summary"]["time_to_best"] = (incumbent["time"] if solution is incumbent
+                                               else solution["time"])
+        self._summarize_timings(solution)
+        report("done", waste=solution["waste"], bound=cg_info["bound"],
+               gap=solution["summary"]["gap"])
+        
+        # Actualizar estadísticas
+        self.update_stats(solution["waste"], solution["time"])
+        
+        self.solution = solution
+        return solution
+    
+    def _summarize_timings(self, solution: Dict):
+        """Tiempos por fase y tamaño de los modelos en el resumen"""
+        timings = dict(self.timings)
+        timings["other"] = max(0.0, solution["time"] - sum(timings.values()))
+        solution["summary"]["timings"] = timings
+        solution["summary"]["model_size"] = dict(self.model_size, patterns=len(self.matrix))
+    
+    def solve_heuristic(self, start_time: float = None) -> Dict:
+        """
+        Modo rápido: MaxRects, Skyline y Guillotina constructivas; se
+        queda con la que coloca toda la demanda consumiendo menos área.
+        """
+        if start_time is None:
+            start_time = time.time()
         
-        # Resolver
-        solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=300)
-        prob.solve(solver)
+        # Cada placa distinta es un patrón; las repetidas suman usos
+        self._reset_patterns()
+        missing, heuristic, result = self._heuristic_packing()
+        counts = self._register_layouts(result["layouts"])
+        
+        status = "Infeasible" if missing else "Feasible"
+        cg_info = {"iterations": 0, "lp_bound": None, "lp_values": {}, "bound": None}
+        solution = self._build_solution(status, counts, start_time, cg_info)
+        solution["summary"]["heuristic"] = heuristic
+        return solution
+    
+    @_timed("extraction")
+    def _build_solution(self, status: str, counts: Dict[int, int],
+                        start_time: float, cg_info: Dict, mip_bound: float = None) -> Dict:
+        """
+        Construir el diccionario de solución a partir de los usos de cada
+        patrón; mip_bound es la cota del área consumida que demuestra el MIP
+        sobre el maestro completo (None si no lo hubo).
+        """
+        material_area = self._material_area(counts)
+        # Área útil: piezas colocadas hasta su demanda (lo sobreproducido es
+        # desperdicio); un plan parcial no cuenta la demanda sin colocar
+        demand = np.array([p.demand for p in self.pieces], dtype=float)
+        areas = np.array([p.area for p in self.pieces], dtype=float)
+        served = np.minimum(self.matrix.produced(counts), demand) if counts else np.zeros(len(demand))
+        served_area = float(areas @ served)
         
-        solve_time = time.time() - start_time
+        # Demanda que el plan no cubre (piezas que no caben o falta de material)
+        unplaced = {p.id: int(round(demand[r] - served[r])) for r, p in enumerate(self.pieces)
+                    if demand[r] - served[r] > 0.5}
+        if unplaced:
+            status = "Infeasible"
         
         # Recopilar solución
         solution = {
             "id": hashlib.md5(str(time.time()).encode()).hexdigest()[:8],
-            "status": pulp.LpStatus[prob.status],
-            "waste": pulp.value(prob.objective),
-            "time": solve_time,
+            "status": status,
+            "waste": material_area - served_area,
+            "time": time.time() - start_time,
             "patterns_used": 0,
             "instructions": [],
+            "layouts": [],
             "summary": {}
         }
         
         # Contar patrones usados
         used_patterns = []
-        for i, var in pattern_vars.items():
-            if pulp.value(var) and pulp.value(var) > 0.5:
-                count = int(round(pulp.value(var)))
+        for i, count in sorted(counts.items()):
+            if count > 0:
                 solution["patterns_used"] += count
                 
+                pattern = self._pattern(i)
+                placed = pattern.pieces
                 pattern_info = {
                     "pattern_id": i,
                     "count": count,
-                    "material": self.patterns[i].material.name,
-                    "waste_per_unit": self.patterns[i].waste
+                    "material": pattern.material.name,
+                    "waste_per_unit": pattern.waste
                 }
                 used_patterns.append(pattern_info)
                 
+                # Colocaciones reutilizables como arranque de instancias parecidas
+                solution["layouts"].append(dict(self._layout(i), count=count))
+                
+                # Por etapas, secuencia de cortes de la seccionadora antes de las piezas
+                if self.config.stages:
+                    cuts = self._cut_sequence(pattern.material, self.matrix.placements(i).tolist())
+                    pattern_info["cut_sequence"] = cuts
+                    for cut in cuts or ():
+                        axis = "y" if cut["direction"] == "horizontal" else "x"
+                        solution["instructions"].append(
+                            f"Patrón {i}: etapa {cut['stage']}, corte {cut['direction']} en "
+                            f"{axis}={cut['position']:.1f}")
+                
                 # Generar instrucciones
-                pattern = self.patterns[i]
-                for piece, x, y, rotated in pattern.pieces:
+                for piece, x, y, rotated in placed:
                     instruction = f"Cortar {piece.name} en ({x:.1f}, {y:.1f})"
                     if rotated:
                         instruction += " (rotado)"
                     solution["instructions"].append(instruction)
         
-        # Actualizar estadísticas
-        self.stats["total_optimizations"] += 1
-        total_waste = self.stats["avg_waste"] * (self.stats["total_optimizations"] - 1)
-        total_waste += solution["waste"]
-        self.stats["avg_waste"] = total_waste / self.stats["total_optimizations"]
-        
-        total_time = self.stats["avg_time"] * (self.stats["total_optimizations"] - 1)
-        total_time += solve_time
-        self.stats["avg_time"] = total_time / self.stats["total_optimizations"]
-        
         # Crear resumen
         total_material_area = sum(m.area * m.quantity for m in self.materials)
         total_pieces_area = sum(p.area * p.demand for p in self.pieces)
         utilization = (total_pieces_area / total_material_area) * 100 if total_material_area > 0 else 0
         
+        # Gap sobre el objetivo del maestro (área consumida): frente a la cota
+        # de la generación de columnas y, si resolvió el maestro completo, a la del MIP
+        bound = cg_info["bound"]
+        lower = None if bound is None else bound + self._demanded_area()
+        if mip_bound is not None:
+            lower = mip_bound if lower is None else max(lower, mip_bound)
+        gap = None
+        if counts and lower is not None:
+            gap = max(0.0, material_area - lower) / material_area if material_area > EPS else 0.0
+        
         solution["summary"] = {
             "total_material_area": total_material_area,
             "total_pieces_area": total_pieces_area,
             "material_utilization": utilization,
             "waste_percentage": 100 - utilization,
             "used_patterns": used_patterns,
+            "patterns_generated": len(self.matrix),
+            "duplicate_patterns": self._pattern_keys.duplicates,
+            "dominated_patterns": self._pattern_keys.dominated,
+            "column_generation_iterations": cg_info["iterations"],
+            "lp_bound": cg_info["lp_bound"],
+            "bound": bound,
+            "gap": gap,
+            "unplaced": unplaced,
             "timestamp": datetime.now().isoformat()
         }
         
-        self.solution = solution
         return solution
     
+    def update_stats(self, waste: float, solve_time: float):
+        """Acumular una optimización en las estadísticas"""
+        self.stats.record(waste, solve_time)
+    
     def get_stats(self):
         """Obtener estadísticas del optimizador"""
-        return self.stats
+        return self.stats.snapshot()
     
     def generate_visualization(self, pattern_id: int = 0):
-        """Generar visualización de un patrón"""
-        if not self.patterns or pattern_id >= len(self.patterns):
+        """Generar visualización de un patrón (PNG en base64)"""
+        if pattern_id >= len(self.matrix):
             return None
         
-        pattern = self.patterns[pattern_id]
-        
-        # Crear figura
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # Dibujar material
-        ax.add_patch(patches.Rectangle(
-            (0, 0), pattern.material.width, pattern.material.height,
-            edgecolor='black', facecolor='lightblue', alpha=0.3,
-            label=f'Material: {pattern.material.width}x{pattern.material.height}'
-        ))
-        
-        # Dibujar piezas
-        colors = plt.cm.tab10(np.linspace(0, 1, len(self.pieces)))
-        for piece, x, y, rotated in pattern.pieces:
-            width = piece.height if rotated else piece.width
-            height = piece.width if rotated else piece.height
-            
-            color_idx = next((i for i, p in enumerate(self.pieces) if p.id == piece.id), 0)
-            
-            ax.add_patch(patches.Rectangle(
-                (x, y), width, height,
-                edgecolor='black', facecolor=colors[color_idx], alpha=0.7,
-                label=f'{piece.name} ({width}x{height})'
-            ))
-            
-            # Añadir texto
-            ax.text(x + width/2, y + height/2, piece.name,
-                   ha='center', va='center', fontsize=8, fontweight='bold')
-        
-        # Configurar gráfico
-        ax.set_xlim(0, pattern.material.width * 1.1)
-        ax.set_ylim(0, pattern.material.height * 1.1)
-        ax.set_aspect('equal')
-        ax.set_xlabel('Ancho (cm)')
-        ax.set_ylabel('Alto (cm)')
-        ax.set_title(f'Patrón de Corte - {pattern.material.name}')
-        ax.grid(True, alpha=0.3)
-        
-        # Guardar en buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        plt.close(fig)
-        buf.seek(0)
-        
-        # Convertir a base64
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-        return f"data:image/png;base64,{img_base64}"
\ No newline at end of file
+        pattern = self._pattern(pattern_id)
+        image = render_png(self._layout(pattern_id), f'Patrón de Corte - {pattern.material.name}')
+        img_base64 = base64.b64encode(image).decode('utf-8')
+        return f"data:image/png;base64,{img_base64}"
+
+def solve_problem(problem: CuttingProblem, progress: Callable[[Dict], None] = None,
+                  should_stop: Callable[[], bool] = None,
+                  stats: SolverStats = None) -> Dict:
+    """Resolver una instancia en un contexto propio (re-entrante)"""
+    return CuttingOptimizer2D(problem, stats).solve(progress=progress, should_stop=should_stop)
@@ -0,0 +1,233 @@
+"""
+Almacén de patrones: colocaciones en arrays contiguos y matriz dispersa
+piezas x patrones en formato CSR
+"""
+import numpy as np
+from scipy import sparse
+from typing import Dict, Hashable, Optional, Sequence
+
+# Colocación de una pieza: fila de la pieza, esquina inferior izquierda y giro
+PLACEMENT_DTYPE = np.dtype([
+    ("piece", np.int32),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("rotated", np.bool_)
+])
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Array con capacidad para al menos size elementos (duplicando)"""
+    if size <= len(array):
+        return array
+    grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class PatternMatrix:
+    """
+    Patrones en forma matricial.
+
+    Las colocaciones de todos los patrones se guardan seguidas en un array
+    estructurado (PLACEMENT_DTYPE); las del patrón j son
+    placements[offsets[j]:offsets[j + 1]]. counts[i, j] es el número de
+    piezas i del patrón j; material[j] el índice de su material y
+    area[j] / waste[j] el área de la placa y su desperdicio. La matriz CSR
+    se reconstruye sólo cuando se necesita.
+    """
+
+    __slots__ = ("piece_ids", "n_pieces", "n_materials", "_material_areas", "_placements",
+                 "_offsets", "_material", "_waste", "_size", "_counts")
+
+    def __init__(self, pieces: Sequence, materials: Sequence, capacity: int = 64):
+        self.piece_ids = np.array([p.id for p in pieces], dtype=np.int64)
+        self.n_pieces = len(pieces)
+        self.n_materials = len(materials)
+        self._material_areas = np.array([m.area for m in materials], dtype=np.float64)
+        self._placements = np.empty(capacity * 8, dtype=PLACEMENT_DTYPE)
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._material = np.empty(capacity, dtype=np.int32)
+        self._waste = np.empty(capacity, dtype=np.float64)
+        self._size = 0
+        self._counts = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, material_row: int, placements: np.ndarray, waste: float) -> int:
+        """Añadir un patrón (colocaciones en PLACEMENT_DTYPE); devuelve su índice"""
+        j = self._size
+        start = self._offsets[j]
+        end = start + len(placements)
+        self._placements = _grow(self._placements, end)
+        self._offsets = _grow(self._offsets, j + 2)
+        self._material = _grow(self._material, j + 1)
+        self._waste = _grow(self._waste, j + 1)
+
+        self._placements[start:end] = placements
+        self._offsets[j + 1] = end
+        self._material[j] = material_row
+        self._waste[j] = waste
+        self._size = j + 1
+        self._counts = None
+        return j
+
+    def placements(self, j: int) -> np.ndarray:
+        """Colocaciones del patrón j (vista, sin copia)"""
+        return self._placements[self._offsets[j]:self._offsets[j + 1]]
+
+    def piece_counts(self, j: int) -> Dict[int, int]:
+        """Piezas por id del patrón j"""
+        rows, n = np.unique(self.placements(j)["piece"], return_counts=True)
+        return dict(zip(self.piece_ids[rows].tolist(), n.tolist()))
+
+    def material_row(self, j: int) -> int:
+        return int(self._material[j])
+
+    @property
+    def counts(self) -> sparse.csr_matrix:
+        """Matriz piezas x patrones (CSR)"""
+        if self._counts is None:
+            n = self._size
+            end = self._offsets[n]
+            rows = self._placements["piece"][:end]
+            cols = np.repeat(np.arange(n, dtype=np.int32), np.diff(self._offsets[:n + 1]))
+            # Las colocaciones repetidas de una pieza se suman al pasar a CSR
+            self._counts = sparse.coo_matrix((np.ones(end), (rows, cols)),
+                                             shape=(self.n_pieces, n)).tocsr()
+        return self._counts
+
+    @property
+    def material(self) -> np.ndarray:
+        return self._material[:self._size]
+
+    @property
+    def area(self) -> np.ndarray:
+        return self._material_areas[self.material]
+
+    @property
+    def waste(self) -> np.ndarray:
+        return self._waste[:self._size]
+
+    @property
+    def usage(self) -> sparse.csr_matrix:
+        """Matriz materiales x patrones de incidencia (CSR)"""
+        n = self._size
+        return sparse.csr_matrix((np.ones(n), (self.material, np.arange(n))),
+                                 shape=(self.n_materials, n))
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por los arrays (incluida la capacidad reservada)"""
+        return (self._placements.nbytes + self._offsets.nbytes +
+                self._material.nbytes + self._waste.nbytes)
+
+    def vector(self, counts: Dict[int, int]) -> np.ndarray:
+        """Usos por patrón como vector denso"""
+        x = np.zeros(len(self))
+        for j, n in counts.items():
+            x[j] = n
+        return x
+
+    def produced(self, counts: Dict[int, int]) -> np.ndarray:
+        """Piezas producidas por unos usos de patrones (orden de las piezas)"""
+        return self.counts @ self.vector(counts)
+
+    def consumed(self, counts: Dict[int, int]) -> np.ndarray:
+        """Placas consumidas por material (orden de los materiales)"""
+        return np.bincount(self.material, weights=self.vector(counts), minlength=self.n_materials)
+
+
+class PatternIndex:
+    """
+    Índice hash (id de material, cuentas por pieza) -> patrón.
+
+    Cuenta los patrones rechazados por repetidos al insertarlos y las
+    columnas dominadas eliminadas antes del MIP.
+    """
+
+    __slots__ = ("_keys", "duplicates", "dominated")
+
+    def __init__(self):
+        self._keys = {}
+        self.duplicates = 0
+        self.dominated = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def get(self, key: Hashable) -> Optional[int]:
+        return self._keys.get(key)
+
+    def add(self, key: Hashable, index: int) -> bool:
+        """Registrar un patrón nuevo; False (y se cuenta) si ya existía"""
+        if key in self._keys:
+            self.duplicates += 1
+            return False
+        self._keys[key] = index
+        return True
+
+
+def dominating_columns(counts: sparse.csr_matrix, material: np.ndarray) -> np.ndarray:
+    """
+    Para cada columna, la columna que la sustituye: ella misma o otra del
+    mismo material que produce al menos lo mismo de cada pieza (mismo
+    coste, cubre igual). Con cuentas iguales se conserva la primera.
+    
+    Sólo puede cubrir a una columna otra cuyo soporte (filas no nulas)
+    contenga al suyo: los candidatos salen del índice invertido fila ->
+    columnas conservadas y las cuentas se comparan en esas filas sin
+    densificar la matriz.
+    """
+    n = counts.shape[1]
+    dominator = np.arange(n)
+    if not n:
+        return dominator
+    counts = sparse.csr_matrix(counts, copy=True)
+    counts.eliminate_zeros()
+    counts.sort_indices()
+    by_column = counts.tocsc()
+    by_column.sort_indices()
+    totals = np.asarray(counts.sum(axis=0)).ravel()
+
+    def row_counts(row: int, columns: np.ndarray) -> np.ndarray:
+        """Cuentas de la fila en las columnas dadas (0 donde no aparece)"""
+        start, end = counts.indptr[row], counts.indptr[row + 1]
+        indices = counts.indices[start:end]
+        position = np.minimum(np.searchsorted(indices, columns), end - start - 1)
+        return np.where(indices[position] == columns, counts.data[start:end][position], 0)
+
+    for m in np.unique(material):
+        columns = np.flatnonzero(material == m)
+        # Las columnas con más piezas se examinan antes: sólo pueden dominar a las siguientes
+        columns = columns[np.argsort(-totals[columns], kind="stable")]
+        postings: Dict[int, list] = {}  # fila -> columnas conservadas (en orden) que la producen
+        first_kept = None
+        for j in columns:
+            start, end = by_column.indptr[j], by_column.indptr[j + 1]
+            rows, values = by_column.indices[start:end], by_column.data[start:end]
+            if not len(rows):
+                if first_kept is not None:
+                    dominator[j] = first_kept
+                    continue
+            else:
+                lists = [postings.get(row) for row in rows]
+                if all(lists):
+                    # Cualquier columna que cubra está en todas las listas: basta la más corta
+                    candidates = np.array(min(lists, key=len))
+                    covers = np.ones(len(candidates), dtype=bool)
+                    for row, value in zip(rows, values):
+                        covers &= row_counts(row, candidates) >= value
+                        if not covers.any():
+                            break
+                    if covers.any():
+                        dominator[j] = candidates[int(np.argmax(covers))]
+                        continue
+            if first_kept is None:
+                first_kept = j
+            for row in rows:
+                postings.setdefault(row, []).append(j)
+    return dominator
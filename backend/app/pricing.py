@@ -0,0 +1,273 @@
+"""
+Subproblema de pricing: mochila 2D guillotina (Gilmore-Gomory)
+"""
+import numpy as np
+import threading
+from collections import OrderedDict
+from typing import List, Sequence, Tuple, Union
+
+EPS = 1e-6
+
+# Tipos de decisión de la tabla DP
+KIND_PIECE = 0
+KIND_VERTICAL = 1
+KIND_HORIZONTAL = 2
+
+# Memoria máxima para tablas de mochila reutilizables (bytes)
+KNAPSACK_CACHE_BYTES = 64 * 1024 * 1024
+
+# Resultados memorizados por tabla (vectores de valores repetidos)
+KNAPSACK_RESULTS_PER_TABLE = 8
+
+
+def normal_points(length: float, sizes: List[float]) -> List[float]:
+    """Patrones normales: combinaciones de tamaños que caben en length"""
+    points = {0.0}
+    for size in sorted(set(sizes)):
+        if size <= 0 or size > length + EPS:
+            continue
+        for start in sorted(points):
+            value = start + size
+            while value <= length + EPS:
+                key = round(value, 6)
+                if key in points:
+                    break
+                points.add(key)
+                value = key + size
+    return sorted(points)
+
+
+def raster_points(length: float, sizes: List[float]) -> np.ndarray:
+    """Puntos raster: reducción de los patrones normales (suficientes para guillotina)"""
+    normal = np.array(normal_points(length, sizes))
+    idx = np.searchsorted(normal, length - normal + EPS, side='right') - 1
+    return np.unique(np.concatenate(([0.0], normal[idx])))
+
+
+def _cut_indices(points: np.ndarray):
+    """Para cada punto: posiciones de corte (hasta la mitad) y sus complementos"""
+    cuts, rests = [], []
+    for i in range(len(points)):
+        cut = np.arange(1, np.searchsorted(points, points[i] / 2 + EPS, side='right'))
+        rest = np.searchsorted(points, points[i] - points[cut] + EPS, side='right') - 1
+        cuts.append(cut)
+        rests.append(rest)
+    return cuts, rests
+
+
+class GuillotineKnapsack:
+    """
+    Tabla DP de mochila guillotina para una placa y un conjunto de piezas.
+
+    La discretización (puntos raster, índices de corte y encaje de cada
+    orientación) no depende de los valores de las piezas, así que se
+    construye una vez y cada llamada a solve() sólo recorre la DP.
+    """
+
+    def __init__(self, width: float, height: float,
+                 sizes: List[Tuple[float, float]],
+                 allow_rotation: Union[bool, Sequence[bool]] = True):
+        self.width = width
+        self.height = height
+
+        # Rotación permitida global o por pieza
+        if isinstance(allow_rotation, bool):
+            allow_rotation = [allow_rotation] * len(sizes)
+
+        # Orientaciones que caben en la placa: (pieza, ancho, alto, rotada)
+        self.orientations = []
+        for idx, (w, h) in enumerate(sizes):
+            self.orientations.append((idx, w, h, False))
+            if allow_rotation[idx] and abs(w - h) > EPS:
+                self.orientations.append((idx, h, w, True))
+        self.orientations = [o for o in self.orientations
+                             if o[1] <= width + EPS and o[2] <= height + EPS]
+
+        self.xs = raster_points(width, [o[1] for o in self.orientations])
+        self.ys = raster_points(height, [o[2] for o in self.orientations])
+        self.cuts_x, self.rests_x = _cut_indices(self.xs)
+        self.cuts_y, self.rests_y = _cut_indices(self.ys)
+
+        # Primer índice raster en el que cabe cada orientación
+        self.fit_x = np.searchsorted(self.xs, [o[1] - EPS for o in self.orientations])
+        self.fit_y = np.searchsorted(self.ys, [o[2] - EPS for o in self.orientations])
+
+        self.top_x = np.searchsorted(self.xs, width + EPS, side='right') - 1
+        self.top_y = np.searchsorted(self.ys, height + EPS, side='right') - 1
+
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria aproximada de la estructura y de los resultados memorizados"""
+        size = self.xs.nbytes + self.ys.nbytes + self.fit_x.nbytes + self.fit_y.nbytes
+        for arrays in (self.cuts_x, self.rests_x, self.cuts_y, self.rests_y):
+            size += sum(a.nbytes for a in arrays)
+        # Tablas temporales de solve(): valor, tipo de decisión y argumento
+        size += len(self.xs) * len(self.ys) * (8 + 1 + 4)
+        for _, placements in self._results.values():
+            size += 64 * (len(placements) + 1)
+        return size
+
+    def solve(self, values: List[float]):
+        """
+        Mejor empaquetado guillotina con los valores dados.
+
+        Devuelve (valor, colocaciones) donde cada colocación es
+        (índice_pieza, x, y, rotada).
+        """
+        key = tuple(round(v, 9) for v in values)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        result = self._solve(values)
+
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > KNAPSACK_RESULTS_PER_TABLE:
+                self._results.popitem(last=False)
+        return result
+
+    def _solve(self, values: List[float]):
+        xs, ys = self.xs, self.ys
+        nx, ny = len(xs), len(ys)
+
+        # Valor base: mejor pieza individual que cabe en cada rectángulo
+        table = np.zeros((nx, ny))
+        kind = np.full((nx, ny), KIND_PIECE, dtype=np.int8)
+        arg = np.full((nx, ny), -1, dtype=np.int32)
+        for o_idx, (piece_idx, _, _, _) in enumerate(self.orientations):
+            v = values[piece_idx]
+            if v <= EPS:
+                continue
+            xi, yi = self.fit_x[o_idx], self.fit_y[o_idx]
+            block = table[xi:, yi:]
+            better = v > block + EPS
+            block[better] = v
+            arg[xi:, yi:][better] = o_idx
+
+        if not (arg >= 0).any():
+            return 0.0, []
+
+        columns = np.arange(ny)
+        for i in range(1, nx):
+            # Cortes verticales: el lado izquierdo no supera la mitad
+            cuts = self.cuts_x[i]
+            if len(cuts):
+                candidates = table[cuts, :] + table[self.rests_x[i], :]
+                best = candidates.argmax(axis=0)
+                best_value = candidates[best, columns]
+                better = best_value > table[i, :] + EPS
+                table[i, better] = best_value[better]
+                kind[i, better] = KIND_VERTICAL
+                arg[i, better] = cuts[best[better]]
+
+            # Cortes horizontales: dependen de la misma fila, se recorren en orden
+            row = table[i]
+            for k in range(1, ny):
+                cuts = self.cuts_y[k]
+                if not len(cuts):
+                    continue
+                candidates = row[cuts] + row[self.rests_y[k]]
+                best = candidates.argmax()
+                if candidates[best] > row[k] + EPS:
+                    row[k] = candidates[best]
+                    kind[i, k] = KIND_HORIZONTAL
+                    arg[i, k] = cuts[best]
+
+        # Reconstruir colocaciones desde la placa completa
+        placements = []
+        stack = [(self.top_x, self.top_y, 0.0, 0.0)]
+        while stack:
+            i, k, x0, y0 = stack.pop()
+            if kind[i, k] == KIND_VERTICAL:
+                j = arg[i, k]
+                rest = self.rests_x[i][j - 1]
+                stack.append((j, k, x0, y0))
+                stack.append((rest, k, x0 + xs[j], y0))
+            elif kind[i, k] == KIND_HORIZONTAL:
+                l = arg[i, k]
+                rest = self.rests_y[k][l - 1]
+                stack.append((i, l, x0, y0))
+                stack.append((i, rest, x0, y0 + ys[l]))
+            elif arg[i, k] >= 0:
+                piece_idx, _, _, rotated = self.orientations[arg[i, k]]
+                placements.append((piece_idx, float(x0), float(y0), rotated))
+
+        return float(table[self.top_x, self.top_y]), placements
+
+
+class KnapsackCache:
+    """Caché LRU de tablas de mochila acotada por memoria"""
+
+    def __init__(self, max_bytes: int = KNAPSACK_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, width: float, height: float, sizes: List[Tuple[float, float]],
+            allow_rotation: Union[bool, Sequence[bool]] = True) -> GuillotineKnapsack:
+        """Obtener (o construir) la tabla para una placa y un conjunto de piezas"""
+        rotation = allow_rotation if isinstance(allow_rotation, bool) else tuple(allow_rotation)
+        key = (round(width, 6), round(height, 6),
+               tuple((round(w, 6), round(h, 6)) for w, h in sizes), rotation)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+
+        table = GuillotineKnapsack(width, height, sizes, allow_rotation)
+
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            self._evict()
+        return table
+
+    def _evict(self):
+        """Descartar las tablas menos usadas hasta respetar el límite de memoria"""
+        total = sum(t.nbytes for t in self._tables.values())
+        while total > self.max_bytes and len(self._tables) > 1:
+            _, table = self._tables.popitem(last=False)
+            total -= table.nbytes
+
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._tables.clear()
+
+    def get_stats(self) -> dict:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            return {
+                "tables": len(self._tables),
+                "bytes": sum(t.nbytes for t in self._tables.values()),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+# Caché compartida por todas las resoluciones del proceso
+knapsack_cache = KnapsackCache()
+
+
+def guillotine_knapsack(width: float, height: float,
+                        sizes: List[Tuple[float, float]],
+                        values: List[float],
+                        allow_rotation: Union[bool, Sequence[bool]] = True):
+    """
+    Mochila 2D guillotina no acotada sobre una placa width x height.
+    allow_rotation puede ser un valor global o uno por pieza.
+
+    Devuelve (valor, colocaciones) donde cada colocación es
+    (índice_pieza, x, y, rotada).
+    """
+    return knapsack_cache.get(width, height, sizes, allow_rotation).solve(values)
@@ -0,0 +1,221 @@
+"""
+Elección automática del modo de resolución (modo "auto"): un modelo
+entrenado con la telemetría de las resoluciones predice, para cada modo,
+el tiempo hasta la mejor solución y el desperdicio; se elige el modo más
+barato que no empeora el desperdicio y se ajusta tiempo_limite.
+
+Sin modelo entrenado se usan reglas por tamaño de instancia. sklearn y
+joblib se importan al cargar el modelo, no al importar el módulo.
+"""
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from .ml_predictor import MODEL_LOAD_LOCK
+
+logger = logging.getLogger(__name__)
+
+# Modelo entrenado por ml/training/train_router.py
+ROUTER_PATH = os.environ.get(
+    "ML_ROUTER_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "ml", "models", "solver_router.pkl")
+)
+# Telemetría de resoluciones en JSONL: desactivada salvo que se dé una ruta
+# (p. ej. ml/data/solve_log.jsonl, la que lee train_router.py)
+SOLVE_LOG_PATH = os.environ.get("SOLVE_LOG_PATH") or None
+# Puntos de desperdicio (%) que se aceptan por elegir un modo más barato
+ROUTER_TOLERANCE = float(os.environ.get("ML_ROUTER_TOLERANCE", 1.0))
+# tiempo_limite = tiempo previsto hasta la mejor solución x factor + mínimo
+ROUTER_TIME_FACTOR = float(os.environ.get("ML_ROUTER_TIME_FACTOR", 3.0))
+ROUTER_MIN_TIME = int(os.environ.get("ML_ROUTER_MIN_TIME", 5))
+
+# Modos de resolución, del más barato al más caro
+MODES = ("rapido", "columnas", "exacto")
+
+ROUTER_FEATURES = (
+    'tipos_pieza',
+    'demanda_total',
+    'tipos_material',
+    'placas',
+    'ratio_area',  # área de piezas / área de material
+    'pieza_media',  # área media de pieza / área media de placa
+    'pieza_maxima',  # mayor pieza / área media de placa
+    'rotables',  # fracción de tipos de pieza rotables
+    'etapas'
+)
+
+
+def instance_features(request: Dict) -> Dict[str, float]:
+    """Características de una solicitud (canónica) para elegir modo"""
+    piezas, materiales = request["piezas"], request["materiales"]
+    demand = sum(p["demanda"] for p in piezas)
+    sheets = sum(m["cantidad"] for m in materiales)
+    piece_area = sum(p["ancho"] * p["alto"] * p["demanda"] for p in piezas)
+    sheet_area = sum(m["ancho"] * m["alto"] * m["cantidad"] for m in materiales)
+    mean_sheet = sheet_area / sheets if sheets else 1.0
+    largest = max((p["ancho"] * p["alto"] for p in piezas), default=0.0)
+    return {
+        "tipos_pieza": len(piezas),
+        "demanda_total": demand,
+        "tipos_material": len(materiales),
+        "placas": sheets,
+        "ratio_area": piece_area / sheet_area if sheet_area else 0.0,
+        "pieza_media": piece_area / demand / mean_sheet if demand else 0.0,
+        "pieza_maxima": largest / mean_sheet,
+        "rotables": sum(bool(p.get("rotable", True)) for p in piezas) / len(piezas) if piezas else 0.0,
+        "etapas": (request.get("config") or {}).get("etapas") or 0
+    }
+
+
+def solve_record(request: Dict, solution: Dict) -> Dict:
+    """Registro de telemetría de una resolución: instancia, modo y resultado"""
+    config = request.get("config") or {}
+    summary = solution.get("summary") or {}
+    used = solution["waste"] + summary.get("total_pieces_area", 0)
+    return {
+        "fecha": datetime.now().isoformat(),
+        "caracteristicas": instance_features(request),
+        "modo": config.get("modo", "exacto"),
+        "solver": config.get("solver", "cbc"),
+        "tiempo_limite": config.get("tiempo_limite"),
+        "tiempo": solution["time"],
+        "tiempo_mejor": summary.get("time_to_best", solution["time"]),
+        "gap": summary.get("gap"),
+        "desperdicio_pct": 100 * solution["waste"] / used if used else 0.0,
+        "estado": solution.get("status")
+    }
+
+
+class SolveLog:
+    """Telemetría de resoluciones, una línea JSON por solución"""
+
+    def __init__(self, path: Optional[str] = SOLVE_LOG_PATH):
+        self.path = path or None
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def record(self, request: Dict, solution: Dict):
+        """Añadir una resolución; los errores no afectan a la respuesta"""
+        if self.path is None:
+            return
+        try:
+            self.append(solve_record(request, solution))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("No se pudo registrar la telemetría: %s", e)
+
+    def append(self, record: Dict):
+        """Añadir un registro de solve_record"""
+        if self.path is None:
+            return
+        try:
+            line = json.dumps(record, default=str)
+            with self._lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                self.records += 1
+        except OSError as e:
+            logger.warning("No se pudo registrar la telemetría: %s", e)
+
+
+class SolverRouter:
+    """Modo y tiempo límite de una solicitud con modo "auto\""""
+
+    def __init__(self, model_path: str = ROUTER_PATH, tolerance: float = ROUTER_TOLERANCE):
+        self.model_path = model_path
+        self.tolerance = tolerance
+        self.models = None  # modo -> {"tiempo": modelo, "desperdicio": modelo}
+        self.features = list(ROUTER_FEATURES)
+        self.samples = 0
+        self.routed = {mode: 0 for mode in MODES}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Cargar el modelo en segundo plano sin retrasar el arranque"""
+        threading.Thread(target=self._ensure_model, daemon=True).start()
+
+    def _ensure_model(self):
+        """Cargar el artefacto la primera vez que se necesita (si existe)"""
+        if self._loaded:
+            return
+        with MODEL_LOAD_LOCK:
+            if self._loaded:
+                return
+            if self.model_path and os.path.exists(self.model_path):
+                try:
+                    self.load_model(self.model_path)
+                except Exception as e:
+                    logger.warning("No se pudo cargar el modelo de enrutado: %s", e)
+            self._loaded = True
+
+    def load_model(self, path: str):
+        """Cargar un artefacto de train_router.py"""
+        import joblib
+        artifact = joblib.load(path)
+        self.models = {mode: models for mode, models in artifact["modelos"].items() if mode in MODES}
+        self.features = list(artifact["features"])
+        self.samples = artifact.get("muestras", 0)
+
+    def route(self, request: Dict) -> Dict:
+        """
+        Modo ("rapido", "columnas" o "exacto") y tiempo_limite para una
+        solicitud canónica; el tiempo_limite pedido es el máximo. Devuelve
+        {"modo", "tiempo_limite", "fuente", "prediccion"}.
+        """
+        self._ensure_model()
+        features = instance_features(request)
+        limit = (request.get("config") or {}).get("tiempo_limite", 300)
+        if self.models:
+            route = self._route_model(features, limit)
+        else:
+            route = self._route_rules(features, limit)
+        with self._lock:
+            self.routed[route["modo"]] += 1
+        return route
+
+    def _route_model(self, features: Dict, limit: int) -> Dict:
+        """El modo más barato con desperdicio previsto dentro de la tolerancia del mejor"""
+        import numpy as np
+        X = np.array([[features.get(f, 0) for f in self.features]], dtype=float)
+        predicted = {}
+        for mode in MODES:
+            if mode in self.models:
+                models = self.models[mode]
+                # El tiempo se entrena como log(1 + segundos)
+                predicted[mode] = {
+                    "tiempo": float(np.expm1(models["tiempo"].predict(X)[0])),
+                    "desperdicio_pct": float(models["desperdicio"].predict(X)[0])
+                }
+        best = min(p["desperdicio_pct"] for p in predicted.values())
+        mode = next(m for m in MODES
+                    if m in predicted and predicted[m]["desperdicio_pct"] <= best + self.tolerance)
+        seconds = math.ceil(predicted[mode]["tiempo"] * ROUTER_TIME_FACTOR) + ROUTER_MIN_TIME
+        return {"modo": mode, "tiempo_limite": int(min(limit, seconds)),
+                "fuente": "modelo", "prediccion": predicted}
+
+    def _route_rules(self, features: Dict, limit: int) -> Dict:
+        """Reglas por tamaño mientras no hay modelo entrenado"""
+        types, demand = features["tipos_pieza"], features["demanda_total"]
+        if types >= 40 or demand >= 2000:
+            mode, seconds = "rapido", ROUTER_MIN_TIME
+        elif types <= 8 and demand <= 100:
+            mode, seconds = "exacto", 30
+        else:
+            mode, seconds = "columnas", ROUTER_MIN_TIME + 2 * types
+        return {"modo": mode, "tiempo_limite": int(min(limit, seconds)),
+                "fuente": "reglas", "prediccion": None}
+
+    def get_stats(self) -> Dict:
+        """Origen de las decisiones y solicitudes enrutadas a cada modo"""
+        with self._lock:
+            return {
+                "fuente": "modelo" if self.models else "reglas",
+                "muestras": self.samples,
+                "features": self.features,
+                "enrutadas": dict(self.routed)
+            }
@@ -0,0 +1,272 @@
+"""
+Patrones guillotina por etapas (2 o 3) con ancho de sierra y recorte de
+cantos: franjas llenadas con mochilas 1D y secuencia de cortes de cada
+patrón para la seccionadora
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .pricing import EPS
+
+# Decimales máximos de la rejilla entera de las mochilas 1D
+MAX_DECIMALS = 3
+
+
+def knapsack_1d(capacity: int, sizes: Sequence[int],
+                values: Sequence[float]) -> Tuple[float, List[int]]:
+    """
+    Mochila 1D no acotada sobre enteros.
+
+    Cada elemento se incorpora en O(capacity): por cada resto módulo su
+    tamaño, best[r + j*s] = max_k best[r + k*s] + (j - k)*v es un máximo
+    acumulado. Devuelve (valor, índices elegidos con repetición).
+    """
+    best = np.zeros(capacity + 1)
+    for size, value in zip(sizes, values):
+        if value <= EPS or size <= 0 or size > capacity:
+            continue
+        rows = -(-(capacity + 1) // size)
+        padded = np.full(rows * size, -np.inf)
+        padded[:capacity + 1] = best
+        steps = np.arange(rows)[:, None] * value
+        grid = np.maximum.accumulate(padded.reshape(rows, size) - steps, axis=0) + steps
+        best = grid.reshape(-1)[:capacity + 1]
+
+    # Reconstruir desde la menor capacidad con el mismo valor
+    rises = np.r_[True, best[1:] > best[:-1] + EPS]
+    first = np.maximum.accumulate(np.where(rises, np.arange(capacity + 1), 0))
+    chosen = []
+    c = capacity
+    while best[c] > EPS:
+        c = first[c]
+        for i, (size, value) in enumerate(zip(sizes, values)):
+            if value > EPS and 0 < size <= c and best[c - size] + value >= best[c] - EPS:
+                chosen.append(i)
+                c -= size
+                break
+        else:
+            break
+    return float(best[capacity]), chosen
+
+
+def _scale(lengths: Sequence[float]) -> int:
+    """Menor potencia de 10 que hace enteras todas las medidas (como mucho MAX_DECIMALS)"""
+    for decimals in range(MAX_DECIMALS + 1):
+        scale = 10 ** decimals
+        if all(abs(v * scale - round(v * scale)) <= EPS * scale for v in lengths):
+            return scale
+    return 10 ** MAX_DECIMALS
+
+
+def _strips(width: int, height: int, orientations: List[Tuple[int, int, int, bool]],
+            values: Sequence[float], stages: int, kerf: int):
+    """
+    Franjas horizontales de una placa width x height (en la rejilla).
+
+    Para cada alto de franja, mochila 1D de columnas a lo ancho: con 2
+    etapas una pieza del mismo alto que la franja; con 3 etapas una pila
+    de piezas del mismo ancho que la columna, elegida con otra mochila 1D
+    a lo alto. Después, mochila 1D de franjas a lo alto de la placa.
+    Devuelve (valor, [(alto de franja, [[orientaciones apiladas]])]).
+    """
+    by_width = {}
+    for o, (piece, w, h, _) in enumerate(orientations):
+        if values[piece] > EPS:
+            by_width.setdefault(w, []).append(o)
+
+    strips = []
+    for strip in sorted({orientations[o][2] for group in by_width.values() for o in group}):
+        columns = []  # (ancho con la hoja, valor, pila de orientaciones)
+        for w, group in by_width.items():
+            fits = [o for o in group if orientations[o][2] <= strip and
+                    (stages == 3 or orientations[o][2] == strip)]
+            if not fits:
+                continue
+            if stages == 2:
+                o = max(fits, key=lambda o: values[orientations[o][0]])
+                columns.append((w + kerf, values[orientations[o][0]], [o]))
+            elif len(fits) == 1:
+                o = fits[0]
+                copies = (strip + kerf) // (orientations[o][2] + kerf)
+                columns.append((w + kerf, copies * values[orientations[o][0]], [o] * copies))
+            else:
+                value, chosen = knapsack_1d(strip + kerf,
+                                            [orientations[o][2] + kerf for o in fits],
+                                            [values[orientations[o][0]] for o in fits])
+                columns.append((w + kerf, value, [fits[i] for i in chosen]))
+        value, chosen = knapsack_1d(width + kerf, [c[0] for c in columns], [c[1] for c in columns])
+        if value > EPS:
+            strips.append((strip, value, [columns[i][2] for i in chosen]))
+
+    value, chosen = knapsack_1d(height + kerf, [s[0] + kerf for s in strips], [s[1] for s in strips])
+    return value, [(strips[i][0], strips[i][2]) for i in chosen]
+
+
+def staged_knapsack(width: float, height: float,
+                    sizes: List[Tuple[float, float]],
+                    values: List[float],
+                    allow_rotation: Union[bool, Sequence[bool]] = True,
+                    stages: int = 2, kerf: float = 0.0, trim: float = 0.0):
+    """
+    Mochila guillotina por etapas no acotada sobre una placa width x height
+    con recorte trim en cada canto y cortes de ancho kerf. Las franjas del
+    primer corte pueden ser horizontales o verticales: se prueban ambas.
+
+    Devuelve (valor, colocaciones) como guillotine_knapsack.
+    """
+    if isinstance(allow_rotation, bool):
+        allow_rotation = [allow_rotation] * len(sizes)
+
+    usable_width, usable_height = width - 2 * trim, height - 2 * trim
+    scale = _scale([usable_width, usable_height, kerf] + [v for size in sizes for v in size])
+    W = int(math.floor(usable_width * scale + EPS))
+    H = int(math.floor(usable_height * scale + EPS))
+    k = int(math.ceil(kerf * scale - EPS))
+
+    orientations = []
+    for idx, (w, h) in enumerate(sizes):
+        gw, gh = int(math.ceil(w * scale - EPS)), int(math.ceil(h * scale - EPS))
+        orientations.append((idx, gw, gh, False))
+        if allow_rotation[idx] and abs(w - h) > EPS:
+            orientations.append((idx, gh, gw, True))
+    orientations = [o for o in orientations if o[1] <= W and o[2] <= H]
+    if not orientations:
+        return 0.0, []
+
+    best = None
+    for transposed in (False, True):
+        oriented = [(i, h, w, r) for i, w, h, r in orientations] if transposed else orientations
+        value, strips = (_strips(H, W, oriented, values, stages, k) if transposed
+                         else _strips(W, H, oriented, values, stages, k))
+        if best is None or value > best[0] + EPS:
+            best = (value, transposed, oriented, strips)
+    value, transposed, oriented, strips = best
+
+    # Franjas de mayor a menor y, en cada una, columnas de mayor a menor
+    placements = []
+    y = 0
+    for strip, columns in sorted(strips, key=lambda s: -s[0]):
+        x = 0
+        for stack in sorted(columns, key=lambda c: -oriented[c[0]][1]):
+            offset = 0
+            for o in stack:
+                piece, w, h, rotated = oriented[o]
+                px, py = x, y + offset
+                if transposed:
+                    px, py = py, px
+                placements.append((piece, trim + px / scale, trim + py / scale, rotated))
+                offset += h + k
+            x += oriented[stack[0]][1] + k
+        y += strip + k
+    return float(value), placements
+
+
+def cut_sequence(width: float, height: float, rects: Sequence[Tuple[float, float, float, float]],
+                 kerf: float = 0.0, trim: float = 0.0,
+                 max_stages: int = None) -> Optional[List[Dict]]:
+    """
+    Secuencia de cortes guillotina por etapas de un patrón dado por sus
+    rectángulos (x, y, ancho, alto) ya orientados.
+
+    En cada etapa los cortes de una región son paralelos y atraviesan la
+    región entera; la etapa siguiente corta las piezas resultantes en la
+    otra dirección. El recorte de cantos es la etapa 0. Devuelve
+    [{"stage", "direction", "position", "start", "end"}] ordenados por
+    etapa (la hoja de sierra ocupa [position, position + kerf]) o None si
+    el patrón no es guillotina o necesita más de max_stages etapas.
+    """
+    x0, y0, x1, y1 = trim, trim, width - trim, height - trim
+    for x, y, w, h in rects:
+        if x < x0 - EPS or y < y0 - EPS or x + w > x1 + EPS or y + h > y1 + EPS:
+            return None
+
+    def split(region, items, horizontal, stage, stalled, cuts) -> bool:
+        if not items:
+            return True
+        rx0, ry0, rx1, ry1 = region
+        lo, hi = (ry0, ry1) if horizontal else (rx0, rx1)
+        axis = 1 if horizontal else 0
+        if len(items) == 1:
+            x, y, w, h = items[0]
+            # Holguras menores que la hoja no se pueden cortar
+            if (x - rx0 <= kerf + EPS and y - ry0 <= kerf + EPS and
+                    rx1 - (x + w) <= EPS and ry1 - (y + h) <= EPS):
+                return True
+
+        # Grupos de piezas que se solapan a lo largo del eje (con la hoja entre grupos)
+        slabs = []
+        for r in sorted(items, key=lambda r: r[axis]):
+            start, end = r[axis], r[axis] + r[axis + 2]
+            if slabs and start < slabs[-1][1] + kerf - EPS:
+                slabs[-1][1] = max(slabs[-1][1], end)
+                slabs[-1][2].append(r)
+            else:
+                slabs.append([start, end, [r]])
+
+        positions, regions = [], []
+        cursor = lo
+        for start, end, group in slabs:
+            if start - kerf > cursor + EPS:  # hueco delante del grupo
+                positions.append(start - kerf)
+                cursor = start
+            regions.append((cursor, end, group))
+            if end < hi - EPS:
+                positions.append(end)
+            cursor = end + kerf
+
+        if not positions:
+            # Etapa vacía en esta región; si tampoco se corta en la otra dirección no es guillotina
+            if stalled:
+                return False
+            return split(region, items, not horizontal, stage + 1, True, cuts)
+        if max_stages is not None and stage > max_stages:
+            return False
+
+        start, end = (rx0, rx1) if horizontal else (ry0, ry1)
+        direction = "horizontal" if horizontal else "vertical"
+        cuts.extend({"stage": stage, "direction": direction, "position": p,
+                     "start": start, "end": end} for p in positions)
+        for a, b, group in regions:
+            sub = (rx0, a, rx1, b) if horizontal else (a, ry0, b, ry1)
+            if not split(sub, group, not horizontal, stage + 1, False, cuts):
+                return False
+        return True
+
+    best = None
+    for horizontal in (True, False):
+        cuts = []
+        if split((x0, y0, x1, y1), list(rects), horizontal, 1, False, cuts):
+            stages = max((c["stage"] for c in cuts), default=0)
+            if best is None or stages < best[0]:
+                best = (stages, cuts)
+    if best is None:
+        return None
+
+    trims = []
+    if trim > EPS:
+        trims = [{"stage": 0, "direction": "horizontal", "position": p, "start": 0.0, "end": width}
+                 for p in (max(0.0, trim - kerf), height - trim)]
+        trims += [{"stage": 0, "direction": "vertical", "position": p, "start": y0, "end": y1}
+                  for p in (max(0.0, trim - kerf), width - trim)]
+    return trims + sorted(best[1], key=lambda c: c["stage"])
+
+
+def fill_sheet_staged(material, pieces, remaining: np.ndarray, stages: int,
+                      kerf: float = 0.0, trim: float = 0.0) -> List[Tuple[int, float, float, bool]]:
+    """
+    Llenar una placa por etapas con la demanda restante: mochila con el
+    área como valor y sin las piezas que excedan la demanda.
+    """
+    values = [p.area if n > 0 else 0.0 for p, n in zip(pieces, remaining)]
+    _, placements = staged_knapsack(
+        material.width, material.height, [(p.width, p.height) for p in pieces], values,
+        allow_rotation=[p.can_rotate for p in pieces], stages=stages, kerf=kerf, trim=trim)
+    left = remaining.copy()
+    kept = []
+    for placement in placements:
+        if left[placement[0]] > 0:
+            left[placement[0]] -= 1
+            kept.append(placement)
+    return kept
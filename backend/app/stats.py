@@ -0,0 +1,137 @@
+"""
+Estadísticas agregadas de las optimizaciones y métricas para Prometheus
+"""
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+
+class SolverStats:
+    """Agregador de estadísticas seguro entre hilos"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total_waste = 0.0
+        self._total_time = 0.0
+    
+    def record(self, waste: float, solve_time: float):
+        """Acumular una optimización"""
+        with self._lock:
+            self._count += 1
+            self._total_waste += waste
+            self._total_time += solve_time
+    
+    def snapshot(self) -> Dict:
+        """Copia coherente de las estadísticas actuales"""
+        with self._lock:
+            count, waste, solve_time = self._count, self._total_waste, self._total_time
+        return {
+            "total_optimizations": count,
+            "avg_waste": waste / count if count else 0,
+            "avg_time": solve_time / count if count else 0
+        }
+
+
+# Límites de los histogramas
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+GAP_BUCKETS = (0.0, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+METRICS = {
+    "optimizer_solves_total": ("counter", "Resoluciones por modo, solver y estado"),
+    "optimizer_solve_seconds": ("histogram", "Duración total de la resolución"),
+    "optimizer_phase_seconds": ("histogram", "Duración de cada fase de la resolución"),
+    "optimizer_model_size": ("histogram", "Patrones y variables, restricciones y no ceros de LP y MIP"),
+    "optimizer_gap": ("histogram", "Gap relativo de la solución devuelta")
+}
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    parts = [f'{k}="{_label_value(v)}"' for k, v in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Histograma de cubetas acumulativas como los de Prometheus"""
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def lines(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum:.6g}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+
+class SolverMetrics:
+    """Métricas de las resoluciones en el formato de texto de Prometheus"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (nombre, etiquetas) -> valor
+        self._histograms = {}  # (nombre, etiquetas) -> Histogram
+    
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name: str, labels: Dict[str, str], value: float,
+                buckets: Sequence[float] = TIME_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def record_solution(self, solution: Dict, mode: str, solver: str):
+        """Acumular una resolución: estado, duración, fases, tamaño de los modelos y gap"""
+        summary = solution.get("summary") or {}
+        self.inc("optimizer_solves_total", {"modo": mode, "solver": solver, "estado": solution["status"]})
+        self.observe("optimizer_solve_seconds", {"modo": mode}, solution["time"])
+        for phase, seconds in (summary.get("timings") or {}).items():
+            self.observe("optimizer_phase_seconds", {"fase": phase}, seconds)
+        for dimension, size in (summary.get("model_size") or {}).items():
+            self.observe("optimizer_model_size", {"dimension": dimension}, size, SIZE_BUCKETS)
+        if summary.get("gap") is not None:
+            self.observe("optimizer_gap", {"modo": mode}, summary["gap"], GAP_BUCKETS)
+    
+    def render(self, gauges: Dict[str, Tuple[float, str]] = None) -> str:
+        """
+        Exposición en texto (text/plain; version=0.0.4); gauges añade
+        valores instantáneos como {nombre: (valor, ayuda)}
+        """
+        by_name = {}
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                by_name.setdefault(name, []).append(f"{name}{_labels(labels)} {value:g}")
+            for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                by_name.setdefault(name, []).extend(histogram.lines(name, labels))
+        
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text = METRICS.get(name, ("untyped", name))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"] + by_name[name]
+        for name, (value, help_text) in sorted((gauges or {}).items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
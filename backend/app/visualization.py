@@ -0,0 +1,147 @@
+"""
+Dibujo de patrones de corte (SVG directo o PNG con matplotlib) y caché
+acotada de imágenes ya generadas
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# Configuración por variables de entorno
+IMAGE_CACHE_BYTES = int(os.environ.get("VISUALIZATION_CACHE_BYTES", 32 * 1024 * 1024))
+
+FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+
+# Paleta tab10 de matplotlib
+PALETTE = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+           "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf")
+
+
+def _placements(layout: Dict):
+    """Rectángulos colocados: (x, y, ancho, alto, color, etiqueta)"""
+    ids = layout.get("ids") or []
+    for j, (width, height, x, y, rotated) in enumerate(layout["pieces"]):
+        w, h = (height, width) if rotated else (width, height)
+        color = PALETTE[(ids[j] - 1 if j < len(ids) else j) % len(PALETTE)]
+        yield x, y, w, h, color, f"{width:g}x{height:g}"
+
+
+def render_svg(layout: Dict, title: str = "") -> bytes:
+    """SVG de un layout ({"material", "pieces", "ids"}) sin pasar por matplotlib"""
+    width, height = layout["material"]
+    scale = 800.0 / max(width, height)
+    margin = 20
+    W, H = width * scale + 2 * margin, height * scale + 2 * margin + (20 if title else 0)
+    top = margin + (20 if title else 0)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{W:.0f}" height="{H:.0f}" '
+             f'viewBox="0 0 {W:.1f} {H:.1f}" font-family="sans-serif">']
+    if title:
+        parts.append(f'<text x="{W / 2:.1f}" y="{margin:.1f}" text-anchor="middle" '
+                     f'font-size="14">{escape(title)}</text>')
+    # El origen del patrón está abajo a la izquierda, como en los ejes de matplotlib
+    parts.append(f'<rect x="{margin}" y="{top}" width="{width * scale:.2f}" '
+                 f'height="{height * scale:.2f}" fill="lightblue" fill-opacity="0.3" stroke="black"/>')
+    for x, y, w, h, color, label in _placements(layout):
+        px, py = margin + x * scale, top + (height - y - h) * scale
+        parts.append(f'<rect x="{px:.2f}" y="{py:.2f}" width="{w * scale:.2f}" '
+                     f'height="{h * scale:.2f}" fill="{color}" fill-opacity="0.7" stroke="black">'
+                     f'<title>{escape(label)}</title></rect>')
+        font = min(10.0, w * scale / max(len(label), 1) * 1.6, h * scale * 0.6)
+        if font >= 4:
+            parts.append(f'<text x="{px + w * scale / 2:.2f}" y="{py + h * scale / 2:.2f}" '
+                         f'text-anchor="middle" dominant-baseline="middle" '
+                         f'font-size="{font:.1f}">{escape(label)}</text>')
+    parts.append('</svg>')
+    return "\n".join(parts).encode("utf-8")
+
+
+def render_png(layout: Dict, title: str = "") -> bytes:
+    """
+    PNG de un layout con matplotlib, importado sólo al usarse. Se usa
+    Figure directamente (sin pyplot) para poder dibujar desde hilos.
+    """
+    from matplotlib.figure import Figure
+    import matplotlib.patches as patches
+
+    width, height = layout["material"]
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    ax.add_patch(patches.Rectangle(
+        (0, 0), width, height, edgecolor='black', facecolor='lightblue', alpha=0.3,
+        label=f'Material: {width}x{height}'
+    ))
+    for x, y, w, h, color, label in _placements(layout):
+        ax.add_patch(patches.Rectangle((x, y), w, h, edgecolor='black', facecolor=color, alpha=0.7))
+        ax.text(x + w/2, y + h/2, label, ha='center', va='center', fontsize=8, fontweight='bold')
+
+    ax.set_xlim(0, width * 1.1)
+    ax.set_ylim(0, height * 1.1)
+    ax.set_aspect('equal')
+    ax.set_xlabel('Ancho (cm)')
+    ax.set_ylabel('Alto (cm)')
+    ax.set_title(title or 'Patrón de Corte')
+    ax.grid(True, alpha=0.3)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    return buf.getvalue()
+
+
+RENDERERS = {"svg": render_svg, "png": render_png}
+
+
+def render(layout: Dict, fmt: str, title: str = "") -> bytes:
+    """Imagen de un layout en el formato pedido ("svg" o "png")"""
+    if fmt not in RENDERERS:
+        raise ValueError(f"Formato de imagen desconocido: {fmt}")
+    return RENDERERS[fmt](layout, title)
+
+
+class ImageCache:
+    """LRU de imágenes por (id de solución, patrón, formato) acotada en bytes"""
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int, str]) -> Optional[bytes]:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: Tuple[str, int, str], image: bytes):
+        # Imágenes mayores que toda la caché no se guardan
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = image
+            self._bytes += len(image)
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+
+    def get_stats(self) -> Dict:
+        """Ocupación y contadores de aciertos y fallos"""
+        with self._lock:
+            return {
+                "entradas": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.hits,
+                "fallos": self.misses
+            }
@@ -0,0 +1,344 @@
+"""
+Ejecución de optimizaciones en un pool de procesos
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from .consolidation import merge_orders, split_solution
+
+if TYPE_CHECKING:
+    from .optimizer import CuttingProblem
+
+# Configuración por variables de entorno
+WORKERS = int(os.environ.get("OPTIMIZER_WORKERS", os.cpu_count() or 1))
+MAX_QUEUE = int(os.environ.get("OPTIMIZER_MAX_QUEUE", 16))
+JOB_TIMEOUT_MARGIN = float(os.environ.get("OPTIMIZER_JOB_TIMEOUT_MARGIN", 30))
+# Los trabajadores nacen de un servidor limpio (forkserver) con el solver
+# ya importado: un fork directo de la API heredaría los bloqueos de los
+# hilos que estén importando módulos en segundo plano
+START_METHOD = os.environ.get(
+    "OPTIMIZER_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Canal de avance de cada proceso trabajador
+_progress_queue = None
+
+
+class PoolFullError(Exception):
+    """No quedan huecos en la cola de trabajos"""
+
+
+class PoolUnavailableError(Exception):
+    """El pool de procesos no está disponible"""
+
+
+def _init_worker(progress_queue=None):
+    """Inicializar el canal de avance del proceso trabajador"""
+    global _progress_queue
+    _progress_queue = progress_queue
+    # El solver (numpy, scipy) se carga en los trabajadores, no en la API
+    from . import optimizer  # noqa: F401
+
+
+def _worker_main(conn, progress_queue=None):
+    """
+    Bucle de un proceso trabajador: ejecutar las tareas (fn, args) que
+    llegan por conn y responder (True, resultado) o (False, excepción)
+    """
+    if hasattr(os, "setpgrp"):
+        # Grupo de procesos propio: al detener el trabajador caen también
+        # los subprocesos del solver (CBC)
+        os.setpgrp()
+    _init_worker(progress_queue)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Resultado o excepción que no se pueden serializar
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+def build_problem(request: Dict) -> "CuttingProblem":
+    """Instancia inmutable a partir de una solicitud (dict de OptimizationRequest)"""
+    from .optimizer import Material, Piece, SolverConfig, CuttingProblem
+
+    materials = tuple(
+        Material(i+1, m["ancho"], m["alto"], m["cantidad"], m.get("nombre"),
+                 offcut=m.get("retal", False))
+        for i, m in enumerate(request["materiales"])
+    )
+    pieces = tuple(
+        Piece(i+1, p["ancho"], p["alto"], p["demanda"], p.get("nombre"),
+              can_rotate=p.get("rotable", True))
+        for i, p in enumerate(request["piezas"])
+    )
+
+    config = request.get("config")
+    if config:
+        solver_config = SolverConfig(
+            use_substitution=config["usar_sustitucion"],
+            max_patterns=config["max_patrones"],
+            time_limit=config["tiempo_limite"],
+            # "auto" sólo llega aquí sin pasar por el enrutado de la API
+            mode="exacto" if config.get("modo") == "auto" else config.get("modo", "exacto"),
+            backend=config.get("solver", "cbc"),
+            stages=config.get("etapas") or 0,
+            kerf=config.get("kerf", 0.0),
+            trim=config.get("recorte", 0.0)
+        )
+    else:
+        solver_config = SolverConfig()
+
+    # Arranque en caliente con los patrones de una instancia parecida y,
+    # al reoptimizar, las columnas de la solución previa
+    warm_start = tuple(request.get("inicio") or ())
+    pattern_pool = tuple(request.get("patrones") or ())
+
+    return CuttingProblem(materials, pieces, solver_config, warm_start, pattern_pool)
+
+
+def solve_request(request: Dict, progress: Callable[[Dict], None] = None,
+                  should_stop: Callable[[], bool] = None) -> Dict:
+    """Resolver una solicitud en el proceso actual con un contexto propio"""
+    from .optimizer import solve_problem
+    return solve_problem(build_problem(request), progress=progress, should_stop=should_stop)
+
+
+def solve_consolidated(request: Dict, progress: Callable[[Dict], None] = None,
+                       should_stop: Callable[[], bool] = None) -> Dict:
+    """Resolver varios pedidos en un único modelo y repartir la solución por pedido"""
+    merged, owners = merge_orders(request)
+    solution = solve_request(merged, progress=progress, should_stop=should_stop)
+    solution.update(split_solution(solution, request, merged, owners))
+    return solution
+
+
+def solve_job(job_id: str, request: Dict) -> Dict:
+    """
+    Resolver un trabajo asíncrono publicando su avance en la cola del pool;
+    aceptarlo o cancelarlo detiene su proceso (SolverPool.stop)
+    """
+    def progress(event: Dict):
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, event))
+
+    return solve_request(request, progress=progress)
+
+
+class _Worker:
+    """Proceso trabajador persistente y el trabajo que está ejecutando"""
+
+    def __init__(self, context, progress_queue):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, progress_queue),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+        self.future = None
+        self.stopped = False
+
+    def kill(self):
+        """Matar el proceso con los subprocesos de su grupo"""
+        self.stopped = True
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # Sin grupos de procesos (o aún sin crear): sólo el trabajador
+            self.process.kill()
+
+
+class SolverPool:
+    """
+    Procesos trabajadores persistentes con cola acotada y tiempo límite por
+    trabajo. Un trabajo en marcha se detiene matando su proceso, que se
+    sustituye por otro para el siguiente trabajo.
+    """
+
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE,
+                 on_progress: Callable[[str, Dict], None] = None,
+                 on_progress_error: Callable[[str, Exception], None] = None):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.on_progress = on_progress
+        self.on_progress_error = on_progress_error
+        self._context = None
+        self._progress_queue = None
+        self._reader = None
+        self._workers = []  # proceso de cada hueco
+        self._threads = []  # hilo que atiende cada hueco
+        self._queue = deque()  # (future, fn, args) en espera
+        self._pending = 0
+        self._closed = True
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+
+    def start(self):
+        """Arrancar los procesos trabajadores y el lector de avance"""
+        context = multiprocessing.get_context(START_METHOD)
+        if START_METHOD == "forkserver":
+            context.set_forkserver_preload([f"{__package__}.optimizer"])
+        with self._lock:
+            if not self._closed:
+                return
+            self._closed = False
+            self._context = context
+            self._progress_queue = context.Queue()
+            self._workers = [_Worker(context, self._progress_queue) for _ in range(self.workers)]
+        self._reader = threading.Thread(target=self._read_progress, daemon=True)
+        self._reader.start()
+        self._threads = [threading.Thread(target=self._serve, args=(slot,), daemon=True)
+                         for slot in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def shutdown(self):
+        """Detener los procesos trabajadores y anular los trabajos en cola"""
+        with self._ready:
+            if self._closed:
+                return
+            self._closed = True
+            queued, self._queue = list(self._queue), deque()
+            for worker in self._workers:
+                worker.kill()
+            self._ready.notify_all()
+        for future, _, _ in queued:
+            future.cancel()
+        self._progress_queue.put(None)
+        for thread in [self._reader] + self._threads:
+            thread.join(timeout=1)
+
+    def _read_progress(self):
+        """
+        Reenviar los eventos de avance de los trabajadores; si no se puede
+        registrar el avance de un trabajo, se avisa a on_progress_error
+        """
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                break
+            if self.on_progress is not None:
+                job_id, event = item
+                try:
+                    self.on_progress(job_id, event)
+                except Exception as e:
+                    if self.on_progress_error is not None:
+                        self.on_progress_error(job_id, e)
+
+    def _serve(self, slot: int):
+        """Pasar trabajos de la cola al proceso de un hueco y publicar su resultado"""
+        while True:
+            with self._ready:
+                while not self._closed and not self._queue:
+                    self._ready.wait()
+                if self._closed:
+                    return
+                future, fn, args = self._queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                worker = self._workers[slot]
+                if worker.stopped or not worker.process.is_alive():
+                    worker = self._workers[slot] = _Worker(self._context, self._progress_queue)
+                worker.future = future
+
+            try:
+                worker.conn.send((fn, args))
+                ok, value = worker.conn.recv()
+            except (EOFError, OSError):
+                # Proceso detenido con stop() o caído
+                ok, value = False, BrokenProcessPool("El proceso trabajador terminó durante el trabajo")
+            except Exception as e:
+                # La tarea no se puede serializar
+                ok, value = False, e
+
+            with self._lock:
+                worker.future = None
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stop(self, future: Optional[Future]):
+        """
+        Detener un trabajo: se anula si sigue en cola y, si está en marcha, se
+        mata su proceso (con el subproceso del solver) para liberar el hueco
+        """
+        if future is None or future.cancel():
+            return
+        with self._lock:
+            for worker in self._workers:
+                if worker.future is future:
+                    worker.kill()
+
+    @property
+    def pending(self) -> int:
+        """Trabajos en ejecución o en cola"""
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args) -> Future:
+        """Encolar un trabajo; falla si la cola está llena"""
+        with self._ready:
+            if self._closed:
+                raise PoolUnavailableError("El pool de procesos no está iniciado")
+            if self._pending >= self.workers + self.max_queue:
+                raise PoolFullError("Cola de optimización llena")
+            self._pending += 1
+            future = Future()
+            self._queue.append((future, fn, args))
+            self._ready.notify()
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, timeout: Optional[float] = None):
+        """Ejecutar un trabajo en el pool esperando sin bloquear el bucle de eventos"""
+        return await self.wait(self.submit(fn, *args), timeout)
+
+    async def wait(self, future: Future, timeout: Optional[float] = None):
+        """
+        Esperar el resultado de un trabajo ya encolado; si se agota el tiempo
+        se detiene para que el trabajador no siga con lo que nadie espera
+        """
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.stop(future)
+            raise
+        except BrokenProcessPool as e:
+            raise PoolUnavailableError(str(e))
+
+    def get_stats(self) -> Dict:
+        """Estado del pool"""
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "running": not self._closed
+        }
+
+
+def job_timeout(request: Dict) -> float:
+    """Tiempo límite de un trabajo: el del solver más un margen"""
+    config = request.get("config") or {}
+    return config.get("tiempo_limite", 300) + JOB_TIMEOUT_MARGIN
@@ -0,0 +1,74 @@
+"""
+Benchmark de backends de resolución (CBC vs HiGHS) sobre /api/ejemplos
+
+Uso (desde backend/):
+    python -m benchmarks.bench_backends [--repeticiones 3] [--tiempo-limite 60] [--json salida.json]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from app.backends import BACKENDS
+from app.models import OptimizationRequest
+from app.pricing import knapsack_cache
+from app.workers import build_problem, solve_request
+from benchmarks.instances import example_instances
+
+
+def instancias(factores_stock):
+    """Ejemplos tal cual y con el stock multiplicado (los originales no alcanzan)"""
+    for factor in factores_stock:
+        for nombre, ejemplo in example_instances(factor):
+            yield f"{nombre} x{factor}", OptimizationRequest(**ejemplo).model_dump()
+
+
+def medir(datos, solver, tiempo_limite, repeticiones):
+    """Resolver varias veces desde cero y devolver la mediana de tiempo"""
+    datos = dict(datos, config={"usar_sustitucion": True, "max_patrones": 1000,
+                                "tiempo_limite": tiempo_limite, "modo": "exacto",
+                                "solver": solver})
+    build_problem(datos)  # validar antes de medir
+    tiempos, solucion = [], None
+    for _ in range(repeticiones):
+        knapsack_cache.clear()
+        inicio = time.perf_counter()
+        solucion = solve_request(datos)
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "tiempo": statistics.median(tiempos),
+        "estado": solucion["status"],
+        "desperdicio": solucion["waste"],
+        "placas": solucion["patterns_used"],
+        "iteraciones": solucion["summary"]["column_generation_iterations"],
+        "gap": solucion["summary"]["gap"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--tiempo-limite", type=int, default=60)
+    parser.add_argument("--stock", type=int, nargs="+", default=[1, 10],
+                        help="factores de stock a probar")
+    parser.add_argument("--json", help="guardar resultados en un fichero JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    print(f"{'instancia':<22} {'solver':<6} {'tiempo':>8} {'estado':<11} "
+          f"{'desperdicio':>12} {'placas':>6} {'iter':>5}")
+    for nombre, datos in instancias(args.stock):
+        for solver in BACKENDS:
+            r = medir(datos, solver, args.tiempo_limite, args.repeticiones)
+            r.update({"instancia": nombre, "solver": solver})
+            resultados.append(r)
+            print(f"{nombre:<22} {solver:<6} {r['tiempo']:>7.3f}s {r['estado']:<11} "
+                  f"{r['desperdicio']:>12.1f} {r['placas']:>6} {r['iteraciones']:>5}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
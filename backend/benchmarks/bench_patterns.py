@@ -0,0 +1,122 @@
+"""
+Memoria por patrón del almacén de patrones
+
+Uso (desde backend/):
+    python -m benchmarks.bench_patterns [--patrones 20000] [--tipos 30]
+
+Compara, con tracemalloc, los bytes por patrón del almacén actual
+(arrays estructurados contiguos en PatternMatrix) con la representación
+anterior: una lista de tuplas (Piece, x, y, rotated) y un dict de
+cuentas por patrón, más dos arrays pequeños por columna en la matriz.
+En ambos casos se cuenta también la clave de deduplicación del patrón.
+"""
+import argparse
+import random
+import tracemalloc
+
+import numpy as np
+
+from app.heuristics import PACKERS, pack
+from app.models import OptimizationRequest
+from app.optimizer import CuttingOptimizer2D
+from app.workers import build_problem
+from benchmarks.instances import generate_instance
+
+
+class LegacyPattern:
+    """Patrón con la representación anterior (tuplas y dict por patrón)"""
+
+    def __init__(self, pattern_id, material):
+        self.id = pattern_id
+        self.material = material
+        self.pieces = []
+        self.waste = material.area
+        self.piece_counts = {}
+
+    def add_piece(self, piece, x, y, rotated):
+        self.pieces.append((piece, x, y, rotated))
+        self.waste -= piece.area
+        self.piece_counts[piece.id] = self.piece_counts.get(piece.id, 0) + 1
+
+
+def legacy_store(layouts, pieces):
+    """Patrones, claves y columnas de la matriz como se guardaban antes"""
+    rows_of = {p.id: i for i, p in enumerate(pieces)}
+    patterns, keys = [], {}
+    rows, values, material, area, waste = [], [], [], [], []
+    for material_obj, placements in layouts:
+        pattern = LegacyPattern(len(patterns), material_obj)
+        for i, x, y, rotated in placements:
+            pattern.add_piece(pieces[i], float(x), float(y), bool(rotated))
+        keys[(material_obj.id, tuple(sorted(pattern.piece_counts.items())))] = pattern.id
+        patterns.append(pattern)
+        rows.append(np.array([rows_of[k] for k in pattern.piece_counts], dtype=np.int32))
+        values.append(np.array(list(pattern.piece_counts.values()), dtype=np.float64))
+        material.append(material_obj.id - 1)
+        area.append(material_obj.area)
+        waste.append(pattern.waste)
+    return patterns, keys, rows, values, material, area, waste
+
+
+def array_store(problem, layouts):
+    """Patrones en el almacén actual del optimizador"""
+    optimizer = CuttingOptimizer2D(problem)
+    optimizer._reset_patterns()
+    for material, placements in layouts:
+        optimizer._add_pattern(material, [(optimizer.pieces[i], x, y, rotated)
+                                          for i, x, y, rotated in placements])
+    return optimizer
+
+
+def measure(build):
+    """Resultado de build() y bytes que retiene"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return kept, sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def distinct_layouts(problem, n, seed):
+    """Placas distintas de empaquetados con demandas aleatorias"""
+    rng = random.Random(seed)
+    layouts, seen = [], set()
+    while len(layouts) < n:
+        demands = {p.id: rng.randint(0, 3) for p in problem.pieces}
+        result = pack(rng.choice(PACKERS), problem.materials, problem.pieces, demands)
+        for material, placements, _ in result["layouts"]:
+            counts = {}
+            for i, _, _, _ in placements:
+                counts[i] = counts.get(i, 0) + 1
+            key = (material.id, tuple(sorted(counts.items())))
+            if key not in seen:
+                seen.add(key)
+                layouts.append((material, placements))
+    return layouts[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patrones", type=int, default=20000)
+    parser.add_argument("--tipos", type=int, default=30)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    instancia = generate_instance(args.semilla, args.tipos, 10, "mixtas", "cartulina")
+    problem = build_problem(OptimizationRequest(**instancia).model_dump())
+    layouts = distinct_layouts(problem, args.patrones, args.semilla)
+    colocaciones = sum(len(p) for _, p in layouts) / len(layouts)
+
+    _, antes = measure(lambda: legacy_store(layouts, problem.pieces))
+    optimizer, despues = measure(lambda: array_store(problem, layouts))
+    n = len(optimizer.matrix)
+
+    print(f"{n} patrones, {colocaciones:.1f} colocaciones por patrón")
+    print(f"antes:   {antes / n:8.0f} bytes/patrón")
+    print(f"después: {despues / n:8.0f} bytes/patrón "
+          f"({optimizer.matrix.nbytes / n:.0f} en arrays, el resto en claves de deduplicación)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark del arranque en frío de la API: tiempo de `import app.main`
+
+Uso (desde backend/):
+    python -m benchmarks.bench_startup [--repeticiones 5] [--presupuesto 1.5]
+
+Cada medida es un intérprete nuevo. Termina con código 1 si la mediana
+supera el presupuesto o si el arranque carga módulos pesados que sólo
+necesitan el solver, el modelo ML o las imágenes.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Presupuesto por defecto del import de app.main (segundos)
+BUDGET = float(os.environ.get("STARTUP_BUDGET", 1.5))
+
+# Módulos que no deben cargarse al arrancar la API (el optimizador importa
+# numpy y scipy al nivel del módulo: sólo lo cargan los trabajadores)
+HEAVY_MODULES = ("matplotlib", "sklearn", "pandas", "pulp", "scipy", "numpy", "joblib",
+                 "app.optimizer")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"tiempo": elapsed, "modulos": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure() -> dict:
+    """Importar app.main en un proceso nuevo"""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=backend + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True,
+                            cwd=backend, env=env, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto", type=float, default=BUDGET,
+                        help="máximo de la mediana en segundos")
+    args = parser.parse_args()
+
+    measure()  # calentar la caché de bytecode y del sistema de ficheros
+    medidas = [measure() for _ in range(args.repeticiones)]
+    tiempos = [m["tiempo"] for m in medidas]
+    mediana = statistics.median(tiempos)
+    pesados = sorted({modulo for m in medidas for modulo in m["modulos"]})
+
+    print(f"import app.main: mediana {mediana:.3f}s (min {min(tiempos):.3f}s, "
+          f"max {max(tiempos):.3f}s), presupuesto {args.presupuesto:.3f}s")
+    fallos = []
+    if mediana > args.presupuesto:
+        fallos.append(f"el arranque supera el presupuesto ({mediana:.3f}s > {args.presupuesto:.3f}s)")
+    if pesados:
+        fallos.append(f"módulos pesados cargados al arrancar: {', '.join(pesados)}")
+    for fallo in fallos:
+        print(f"  - {fallo}")
+    if fallos:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
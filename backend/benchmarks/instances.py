@@ -0,0 +1,143 @@
+"""
+Instancias de benchmark: generador reproducible, ejemplos de la API y
+conjuntos de la literatura leídos de ficheros locales
+"""
+import glob
+import json
+import math
+import os
+import random
+from typing import Dict, Iterator, List, Tuple
+
+from app.examples import EJEMPLOS
+
+# Relaciones de aspecto (alto / ancho) de las piezas generadas
+ASPECTOS = {
+    "cuadradas": (0.8, 1.25),
+    "mixtas": (0.33, 3.0),
+    "alargadas": (0.1, 0.33)
+}
+
+# Placas estándar (ancho, alto)
+PLACAS = {
+    "tablero": (244, 183),
+    "vidrio": (244, 122),
+    "cartulina": (100, 70)
+}
+
+# Rejillas de parámetros de cada suite
+SUITES = {
+    "rapida": {
+        "tipos": [5, 15],
+        "demanda": [10],
+        "aspecto": ["cuadradas", "mixtas"],
+        "placa": ["tablero"],
+        "semillas": [1]
+    },
+    "nocturna": {
+        "tipos": [5, 20, 50],
+        "demanda": [10, 100],
+        "aspecto": ["cuadradas", "mixtas", "alargadas"],
+        "placa": ["tablero", "cartulina"],
+        "semillas": [1, 2]
+    }
+}
+
+
+def generate_instance(seed: int, tipos: int, demanda: int, aspecto: str = "mixtas",
+                      placa: str = "tablero", holgura_stock: float = 1.5) -> Dict:
+    """
+    Instancia aleatoria reproducible en formato de solicitud de la API.
+
+    Las piezas ocupan entre el 0.5% y el 25% de la placa, con demandas
+    de 1 a `demanda`; el stock cubre `holgura_stock` veces el área pedida.
+    """
+    rng = random.Random(f"{seed}-{tipos}-{demanda}-{aspecto}-{placa}")
+    ancho, alto = PLACAS[placa]
+    low, high = ASPECTOS[aspecto]
+
+    piezas = []
+    while len(piezas) < tipos:
+        area = ancho * alto * rng.uniform(0.005, 0.25)
+        ratio = math.exp(rng.uniform(math.log(low), math.log(high)))
+        w = round(math.sqrt(area / ratio), 1)
+        h = round(w * ratio, 1)
+        # Debe caber en la placa en alguna orientación
+        if not ((w <= ancho and h <= alto) or (h <= ancho and w <= alto)) or w < 1 or h < 1:
+            continue
+        piezas.append({"ancho": w, "alto": h, "demanda": rng.randint(1, demanda),
+                       "nombre": f"P{len(piezas) + 1}"})
+
+    area_piezas = sum(p["ancho"] * p["alto"] * p["demanda"] for p in piezas)
+    cantidad = int(math.ceil(holgura_stock * area_piezas / (ancho * alto))) + 1
+    return {
+        "materiales": [{"ancho": ancho, "alto": alto, "cantidad": cantidad, "nombre": placa}],
+        "piezas": piezas
+    }
+
+
+def generated_suite(nombre: str) -> Iterator[Tuple[str, Dict]]:
+    """Instancias generadas de una suite"""
+    grid = SUITES[nombre]
+    for seed in grid["semillas"]:
+        for tipos in grid["tipos"]:
+            for demanda in grid["demanda"]:
+                for aspecto in grid["aspecto"]:
+                    for placa in grid["placa"]:
+                        clave = f"gen-{placa}-{aspecto}-t{tipos}-d{demanda}-s{seed}"
+                        yield clave, generate_instance(seed, tipos, demanda, aspecto, placa)
+
+
+def example_instances(factor_stock: int = 10) -> Iterator[Tuple[str, Dict]]:
+    """
+    Ejemplos de /api/ejemplos; el stock original no alcanza para la
+    demanda, así que se multiplica por factor_stock.
+    """
+    for nombre, ejemplo in EJEMPLOS.items():
+        materiales = [dict(m, cantidad=m["cantidad"] * factor_stock) for m in ejemplo["materiales"]]
+        yield nombre, {"materiales": materiales, "piezas": [dict(p) for p in ejemplo["piezas"]]}
+
+
+def read_literature_file(path: str) -> Dict:
+    """
+    Leer una instancia de la literatura.
+
+    Formatos admitidos:
+    - .json: solicitud de la API (materiales / piezas)
+    - texto estilo OR-Library: número de tipos m, ancho y alto de la
+      placa y m líneas "ancho alto demanda [valor]"; la cantidad de
+      placas se toma como ilimitada (cubre toda la demanda).
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+
+    with open(path) as f:
+        tokens = f.read().split()
+    m = int(tokens[0])
+    ancho, alto = float(tokens[1]), float(tokens[2])
+    rest = tokens[3:]
+    fields = len(rest) // m if m else 3
+    if fields not in (3, 4):
+        raise ValueError(f"{path}: se esperaban 3 o 4 valores por pieza")
+
+    piezas = []
+    for i in range(m):
+        w, h, d = rest[i * fields:i * fields + 3]
+        piezas.append({"ancho": float(w), "alto": float(h), "demanda": int(float(d)),
+                       "nombre": f"P{i + 1}"})
+    cantidad = sum(p["demanda"] for p in piezas)
+    return {
+        "materiales": [{"ancho": ancho, "alto": alto, "cantidad": cantidad,
+                        "nombre": os.path.basename(path)}],
+        "piezas": piezas
+    }
+
+
+def literature_instances(directorio: str) -> Iterator[Tuple[str, Dict]]:
+    """Instancias de ficheros locales (*.json, *.txt, *.dat) de un directorio"""
+    paths: List[str] = []
+    for pattern in ("*.json", "*.txt", "*.dat"):
+        paths.extend(glob.glob(os.path.join(directorio, pattern)))
+    for path in sorted(paths):
+        yield f"lit-{os.path.splitext(os.path.basename(path))[0]}", read_literature_file(path)
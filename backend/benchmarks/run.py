@@ -0,0 +1,202 @@
+"""
+Suite de benchmarks del optimizador
+
+Uso (desde backend/):
+    python -m benchmarks.run --suite rapida
+    python -m benchmarks.run --suite nocturna --literatura datos/ --salida nocturna \
+        --baseline benchmarks/baseline.json
+
+Cada caso (instancia x modo) se resuelve en un proceso nuevo para medir
+tiempo, memoria pico (RSS) y calidad en frío. Los resultados se guardan
+en <salida>.json y <salida>.csv; con --baseline se comparan con una
+ejecución anterior y el proceso termina con código 1 si hay regresiones.
+Con --telemetria cada caso se añade además al registro de resoluciones
+con el que se entrena el enrutado del modo "auto" (ml/training/train_router.py).
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.models import OptimizationRequest
+from app.routing import SolveLog
+from benchmarks.instances import SUITES, example_instances, generated_suite, literature_instances
+
+# Modos de resolución: configuración de la solicitud
+MODOS = {
+    "rapido": {"modo": "rapido"},
+    "exacto-cbc": {"modo": "exacto", "solver": "cbc"},
+    "exacto-highs": {"modo": "exacto", "solver": "highs"},
+    "columnas": {"modo": "columnas", "solver": "cbc"},
+    "etapas2": {"modo": "exacto", "solver": "cbc", "etapas": 2},
+    "etapas3": {"modo": "exacto", "solver": "cbc", "etapas": 3}
+}
+
+# Columnas del CSV
+CAMPOS = ["instancia", "modo", "tipos", "piezas", "estado", "tiempo", "memoria_mb",
+          "desperdicio", "desperdicio_pct", "gap", "placas"]
+
+# Diferencias de tiempo menores que esto se consideran ruido (segundos)
+RUIDO_TIEMPO = 0.05
+
+
+def _peak_memory_mb() -> Optional[float]:
+    """Memoria residente pico del proceso actual"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(datos: Dict, telemetria: bool = False) -> Dict:
+    """Resolver un caso (en un proceso trabajador nuevo)"""
+    from app.routing import solve_record
+    from app.workers import solve_request
+
+    inicio = time.perf_counter()
+    solucion = solve_request(datos)
+    tiempo = time.perf_counter() - inicio
+
+    demandada = sum(p["ancho"] * p["alto"] * p["demanda"] for p in datos["piezas"])
+    consumida = solucion["waste"] + demandada if solucion["patterns_used"] else 0.0
+    resultado = {
+        "estado": solucion["status"],
+        "tiempo": tiempo,
+        "memoria_mb": _peak_memory_mb(),
+        "desperdicio": solucion["waste"],
+        "desperdicio_pct": 100 * solucion["waste"] / consumida if consumida > 0 else None,
+        "gap": solucion["summary"].get("gap"),
+        "placas": solucion["patterns_used"]
+    }
+    if telemetria:
+        resultado["telemetria"] = solve_record(datos, solucion)
+    return resultado
+
+
+def _environment() -> Dict:
+    import numpy
+    import pulp
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "pulp": pulp.__version__
+    }
+
+
+def compare(resultados: List[Dict], baseline: Dict, tol_tiempo: float,
+            tol_desperdicio: float, tol_memoria: float) -> List[str]:
+    """Regresiones respecto a una ejecución de referencia"""
+    previos = {(r["instancia"], r["modo"]): r for r in baseline["resultados"]}
+    regresiones = []
+    for r in resultados:
+        b = previos.get((r["instancia"], r["modo"]))
+        if b is None:
+            continue
+        caso = f"{r['instancia']} [{r['modo']}]"
+        if (r["tiempo"] > b["tiempo"] * (1 + tol_tiempo) and
+                r["tiempo"] - b["tiempo"] > RUIDO_TIEMPO):
+            regresiones.append(f"{caso}: tiempo {b['tiempo']:.3f}s -> {r['tiempo']:.3f}s")
+        if (r["desperdicio_pct"] is not None and b["desperdicio_pct"] is not None and
+                r["desperdicio_pct"] > b["desperdicio_pct"] + tol_desperdicio):
+            regresiones.append(f"{caso}: desperdicio {b['desperdicio_pct']:.2f}% -> "
+                               f"{r['desperdicio_pct']:.2f}%")
+        if (r["memoria_mb"] and b["memoria_mb"] and
+                r["memoria_mb"] > b["memoria_mb"] * (1 + tol_memoria)):
+            regresiones.append(f"{caso}: memoria {b['memoria_mb']:.0f}MB -> {r['memoria_mb']:.0f}MB")
+        if b["estado"] == "Optimal" and r["estado"] != "Optimal":
+            regresiones.append(f"{caso}: estado {b['estado']} -> {r['estado']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks del optimizador")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="rapida")
+    parser.add_argument("--sin-ejemplos", action="store_true",
+                        help="no incluir las instancias de /api/ejemplos")
+    parser.add_argument("--literatura", help="directorio con instancias de la literatura")
+    parser.add_argument("--modos", nargs="+", choices=sorted(MODOS), default=sorted(MODOS))
+    parser.add_argument("--tiempo-limite", type=int, default=60)
+    parser.add_argument("--salida", default="benchmark", help="prefijo de <salida>.json/.csv")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--telemetria", help="JSONL al que añadir el registro de cada resolución")
+    parser.add_argument("--tolerancia-tiempo", type=float, default=0.25,
+                        help="aumento relativo de tiempo admitido")
+    parser.add_argument("--tolerancia-desperdicio", type=float, default=0.5,
+                        help="aumento admitido en puntos porcentuales de desperdicio")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.25,
+                        help="aumento relativo de memoria pico admitido")
+    args = parser.parse_args()
+
+    instancias = list(generated_suite(args.suite))
+    if not args.sin_ejemplos:
+        instancias += list(example_instances())
+    if args.literatura:
+        instancias += list(literature_instances(args.literatura))
+
+    resultados = []
+    registro = SolveLog(args.telemetria) if args.telemetria else None
+    contexto = multiprocessing.get_context("spawn")
+    print(f"{'instancia':<40} {'modo':<13} {'tiempo':>8} {'memoria':>8} {'desp.%':>7} "
+          f"{'gap':>7} estado")
+    with contexto.Pool(1, maxtasksperchild=1) as pool:
+        for nombre, instancia in instancias:
+            for modo in args.modos:
+                config = dict(MODOS[modo], tiempo_limite=args.tiempo_limite)
+                # Misma normalización que la API (configuración completa)
+                datos = OptimizationRequest(**dict(instancia, config=config)).model_dump()
+                r = pool.apply(run_case, (datos, registro is not None))
+                if registro is not None:
+                    registro.append(r.pop("telemetria"))
+                r.update({
+                    "instancia": nombre,
+                    "modo": modo,
+                    "tipos": len(instancia["piezas"]),
+                    "piezas": sum(p["demanda"] for p in instancia["piezas"])
+                })
+                resultados.append(r)
+                print(f"{nombre:<40} {modo:<13} {r['tiempo']:>7.2f}s "
+                      f"{(r['memoria_mb'] or 0):>6.0f}MB "
+                      f"{(r['desperdicio_pct'] if r['desperdicio_pct'] is not None else float('nan')):>7.2f} "
+                      f"{(r['gap'] if r['gap'] is not None else float('nan')):>7.3f} {r['estado']}")
+
+    informe = {
+        "fecha": datetime.now().isoformat(),
+        "suite": args.suite,
+        "tiempo_limite": args.tiempo_limite,
+        "entorno": _environment(),
+        "resultados": resultados
+    }
+    with open(f"{args.salida}.json", "w") as f:
+        json.dump(informe, f, indent=2)
+    with open(f"{args.salida}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CAMPOS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(resultados)
+    print(f"Resultados en {args.salida}.json y {args.salida}.csv")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regresiones = compare(resultados, baseline, args.tolerancia_tiempo,
+                              args.tolerancia_desperdicio, args.tolerancia_memoria)
+        if regresiones:
+            print(f"{len(regresiones)} regresiones respecto a {args.baseline}:")
+            for regresion in regresiones:
+                print(f"  - {regresion}")
+            sys.exit(1)
+        print(f"Sin regresiones respecto a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Regresiones de la caché de soluciones
+
+    cd backend && python -m pytest -q tests
+"""
+import pytest
+
+from app.cache import REUSE_MAX_GAP, reusable
+
+
+@pytest.mark.parametrize("gap, esperado", [
+    (0.0, True),
+    (REUSE_MAX_GAP, True),
+    # Parada por tiempo o plan aceptado de un trabajo en curso
+    (0.2, False),
+    # Heurística sin cota
+    (None, False),
+])
+def test_solo_se_reutilizan_soluciones_demostradas(gap, esperado):
+    assert reusable({"summary": {"gap": gap}}) is esperado
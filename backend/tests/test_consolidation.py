@@ -0,0 +1,38 @@
+"""
+Regresiones de la consolidación de pedidos
+
+    cd backend && python -m pytest -q tests
+"""
+from app.consolidation import merge_orders
+from app.models import ConsolidationRequest
+from app.workers import solve_consolidated
+
+
+def _request(pedidos):
+    return ConsolidationRequest(materiales=[{"ancho": 100, "alto": 70, "cantidad": 20}],
+                                pedidos=pedidos, config={"tiempo_limite": 10}).model_dump()
+
+
+def test_medidas_cruzadas_de_piezas_rotables_se_funden():
+    merged, owners = merge_orders(_request([
+        {"id": "A", "piezas": [{"ancho": 43, "alto": 28, "demanda": 3}]},
+        {"id": "B", "piezas": [{"ancho": 28, "alto": 43, "demanda": 3},
+                               {"ancho": 28, "alto": 43, "demanda": 1, "rotable": False}]}
+    ]))
+    assert [(p["ancho"], p["alto"], p["demanda"]) for p in merged["piezas"]] == [(43, 28, 6), (28, 43, 1)]
+    assert owners[0] == [(0, 0, 3, False), (1, 0, 3, True)]
+
+
+def test_reparto_en_la_orientacion_de_cada_pedido():
+    solution = solve_consolidated(_request([
+        {"id": "A", "piezas": [{"ancho": 43, "alto": 28, "demanda": 3}]},
+        {"id": "B", "piezas": [{"ancho": 28, "alto": 43, "demanda": 3}]}
+    ]))
+    footprints = set()
+    for order, size in zip(solution["pedidos"], [(43, 28), (28, 43)]):
+        assert order["completo"]
+        for sheet in order["hojas"]:
+            for width, height, _, _, rotated, _ in sheet["piezas"]:
+                assert (width, height) == size
+                footprints.add((height, width) if rotated else (width, height))
+    assert footprints <= {(43, 28), (28, 43)}
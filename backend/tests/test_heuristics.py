@@ -0,0 +1,39 @@
+"""
+Regresiones de las heurísticas constructivas
+
+    cd backend && python -m pytest -q tests
+"""
+import pytest
+
+from app.heuristics import PACKERS, pack
+from app.optimizer import CuttingOptimizer2D
+
+
+def _problem(width, height, quantity, pieces):
+    optimizer = CuttingOptimizer2D()
+    optimizer.add_material(width, height, quantity)
+    for i, (w, h, demand) in enumerate(pieces):
+        optimizer.add_piece(i, w, h, demand)
+    return optimizer
+
+
+@pytest.mark.parametrize("packer_cls", PACKERS, ids=lambda cls: cls.name)
+@pytest.mark.parametrize("pieces, sheets", [
+    ([(50, 50, 3)], 2),  # dos piezas llenan la placa y queda demanda
+    ([(100, 50, 2)], 2),  # una pieza del tamaño de la placa
+])
+def test_placa_llena_exactamente(packer_cls, pieces, sheets):
+    optimizer = _problem(100, 50, 3, pieces)
+    result = pack(packer_cls, optimizer.materials, optimizer.pieces)
+    assert result["unplaced"] == {}
+    assert sum(times for _, _, times in result["layouts"]) == sheets
+
+
+@pytest.mark.parametrize("modo", ["rapido", "exacto"])
+def test_encaje_perfecto_en_el_solver(modo):
+    optimizer = _problem(100, 50, 3, [(50, 50, 4)])
+    optimizer.set_config(mode=modo, time_limit=10)
+    solution = optimizer.solve()
+    assert solution["status"] in ("Optimal", "Feasible")
+    assert solution["patterns_used"] == 2
+    assert solution["waste"] == pytest.approx(0.0)
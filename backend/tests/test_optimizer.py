@@ -0,0 +1,87 @@
+"""
+Regresiones del optimizador
+
+    cd backend && python -m pytest -q tests
+"""
+import pytest
+
+from app.optimizer import CuttingOptimizer2D
+
+MODOS = ["rapido", "columnas", "exacto"]
+
+
+def _optimizer(materials, pieces, **config):
+    optimizer = CuttingOptimizer2D()
+    for width, height, quantity in materials:
+        optimizer.add_material(width, height, quantity)
+    for i, (width, height, demand, can_rotate) in enumerate(pieces):
+        optimizer.add_piece(i, width, height, demand, can_rotate=can_rotate)
+    optimizer.set_config(time_limit=10, **config)
+    return optimizer
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_pieza_que_no_cabe_en_ninguna_placa(modo):
+    optimizer = _optimizer([(100, 50, 3)], [(200, 50, 1, True), (20, 20, 3, True)], mode=modo)
+    solution = optimizer.solve()
+    assert solution["status"] == "Infeasible"
+    assert solution["summary"]["unplaced"] == {0: 1}
+    # El resto de la demanda sí se corta
+    assert solution["patterns_used"] == 1
+    assert solution["waste"] == pytest.approx(100 * 50 - 3 * 20 * 20)
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_pieza_sin_giro_que_solo_cabe_girada(modo):
+    optimizer = _optimizer([(100, 70, 3)], [(70, 100, 1, False)], mode=modo)
+    solution = optimizer.solve()
+    assert solution["status"] == "Infeasible"
+    assert solution["summary"]["unplaced"] == {0: 1}
+    assert solution["patterns_used"] == 0
+
+
+def test_desperdicio_de_un_plan_parcial():
+    # Material para una sola de las dos piezas
+    optimizer = _optimizer([(100, 50, 1)], [(60, 50, 2, True)], mode="rapido")
+    solution = optimizer.solve()
+    assert solution["status"] == "Infeasible"
+    assert solution["patterns_used"] == 1
+    assert solution["waste"] == pytest.approx(100 * 50 - 60 * 50)
+
+
+@pytest.mark.parametrize("modo", MODOS)
+def test_plan_parcial_sin_material_suficiente(modo):
+    # Hacen falta 4 placas y hay 2: todos los modos cortan lo que cabe
+    optimizer = _optimizer([(100, 50, 2)], [(60, 50, 3, False), (30, 20, 2, True)], mode=modo)
+    solution = optimizer.solve()
+    assert solution["status"] == "Infeasible"
+    assert solution["patterns_used"] == 2
+    unplaced = solution["summary"]["unplaced"]
+    assert unplaced.get(0, 0) == 1
+    assert solution["waste"] == pytest.approx(2 * 100 * 50 - 2 * 60 * 50 - (2 - unplaced.get(1, 0)) * 30 * 20)
+
+
+@pytest.mark.parametrize("backend", ["cbc", "highs"])
+def test_gap_frente_a_la_cota_de_columnas(backend):
+    # El MIP del residuo (patrones de la relajación fijados) no acota el
+    # problema completo: el gap se mide con la cota de la generación de columnas
+    optimizer = _optimizer([(100, 70, 20)], [(43, 28, 10, True), (25, 18, 12, True)],
+                           mode="exacto", backend=backend)
+    solution = optimizer.solve()
+    summary = solution["summary"]
+    assert solution["status"] == "Optimal"
+    material_area = solution["patterns_used"] * 100 * 70
+    lower = summary["bound"] + 10 * 43 * 28 + 12 * 25 * 18
+    assert summary["gap"] == pytest.approx((material_area - lower) / material_area)
+    assert summary["gap"] > 0
+
+
+@pytest.mark.parametrize("backend", ["cbc", "highs"])
+def test_mip_infactible_sin_exceder_el_material(backend):
+    # Hacen falta 4 placas y hay 2
+    optimizer = _optimizer([(100, 50, 2)], [(60, 50, 4, False)], mode="exacto", backend=backend)
+    solution = optimizer.solve()
+    assert solution["status"] == "Infeasible"
+    assert solution["patterns_used"] <= 2
+    produced = 4 - solution["summary"]["unplaced"].get(0, 0)
+    assert produced == solution["patterns_used"]
@@ -0,0 +1,48 @@
+"""
+Regresiones de la matriz de patrones
+
+    cd backend && python -m pytest -q tests
+"""
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.pattern_matrix import dominating_columns
+
+
+def _dominating_dense(dense, material):
+    """Referencia: comparación exhaustiva sobre la matriz densa"""
+    n = dense.shape[1]
+    dominator = np.arange(n)
+    totals = dense.sum(axis=0)
+    for m in np.unique(material):
+        columns = np.flatnonzero(material == m)
+        kept = []
+        for j in columns[np.argsort(-totals[columns], kind="stable")]:
+            covering = [k for k in kept if np.all(dense[:, k] >= dense[:, j])]
+            if covering:
+                dominator[j] = covering[0]
+            else:
+                kept.append(j)
+    return dominator
+
+
+def test_columna_dominada_por_otra_del_mismo_material():
+    counts = sparse.csr_matrix(np.array([
+        [2, 1, 2, 0, 2],
+        [1, 1, 1, 0, 0],
+        [0, 0, 0, 0, 3],
+    ], dtype=float))
+    material = np.array([0, 0, 1, 0, 0])
+    # La columna 2 es de otro material; la 3 está vacía y se queda la primera conservada
+    assert dominating_columns(counts, material).tolist() == [0, 0, 2, 4, 4]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_igual_que_la_comparacion_densa(seed):
+    rng = np.random.default_rng(seed)
+    rows, n = rng.integers(1, 10), rng.integers(0, 60)
+    dense = rng.integers(0, 4, size=(rows, n)) * (rng.random((rows, n)) < rng.random())
+    material = rng.integers(0, 3, size=n)
+    counts = sparse.csr_matrix(dense.astype(float))
+    assert dominating_columns(counts, material).tolist() == _dominating_dense(dense, material).tolist()
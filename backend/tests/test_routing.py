@@ -0,0 +1,34 @@
+"""
+Regresiones del enrutado y su telemetría
+
+    cd backend && python -m pytest -q tests
+"""
+import importlib
+import logging
+
+from app import routing
+
+SOLUCION = {"waste": 10.0, "time": 0.1, "status": "Optimal", "summary": {"gap": 0.0}}
+SOLICITUD = {"materiales": [{"ancho": 100, "alto": 50, "cantidad": 2}],
+             "piezas": [{"ancho": 20, "alto": 10, "demanda": 3}], "config": {}}
+
+
+def test_telemetria_desactivada_sin_ruta(monkeypatch):
+    monkeypatch.delenv("SOLVE_LOG_PATH", raising=False)
+    modulo = importlib.reload(routing)
+    try:
+        registro = modulo.SolveLog()
+        registro.record(SOLICITUD, SOLUCION)
+        assert registro.path is None
+        assert registro.records == 0
+    finally:
+        monkeypatch.undo()
+        importlib.reload(routing)
+
+
+def test_error_de_escritura_va_al_log(tmp_path, caplog):
+    registro = routing.SolveLog(str(tmp_path))  # un directorio no se puede abrir para añadir
+    with caplog.at_level(logging.WARNING, logger="app.routing"):
+        registro.record(SOLICITUD, SOLUCION)
+    assert registro.records == 0
+    assert "No se pudo registrar la telemetría" in caplog.text
@@ -0,0 +1,121 @@
+"""
+Regresiones del pool de procesos
+
+    cd backend && python -m pytest -q tests
+"""
+import asyncio
+import os
+import queue
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.backends import CBCBackend, MasterModel
+from app.workers import PoolFullError, SolverPool
+
+linux = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="procesos por /proc")
+
+
+def _market_split(m: int = 4, n: int = 40) -> MasterModel:
+    """MIP de reparto de mercado: CBC tarda mucho más que el tiempo límite de los tests"""
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 100, size=(m, n)).astype(float)
+    rhs = np.floor(a.sum(axis=1) / 2)
+    return MasterModel(
+        costs=np.zeros(n),
+        demand=sparse.csr_matrix(a), demand_rhs=rhs, demand_ids=list(range(m)),
+        stock=sparse.vstack([sparse.csr_matrix(a), sparse.identity(n, format="csr")], format="csr"),
+        stock_rhs=np.concatenate([rhs, np.ones(n)]), stock_ids=list(range(m + n))
+    )
+
+
+def _grupo(pgid: int):
+    """Procesos vivos de un grupo"""
+    vivos = []
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                estado, _, grupo = f.read().rsplit(")", 1)[1].split()[:3]
+        except OSError:
+            continue
+        if int(grupo) == pgid and estado != "Z":
+            vivos.append(int(entrada))
+    return vivos
+
+
+def _esperar(condicion, segundos: float = 10):
+    limite = time.time() + segundos
+    while not condicion():
+        assert time.time() < limite
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def pool():
+    pool = SolverPool(workers=1, max_queue=0)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@linux
+def test_detener_un_trabajo_durante_el_mip_libera_el_hueco(pool):
+    future = pool.submit(CBCBackend().solve_mip, _market_split(), 120, 0.0)
+    trabajador = pool._workers[0].process.pid
+    # CBC resolviendo en el grupo de procesos del trabajador
+    _esperar(lambda: len(_grupo(trabajador)) > 1, 30)
+    with pytest.raises(PoolFullError):
+        pool.submit(os.getpid)
+
+    # Como al aceptar o cancelar un trabajo
+    pool.stop(future)
+    with pytest.raises(BrokenProcessPool):
+        future.result(timeout=5)
+    _esperar(lambda: pool.pending == 0, 5)
+    _esperar(lambda: not _grupo(trabajador), 5)
+
+    # El hueco atiende el siguiente trabajo en un proceso nuevo
+    assert pool.submit(os.getpid).result(timeout=30) != trabajador
+
+
+def test_tiempo_agotado_detiene_el_trabajo(pool):
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(pool.run(time.sleep, 60, timeout=1))
+    _esperar(lambda: pool.pending == 0, 5)
+    assert pool.submit(sum, [1, 2]).result(timeout=30) == 3
+
+
+def test_cancelar_un_trabajo_en_cola():
+    pool = SolverPool(workers=1, max_queue=1)
+    pool.start()
+    try:
+        primero = pool.submit(time.sleep, 60)
+        segundo = pool.submit(sum, [1, 2])
+        pool.stop(segundo)
+        assert segundo.cancelled()
+        pool.stop(primero)
+        _esperar(lambda: pool.pending == 0, 5)
+    finally:
+        pool.shutdown()
+
+
+def test_error_al_registrar_el_avance_se_notifica():
+    errores = []
+
+    def on_progress(job_id, event):
+        raise ValueError("evento corrupto")
+
+    pool = SolverPool(workers=1, on_progress=on_progress,
+                      on_progress_error=lambda job_id, e: errores.append((job_id, str(e))))
+    pool._progress_queue = queue.Queue()
+    pool._progress_queue.put(("abc", {"phase": "lp"}))
+    pool._progress_queue.put(None)
+    pool._read_progress()
+
+    assert errores == [("abc", "evento corrupto")]
@@ -0,0 +1,151 @@
+"""
+Datos de entrenamiento a partir de resoluciones reales
+
+Genera instancias aleatorias reproducibles (una por semilla), las resuelve
+en paralelo con el optimizador de la API y va escribiendo cada tanda de
+muestras (características + resultado) en CSV o en partes Parquet. Si se
+interrumpe, al relanzarlo con la misma salida continúa por las semillas
+que faltan.
+
+Uso:
+    python generate_data.py --instancias 5000 --procesos 8 --salida ../data/muestras.csv
+    python generate_data.py --instancias 5000 --salida ../data/muestras.parquet  # requiere pyarrow
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend")
+sys.path.insert(0, BACKEND)
+from app.ml_predictor import ALL_FEATURES, feature_matrix
+from benchmarks.instances import ASPECTOS, PLACAS, generate_instance
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+# Resultado de cada resolución que acompaña a las características
+RESULTS = ["modo", "estado", "waste", "desperdicio_pct", "tiempo", "gap", "placas"]
+
+def sample_instance(seed):
+    """Instancia aleatoria de una semilla: tamaño, demanda, forma y placa al azar"""
+    rng = random.Random(seed)
+    return generate_instance(
+        seed,
+        tipos=rng.randint(2, 40),
+        demanda=rng.choice([1, 5, 10, 20, 50, 100]),
+        aspecto=rng.choice(sorted(ASPECTOS)),
+        placa=rng.choice(sorted(PLACAS)),
+        holgura_stock=rng.uniform(1.2, 3.0)
+    )
+
+def solve_sample(task):
+    """Resolver la instancia de una semilla (en un proceso del pool)"""
+    from app.models import OptimizationRequest
+    from app.workers import solve_request
+
+    seed, config = task
+    datos = OptimizationRequest(**dict(sample_instance(seed), config=config)).model_dump()
+    inicio = time.perf_counter()
+    try:
+        solucion = solve_request(datos)
+    except Exception as e:
+        print(f"  semilla {seed}: {e}")
+        return seed, datos, {"modo": config["modo"], "estado": "Error"}
+
+    demandada = sum(p["ancho"] * p["alto"] * p["demanda"] for p in datos["piezas"])
+    consumida = solucion["waste"] + demandada
+    return seed, datos, {
+        "modo": config["modo"],
+        "estado": solucion["status"],
+        "waste": solucion["waste"],
+        "desperdicio_pct": 100 * solucion["waste"] / consumida if consumida > 0 else None,
+        "tiempo": time.perf_counter() - inicio,
+        "gap": solucion["summary"].get("gap"),
+        "placas": solucion["patterns_used"]
+    }
+
+def to_frame(batch):
+    """Tanda de resultados como DataFrame; las características, de una vez con feature_matrix"""
+    seeds, requests, results = zip(*batch)
+    frame = pd.DataFrame(feature_matrix(requests, ALL_FEATURES), columns=list(ALL_FEATURES))
+    frame.insert(0, "semilla", seeds)
+    results = pd.DataFrame(list(results), columns=RESULTS)
+    return pd.concat([frame, results], axis=1)
+
+class SampleWriter:
+    """Salida incremental: un CSV que crece o un directorio de partes Parquet"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        if self.parquet:
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def done(self):
+        """Semillas ya escritas (una fila truncada por una interrupción no cuenta)"""
+        if self.parquet:
+            frames = [pd.read_parquet(part, columns=["semilla", "estado"]) for part in self.parts()]
+            frame = pd.concat(frames) if frames else None
+        elif os.path.exists(self.path):
+            frame = pd.read_csv(self.path, usecols=["semilla", "estado"], on_bad_lines="skip")
+        else:
+            frame = None
+        if frame is None:
+            return set()
+        return set(frame.dropna(subset=["estado"])["semilla"].astype(int))
+
+    def write(self, frame):
+        if self.parquet:
+            frame.to_parquet(os.path.join(self.path, f"part-{len(self.parts()):05d}.parquet"), index=False)
+        else:
+            frame.to_csv(self.path, mode="a", header=not os.path.exists(self.path), index=False)
+
+def generate(instancias, salida, procesos, config, primera=0, tanda=50):
+    """Resolver las semillas [primera, primera + instancias) que falten en la salida"""
+    writer = SampleWriter(salida)
+    done = writer.done()
+    pending = [seed for seed in range(primera, primera + instancias) if seed not in done]
+    print(f"🔧 {len(done)} muestras ya en {salida}, {len(pending)} por resolver con {procesos} procesos")
+
+    batch, written = [], 0
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(procesos, maxtasksperchild=50) as pool:
+        try:
+            for result in pool.imap_unordered(solve_sample, [(seed, config) for seed in pending]):
+                batch.append(result)
+                if len(batch) >= tanda:
+                    writer.write(to_frame(batch))
+                    written += len(batch)
+                    batch = []
+                    print(f"  {written}/{len(pending)} muestras")
+        finally:
+            # Lo resuelto hasta una interrupción no se pierde
+            if batch:
+                writer.write(to_frame(batch))
+                written += len(batch)
+    print(f"💾 {written} muestras nuevas en {salida}")
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generar muestras de entrenamiento con el optimizador")
+    parser.add_argument("--instancias", type=int, default=1000)
+    parser.add_argument("--primera", type=int, default=0, help="primera semilla")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--modo", choices=["exacto", "columnas", "rapido"], default="exacto")
+    parser.add_argument("--tiempo-limite", type=int, default=10)
+    parser.add_argument("--tanda", type=int, default=50, help="muestras por escritura")
+    parser.add_argument("--salida", default=os.path.join(DATA_DIR, "muestras.csv"))
+    args = parser.parse_args()
+    generate(args.instancias, args.salida, args.procesos,
+             {"modo": args.modo, "tiempo_limite": args.tiempo_limite},
+             primera=args.primera, tanda=args.tanda)
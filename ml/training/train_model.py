@@ -1,136 +1,141 @@
 """
 Entrenamiento del modelo de Machine Learning
+
+Entrena el predictor de desperdicio con las muestras de resoluciones
+reales de generate_data.py (CSV o directorio Parquet) y lo guarda como
+bosque aplanado (FlatForest) con su versión y características; la API lo
+recarga sola al cambiar el fichero.
+
+Uso:
+    python train_model.py --datos ../data/muestras.csv --n-jobs -1
 """
+import argparse
+import glob
+import json
+import os
+import sys
+from datetime import datetime
+
 import pandas as pd
-import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
-import json
 
-def generate_training_data():
-    """Generar datos de entrenamiento basados en el artículo"""
-    
-    # Datos basados en el estudio
-    data = []
-    
-    # Configuraciones típicas
-    configs = [
-        # Ejemplo simple
-        {
-            'num_materiales': 1,
-            'num_piezas': 2,
-            'area_total_materiales': 7000,
-            'area_total_piezas': 5000,
-            'utilizacion_estimada': 0.71,
-            'waste': 2000
-        },
-        # Ejemplo mediano
-        {
-            'num_materiales': 2,
-            'num_piezas': 4,
-            'area_total_materiales': 15000,
-            'area_total_piezas': 12000,
-            'utilizacion_estimada': 0.80,
-            'waste': 3000
-        },
-        # Ejemplo del artículo
-        {
-            'num_materiales': 1,
-            'num_piezas': 4,
-            'area_total_materiales': 140000,  # 20 placas de 100x70
-            'area_total_piezas': 120000,     # Suma de áreas de piezas
-            'utilizacion_estimada': 0.857,
-            'waste': 20000
-        }
-    ]
-    
-    # Generar variaciones
-    for config in configs:
-        for _ in range(50):  # 50 variaciones por configuración
-            variation = config.copy()
-            
-            # Añadir ruido aleatorio
-            variation['waste'] *= np.random.uniform(0.9, 1.1)
-            variation['utilizacion_estimada'] *= np.random.uniform(0.95, 1.05)
-            
-            data.append(variation)
-    
-    return pd.DataFrame(data)
-
-def train_model():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+from app.ml_predictor import ALL_FEATURES, FlatForest, file_sha256
+
+TRAINING_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(TRAINING_DIR, "..", "data", "muestras.csv")
+MODELS_DIR = os.path.join(TRAINING_DIR, "..", "models")
+
+def replace_file(path, write):
+    """Escribir en un temporal y sustituir de golpe: la API que vigila el fichero nunca lo lee a medias"""
+    temporary = f"{path}.tmp"
+    write(temporary)
+    os.replace(temporary, path)
+
+def load_samples(path):
+    """Muestras resueltas (sin errores ni instancias infactibles), una por semilla"""
+    if os.path.isdir(path):
+        df = pd.concat(pd.read_parquet(part) for part in sorted(glob.glob(os.path.join(path, "*.parquet"))))
+    else:
+        df = pd.read_csv(path, on_bad_lines="skip")
+    df = df.drop_duplicates("semilla", keep="last")
+    return df[df["estado"].isin(["Optimal", "Feasible"])].dropna(subset=["waste"])
+
+def train_model(datos=DATA_PATH, salida=MODELS_DIR, n_jobs=-1, n_estimators=200):
     """Entrenar modelo de predicción de desperdicio"""
-    
+
     print("🔧 Entrenando modelo de Machine Learning...")
-    
-    # Generar datos
-    df = generate_training_data()
-    print(f"📊 Datos generados: {len(df)} muestras")
-    
+
+    df = load_samples(datos)
+    print(f"📊 Muestras de {datos}: {len(df)}")
+
     # Separar características y target
-    features = ['num_materiales', 'num_piezas', 'area_total_materiales', 
-                'area_total_piezas', 'utilizacion_estimada']
+    features = [f for f in ALL_FEATURES if f in df.columns]
     X = df[features]
     y = df['waste']
-    
+
     # Dividir en train/test
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
-    
+
     print(f"  Training set: {len(X_train)} muestras")
     print(f"  Test set: {len(X_test)} muestras")
-    
-    # Entrenar modelo
+
+    # Entrenar modelo (n_jobs árboles en paralelo)
     model = RandomForestRegressor(
-        n_estimators=100,
-        max_depth=10,
+        n_estimators=n_estimators,
+        min_samples_leaf=2,
         random_state=42,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
-    
+
     model.fit(X_train, y_train)
-    
+
     # Evaluar
     y_pred = model.predict(X_test)
     mae = mean_absolute_error(y_test, y_pred)
     r2 = r2_score(y_test, y_pred)
-    
+
     print(f"✅ Modelo entrenado")
     print(f"📈 MAE: {mae:.2f}")
     print(f"📈 R² Score: {r2:.4f}")
-    
+
     # Importancia de características
     feature_importance = pd.DataFrame({
         'feature': features,
         'importance': model.feature_importances_
     }).sort_values('importance', ascending=False)
-    
+
     print("\n📊 Importancia de características:")
     print(feature_importance.to_string(index=False))
-    
-    # Guardar modelo
-    model_path = '../models/waste_predictor.pkl'
-    joblib.dump(model, model_path)
-    
-    # Guardar metadata
+
+    # El modelo guardado se ajusta con todas las muestras
+    model.fit(X, y)
+
+    # Bosque aplanado en arrays, sin comprimir: la API lo carga con mmap y
+    # sus procesos comparten las páginas
+    trained_at = datetime.now()
+    version = trained_at.strftime("%Y%m%d-%H%M%S")
+    os.makedirs(salida, exist_ok=True)
+    model_path = os.path.join(salida, 'waste_predictor.pkl')
+    artifact = FlatForest.from_sklearn(model).to_artifact(features, version)
+    replace_file(model_path, lambda path: joblib.dump(artifact, path))
+
+    # Guardar metadata (el sha256 liga los metadatos con su artefacto)
     metadata = {
+        'version': version,
+        'format': FlatForest.FORMAT,
+        'sha256': file_sha256(model_path),
         'features': features,
         'performance': {
             'mae': float(mae),
             'r2': float(r2)
         },
         'training_samples': len(df),
+        'training_data': os.path.abspath(datos),
+        'trained_at': trained_at.isoformat(),
         'model_type': 'RandomForestRegressor'
     }
-    
-    with open('../models/model_metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2)
-    
-    print(f"💾 Modelo guardado en: {model_path}")
-    
+
+    def write_metadata(path):
+        with open(path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    replace_file(os.path.join(salida, 'model_metadata.json'), write_metadata)
+
+    print(f"💾 Modelo {version} guardado en: {model_path}")
+
     return model, mae, r2
 
 if __name__ == '__main__':
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Entrenar el predictor de desperdicio")
+    parser.add_argument("--datos", default=DATA_PATH, help="CSV o directorio Parquet de generate_data.py")
+    parser.add_argument("--salida", default=MODELS_DIR)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--arboles", type=int, default=200)
+    args = parser.parse_args()
+    train_model(args.datos, args.salida, args.n_jobs, args.arboles)
@@ -0,0 +1,100 @@
+"""
+Entrenamiento del enrutado de modos (modo "auto")
+
+Lee la telemetría de resoluciones (la API la escribe sólo si se define
+SOLVE_LOG_PATH; también --telemetria de benchmarks.run) y entrena, para cada modo con datos
+suficientes, un modelo del tiempo hasta la mejor solución y otro del
+desperdicio alcanzado a partir de las características de la instancia.
+
+Uso:
+    python train_router.py --telemetria ../data/solve_log.jsonl --salida ../models/solver_router.pkl
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+import joblib
+
+# Mismas características que la API
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+from app.routing import MODES, ROUTER_FEATURES
+
+# Muestras mínimas de un modo para entrenar sus modelos
+MIN_SAMPLES = 20
+
+def load_telemetry(path):
+    """Registros de la telemetría con resultado válido, agrupados por modo"""
+    by_mode = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("modo") not in MODES or record.get("estado") == "Infeasible":
+                continue
+            by_mode.setdefault(record["modo"], []).append(record)
+    return by_mode
+
+def train_mode(records):
+    """Modelos de tiempo (log(1 + s)) y desperdicio (%) de un modo, con su error en test"""
+    X = np.array([[r["caracteristicas"].get(f, 0) for f in ROUTER_FEATURES] for r in records], dtype=float)
+    targets = {
+        "tiempo": np.log1p([r.get("tiempo_mejor", r["tiempo"]) for r in records]),
+        "desperdicio": np.array([r["desperdicio_pct"] for r in records], dtype=float)
+    }
+    models, errors = {}, {}
+    for name, y in targets.items():
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        model = RandomForestRegressor(n_estimators=100, max_depth=10, min_samples_leaf=2,
+                                      random_state=42, n_jobs=-1)
+        model.fit(X_train, y_train)
+        errors[name] = float(mean_absolute_error(y_test, model.predict(X_test)))
+        # El modelo final usa todas las muestras
+        models[name] = model.fit(X, y)
+    return models, errors
+
+def train_router(telemetry_path, output_path):
+    """Entrenar y guardar el artefacto que carga SolverRouter"""
+    print("🔧 Entrenando el enrutado de modos...")
+    by_mode = load_telemetry(telemetry_path)
+
+    models, metadata = {}, {}
+    for mode in MODES:
+        records = by_mode.get(mode, [])
+        if len(records) < MIN_SAMPLES:
+            print(f"  {mode}: {len(records)} muestras, se necesitan {MIN_SAMPLES}")
+            continue
+        models[mode], errors = train_mode(records)
+        metadata[mode] = {"muestras": len(records), "mae": errors}
+        print(f"  {mode}: {len(records)} muestras, MAE log(tiempo) {errors['tiempo']:.3f}, "
+              f"MAE desperdicio {errors['desperdicio']:.2f} puntos")
+
+    if not models:
+        print("❌ Sin datos suficientes: la API seguirá usando las reglas por tamaño")
+        return None
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    joblib.dump({
+        "features": list(ROUTER_FEATURES),
+        "modelos": models,
+        "muestras": sum(m["muestras"] for m in metadata.values())
+    }, output_path)
+    with open(os.path.splitext(output_path)[0] + "_metadata.json", "w") as f:
+        json.dump({"features": list(ROUTER_FEATURES), "modos": metadata,
+                   "model_type": "RandomForestRegressor"}, f, indent=2)
+
+    print(f"💾 Enrutado guardado en: {output_path}")
+    return models
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Entrenar el enrutado del modo auto")
+    parser.add_argument("--telemetria", default="../data/solve_log.jsonl")
+    parser.add_argument("--salida", default="../models/solver_router.pkl")
+    args = parser.parse_args()
+    train_router(args.telemetria, args.salida)